@@ -1,9 +1,18 @@
 import os
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import before_task_publish, task_postrun, task_prerun
+
+from reports import log
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ngo_impact_tracker.settings')
 
+# Lean workers skip Celery's start-up run of the Django system checks, which
+# imports the URLconf and every view; run `manage.py check` at deploy instead
+if os.environ.get('DJANGO_PROCESS_ROLE') == 'worker':
+    os.environ.setdefault('CELERY_SKIP_CHECKS', '1')
+
 app = Celery('ngo_impact_tracker')
 
 # Using a string here means the worker doesn't have to serialize
@@ -13,6 +22,37 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+# Tasks log under the ID of the request that queued them (reports/log.py)
+before_task_publish.connect(log.attach_request_id)
+task_prerun.connect(log.bind_task_request_id)
+task_postrun.connect(log.clear_task_request_id)
+
+# Run with `celery -A ngo_impact_tracker beat` (or a worker started with --beat)
+app.conf.beat_schedule = {
+    # Queues deferred uploads (reports/intake.py) as the backlog drains
+    'dispatch-deferred-uploads': {
+        'task': 'reports.tasks.dispatch_deferred_uploads',
+        'schedule': 15.0,
+    },
+    # Deletions leave the NGO sketches of their months stale until rebuilt
+    'rebuild-ngo-sketches': {
+        'task': 'reports.tasks.rebuild_ngo_sketches',
+        'schedule': 300.0,
+    },
+    # Keeps the latest months' dashboards precomputed once ingestion is quiet
+    'warm-dashboard-snapshots': {
+        'task': 'reports.tasks.warm_dashboard_snapshots',
+        'schedule': 600.0,
+    },
+    # At month end the previous month changes; compute it before the morning
+    # rush even if uploads are still arriving
+    'warm-dashboard-snapshots-month-start': {
+        'task': 'reports.tasks.warm_dashboard_snapshots',
+        'schedule': crontab(minute=1, hour=0, day_of_month=1),
+        'kwargs': {'force': True},
+    },
+}
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}') 
\ No newline at end of file
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -44,16 +47,57 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'reports.middleware.CorrelationIdMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'reports.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'reports.middleware.ReadReplicaMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Process profiles. 'full' (the default) is everything above, for runserver
+# and the admin. Web workers that only serve /api/ can run with
+# DJANGO_PROCESS_ROLE=api and Celery workers with DJANGO_PROCESS_ROLE=worker:
+# both skip the admin, sessions, messages and static files apps, and the
+# worker loads no middleware. The API docs (drf_spectacular) are only loaded
+# when API_DOCS is on, which by default it is only for 'full'.
+PROCESS_ROLE = os.environ.get('DJANGO_PROCESS_ROLE', 'full')
+if PROCESS_ROLE not in ('full', 'api', 'worker'):
+    raise ImproperlyConfigured(f'DJANGO_PROCESS_ROLE must be full, api or worker, not {PROCESS_ROLE!r}')
+API_DOCS = os.environ.get('API_DOCS', '1' if PROCESS_ROLE == 'full' else '0') == '1'
+
+if PROCESS_ROLE != 'full':
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in (
+        'django.contrib.admin',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+    )]
+    MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in (
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+    )]
+if PROCESS_ROLE == 'worker':
+    INSTALLED_APPS.remove('corsheaders')
+    MIDDLEWARE = []
+if not API_DOCS:
+    INSTALLED_APPS.remove('drf_spectacular')
+
+# Response compression (reports.middleware.CompressionMiddleware). Brotli is
+# used when the brotli package is installed, gzip otherwise.
+RESPONSE_COMPRESSION = {
+    'MIN_SIZE': 1024,  # bytes; smaller bodies aren't worth the CPU
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
 ROOT_URLCONF = 'ngo_impact_tracker.urls'
 
 TEMPLATES = [
@@ -77,13 +121,61 @@ WSGI_APPLICATION = 'ngo_impact_tracker.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuning for single-node deployments. WAL lets the web process keep
+# reading while the Celery worker writes, busy_timeout waits out short write
+# locks instead of raising "database is locked", and IMMEDIATE transactions
+# take the write lock up front so two writers never deadlock on an upgrade.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,  # milliseconds
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,  # negative means KiB, i.e. ~64MB
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# PostgreSQL instead of SQLite when POSTGRES_DB is set; the other POSTGRES_*
+# variables default to a local server
+if os.environ.get('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['POSTGRES_DB'],
+        'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+    }
+
+# Optional read replica for dashboard and listing queries. Set
+# REPLICA_DB_NAME to a second SQLite file (or PostgreSQL database) to try
+# the routing locally
+# (run `python manage.py migrate --database=replica` once), or replace this
+# block with the connection settings of a real replica.
+READ_REPLICA_ALIAS = None
+if os.environ.get('REPLICA_DB_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['REPLICA_DB_NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    READ_REPLICA_ALIAS = 'replica'
+
+DATABASE_ROUTERS = ['reports.routers.ReadReplicaRouter']
+
+# How long a client reads from the primary after its own write
+READ_REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -131,16 +223,34 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # orjson-backed when orjson is installed, stdlib JSONRenderer otherwise
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'reports.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ],
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Token buckets per client and per view throttle_scope (see THROTTLE)
+    'DEFAULT_THROTTLE_CLASSES': [
+        'reports.throttling.TokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'dashboard': '120/min',
+        'uploads': '20/hour',
+        'submissions': '600/min',
+        'status': '1200/min',
+        'reports': '30/min',
+    },
 }
+if API_DOCS:
+    REST_FRAMEWORK['DEFAULT_SCHEMA_CLASS'] = 'drf_spectacular.openapi.AutoSchema'
+
+# /api/schema/ serves a schema prebuilt per code version (see
+# reports/openapi.py and `manage.py build_openapi_schema`). Set CODE_VERSION
+# to the deployed commit; without it the version is a digest of the sources.
+CODE_VERSION = os.environ.get('CODE_VERSION')
 
 # DRF Spectacular settings for OpenAPI/Swagger
 SPECTACULAR_SETTINGS = {
@@ -173,18 +283,103 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Periodic tasks are scheduled in ngo_impact_tracker/celery.py
 
 # Media files for CSV uploads
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
-# Structured Logging Configuration
+# Bulk upload limits. Compressed uploads (.csv.gz, .zip) are spooled to
+# UPLOAD_SPOOL_DIR, which must be shared by the web and worker processes,
+# and decompressed as a stream by the worker. Deferred uploads wait there
+# too; like the other private files it is kept out of the public MEDIA_ROOT.
+UPLOAD_MAX_FILE_SIZE = 10 * 1024 * 1024  # as uploaded, compressed or not
+UPLOAD_MAX_DECOMPRESSED_SIZE = 200 * 1024 * 1024
+UPLOAD_MAX_COMPRESSION_RATIO = 100  # guards against zip bombs
+UPLOAD_SPOOL_DIR = BASE_DIR / 'var' / 'uploads'
+
+# Upload admission control. With DEFER_AT import jobs queued or running,
+# new uploads are spooled and queued later; at REJECT_AT (deferred ones
+# included) they get a 503 with Retry-After of at least MIN_RETRY_AFTER
+# seconds. WORKERS (the import concurrency) and DEFAULT_JOB_SECONDS (until
+# imports have finished to measure) feed the queue position estimates.
+INTAKE = {
+    'DEFER_AT': 20,
+    'REJECT_AT': 200,
+    'MIN_RETRY_AFTER': 30,
+    'WORKERS': int(os.environ.get('IMPORT_WORKERS', 4)),
+    'DEFAULT_JOB_SECONDS': 60,
+}
+
+# Rate limiting state. InMemoryBackend is per process; set THROTTLE_REDIS_URL
+# to share buckets and aggregation slots across web processes.
+THROTTLE = {'BACKEND': 'reports.throttling.InMemoryBackend'}
+if os.environ.get('THROTTLE_REDIS_URL'):
+    THROTTLE = {
+        'BACKEND': 'reports.throttling.RedisBackend',
+        'OPTIONS': {'URL': os.environ['THROTTLE_REDIS_URL']},
+    }
+
+# At most LIMIT heavy dashboard aggregations at once; a request waits up to
+# WAIT seconds for a slot, then gets a 503 with Retry-After: RETRY_AFTER
+AGGREGATION_CONCURRENCY = {'LIMIT': 4, 'WAIT': 1.0, 'TIMEOUT': 60, 'RETRY_AFTER': 2}
+
+# /api/dashboard/aggregate answers 400 past this many groups unless the
+# client streams them with output=ndjson
+AGGREGATION_MAX_GROUPS = 10000
+
+# Dashboard snapshots (reports/snapshots.py) are refreshed only after no
+# report has changed and no import has run for QUIET_SECONDS
+DASHBOARD_WARMUP = {'QUIET_SECONDS': 120}
+
+# Profiling of CSV imports: None, 'timers' or 'cprofile' for every job. A
+# single upload can opt in with the 'profile' form field instead, if the
+# user is staff or CSV_TASK_PROFILE_ON_REQUEST is on. pstats files go to
+# PROFILE_DIR, which is kept out of the public MEDIA_ROOT.
+CSV_TASK_PROFILE = None
+CSV_TASK_PROFILE_ON_REQUEST = False
+PROFILE_DIR = BASE_DIR / 'var' / 'profiles'
+
+# Imports keep the first CSV_MAX_ERROR_DETAILS failed rows (row number and
+# truncated text) in error_details; failed_rows still counts every one. An
+# import fails once its worker's RSS passes CSV_TASK_MAX_RSS_MB (None: no
+# cap), and a worker child is replaced after a task leaves it above
+# CELERY_WORKER_MAX_MEMORY_PER_CHILD (in KB).
+CSV_MAX_ERROR_DETAILS = 1000
+CSV_TASK_MAX_RSS_MB = 512
+CELERY_WORKER_MAX_MEMORY_PER_CHILD = 512 * 1024
+
+# Gzip CSV exports written by `manage.py report_partitions archive` (kept
+# out of the public MEDIA_ROOT)
+REPORT_ARCHIVE_DIR = BASE_DIR / 'var' / 'archives'
+
+# Prebuilt OpenAPI schema artifacts, one set per CODE_VERSION. Build output:
+# served by the schema view only, never from MEDIA_ROOT.
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'build' / 'openapi'
+
+# Structured Logging Configuration. reports.log.configure applies LOGGING
+# and then hands every record to a background thread, so log calls never
+# wait on file or console I/O. Records carry request_id (one per request,
+# echoed in X-Request-ID) and job_id (during imports). Only LOG_SAMPLE_RATE
+# of the per-request INFO logs from the views are kept; warnings and errors
+# always are.
+LOGGING_CONFIG = 'reports.log.configure'
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1.0 if DEBUG else 0.1))
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'context': {
+            '()': 'reports.log.ContextFilter',
+        },
+        'sample_info': {
+            '()': 'reports.log.SamplingFilter',
+            'rate': LOG_SAMPLE_RATE,
+        },
+    },
     'formatters': {
         'verbose': {
-            'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
+            'format': '{levelname} {asctime} {module} {process:d} {thread:d} [{request_id}] {message}',
             'style': '{',
         },
         'simple': {
@@ -192,7 +387,7 @@ LOGGING = {
             'style': '{',
         },
         'json': {
-            'format': '{"level": "%(levelname)s", "time": "%(asctime)s", "module": "%(module)s", "message": "%(message)s"}',
+            '()': 'reports.log.JsonFormatter',
         },
     },
     'handlers': {
@@ -201,6 +396,7 @@ LOGGING = {
             'class': 'logging.FileHandler',
             'filename': BASE_DIR / 'django.log',
             'formatter': 'verbose',
+            'filters': ['context'],
         },
         'console': {
             'level': 'INFO',
@@ -212,6 +408,7 @@ LOGGING = {
             'class': 'logging.FileHandler',
             'filename': BASE_DIR / 'celery.log',
             'formatter': 'json',
+            'filters': ['context'],
         },
     },
     'loggers': {
@@ -225,6 +422,9 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'reports.views': {
+            'filters': ['sample_info'],
+        },
         'celery': {
             'handlers': ['celery_file', 'console'],
             'level': 'INFO',
@@ -1,13 +1,79 @@
+from django import forms
 from django.contrib import admin
-from .models import Report, Job
+from django.core.exceptions import ValidationError
+from .models import Report, Job, MonthlyRollup
+from .months import is_valid_month, month_key
+from .paginators import EstimatedCountPaginator
+from .services import delete_reports, save_report, update_report
+
+
+class YearListFilter(admin.SimpleListFilter):
+    """Filter reports by year on the indexed month_key; the choices come from the small rollup table"""
+    title = 'year'
+    parameter_name = 'year'
+
+    def lookups(self, request, model_admin):
+        month_keys = MonthlyRollup.objects.filter(report_count__gt=0).values_list('month_key', flat=True)
+        years = sorted({(key - 1) // 12 for key in month_keys}, reverse=True)
+        return [(str(year), str(year)) for year in years]
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            year = int(self.value())
+            return queryset.filter(month_key__gte=year * 12 + 1, month_key__lte=year * 12 + 12)
+        return queryset
+
+
+class ReportAdminForm(forms.ModelForm):
+    def clean(self):
+        """One report per NGO and month; the unique constraint is on month_key, which the form doesn't edit"""
+        cleaned_data = super().clean()
+        ngo_id, month = cleaned_data.get('ngo_id'), cleaned_data.get('month')
+        if ngo_id and month and is_valid_month(month):
+            others = Report.objects.filter(ngo_id=ngo_id, month_key=month_key(month)).exclude(pk=self.instance.pk)
+            if others.exists():
+                raise ValidationError('A report for this NGO and month already exists.')
+        return cleaned_data
+
 
 @admin.register(Report)
 class ReportAdmin(admin.ModelAdmin):
+    form = ReportAdminForm
     list_display = ['ngo_id', 'month', 'people_helped', 'events_conducted', 'funds_utilized', 'created_at']
-    list_filter = ['month', 'created_at']
+    list_filter = [YearListFilter, 'created_at']
     search_fields = ['ngo_id', 'month']
+    search_help_text = 'An NGO ID prefix (case-sensitive) or a month (YYYY-MM)'
     ordering = ['-created_at']
     readonly_fields = ['created_at', 'updated_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """Index-friendly search: exact month via month_key, otherwise an ngo_id prefix range"""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if is_valid_month(term):
+            return queryset.filter(month_key=month_key(term)), False
+        return queryset.filter(ngo_id__gte=term, ngo_id__lt=term + '\U0010ffff'), False
+
+    # Writes go through the report service so rollups see every change
+    def save_model(self, request, obj, form, change):
+        metrics = (obj.people_helped, obj.events_conducted, obj.funds_utilized)
+        if change:
+            report = update_report(obj.pk, obj.ngo_id, obj.month, *metrics)
+        else:
+            report, _ = save_report(obj.ngo_id, obj.month, *metrics)
+        obj.pk = report.pk
+        obj.month_key = report.month_key
+        obj.created_at = report.created_at
+        obj.updated_at = report.updated_at
+
+    def delete_model(self, request, obj):
+        delete_reports(Report.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        delete_reports(queryset)
 
 @admin.register(Job)
 class JobAdmin(admin.ModelAdmin):
@@ -15,7 +81,14 @@ class JobAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created_at']
     search_fields = ['file_name']
     ordering = ['-created_at']
-    readonly_fields = ['id', 'created_at', 'updated_at', 'progress_percentage']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'started_at', 'progress_percentage']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def get_queryset(self, request):
+        # error_details can hold thousands of rows per job; the change form
+        # still loads it (and profile) with one extra query
+        return super().get_queryset(request).defer('error_details', 'profile')
     
     def progress_percentage(self, obj):
         return f"{obj.progress_percentage}%"
@@ -0,0 +1,149 @@
+"""
+Grouped totals for the aggregation endpoint.
+
+An AggregationQuery (dimensions to group by, metrics, a month range and an
+optional NGO filter) compiles to a single GROUP BY query. Quarters and
+years are derived from month_key with integer arithmetic in SQL, so
+grouping never touches dates. When a request doesn't involve individual
+NGOs (no ngo dimension, no NGO filter, no distinct NGO count) it is
+answered from MonthlyRollup, one row per month, instead of the reports.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Sum
+
+from .models import MonthlyRollup, Report
+from .months import month_from_key, month_key
+
+DIMENSIONS = ('ngo', 'month', 'quarter', 'year')
+METRICS = ('report_count', 'ngo_count', 'people_helped', 'events_conducted', 'funds_utilized')
+SUMMED_METRICS = ('people_helped', 'events_conducted', 'funds_utilized')
+# ngo_count (a distinct count over the reports) only when asked for
+DEFAULT_METRICS = ('report_count', *SUMMED_METRICS)
+
+CENTS = Decimal('0.01')
+
+SOURCE_REPORTS = 'reports'
+SOURCE_ROLLUPS = 'rollups'
+
+
+def _key_bucket(months_per_bucket):
+    # Integer division: (key - 1) // n counts buckets from year 0
+    return ExpressionWrapper((F('month_key') - 1) / months_per_bucket, output_field=IntegerField())
+
+
+# dimension -> (output key, SQL expression, label for a grouped value)
+_DIMENSIONS = {
+    'ngo': ('ngo_id', lambda: F('ngo_id'), str),
+    'month': ('month', lambda: F('month_key'), month_from_key),
+    'quarter': ('quarter', lambda: _key_bucket(3), lambda bucket: f'{bucket // 4:04d}-Q{bucket % 4 + 1}'),
+    'year': ('year', lambda: _key_bucket(12), int),
+}
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+
+class AggregationQuery:
+    """One aggregation request; build it with from_params() to validate query parameters"""
+
+    def __init__(self, from_key, to_key, group_by=(), metrics=DEFAULT_METRICS, ngo_ids=()):
+        self.from_key = from_key
+        self.to_key = to_key
+        self.group_by = tuple(group_by)
+        self.metrics = tuple(metrics)
+        self.ngo_ids = tuple(ngo_ids)
+
+    @classmethod
+    def from_params(cls, params):
+        """Build a query from request query parameters; raises ValueError with a client-facing message"""
+        from_month, to_month = params.get('from_month'), params.get('to_month')
+        if not (from_month and to_month):
+            raise ValueError('Both from_month and to_month parameters (YYYY-MM) are required')
+        try:
+            from_key, to_key = month_key(from_month), month_key(to_month)
+        except ValueError:
+            raise ValueError('Invalid month format. Use YYYY-MM (e.g., 2024-01)')
+        if from_key > to_key:
+            raise ValueError('from_month must not be after to_month')
+
+        group_by = list(dict.fromkeys(_split(params.get('group_by'))))
+        unknown = [dimension for dimension in group_by if dimension not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Invalid group_by: {', '.join(unknown)}. Use {', '.join(DIMENSIONS)}")
+
+        metrics = list(dict.fromkeys(_split(params.get('metrics')))) or list(DEFAULT_METRICS)
+        unknown = [metric for metric in metrics if metric not in METRICS]
+        if unknown:
+            raise ValueError(f"Invalid metrics: {', '.join(unknown)}. Use {', '.join(METRICS)}")
+
+        return cls(from_key, to_key, group_by, metrics, _split(params.get('ngo_id')))
+
+    @property
+    def source(self):
+        if 'ngo' in self.group_by or 'ngo_count' in self.metrics or self.ngo_ids:
+            return SOURCE_REPORTS
+        return SOURCE_ROLLUPS
+
+    @property
+    def model(self):
+        return MonthlyRollup if self.source == SOURCE_ROLLUPS else Report
+
+    def _metric_expressions(self):
+        if self.source == SOURCE_ROLLUPS:
+            expressions = {'report_count': Sum('report_count')}
+        else:
+            expressions = {'report_count': Count('id'), 'ngo_count': Count('ngo_id', distinct=True)}
+        for field in SUMMED_METRICS:
+            expressions[field] = Sum(field)
+        return {metric: expressions[metric] for metric in self.metrics}
+
+    def _filtered(self):
+        queryset = self.model.objects.filter(month_key__gte=self.from_key, month_key__lte=self.to_key)
+        if self.source == SOURCE_ROLLUPS:
+            # A month whose reports were all deleted keeps a zeroed rollup;
+            # the reports source has no row for it
+            queryset = queryset.filter(report_count__gt=0)
+        if self.ngo_ids:
+            queryset = queryset.filter(ngo_id__in=self.ngo_ids)
+        return queryset
+
+    def queryset(self):
+        """values() queryset with one row per group, ordered by the group columns (group_<dimension>)"""
+        queryset = self._filtered()
+        groups = {f'group_{dimension}': _DIMENSIONS[dimension][1]() for dimension in self.group_by}
+        # values() on the group annotations makes them the GROUP BY
+        return queryset.annotate(**groups).values(*groups).annotate(**self._metric_expressions()).order_by(*groups)
+
+    def execute(self, limit=None, chunk_size=2000):
+        """
+        Run the query and return an iterator of response rows, e.g.
+        {'ngo_id': 'NGO001', 'quarter': '2024-Q1', 'people_helped': 120}.
+        At most limit rows are fetched. The database is chosen now, so the
+        rows can be consumed after the request's routing context has ended.
+        """
+        if not self.group_by:
+            # A grand total: aggregate() returns one row even for no reports
+            totals = self._filtered().aggregate(**self._metric_expressions())
+            return iter([self._metrics({metric: totals[metric] or 0 for metric in self.metrics})])
+        queryset = self.queryset()
+        queryset = queryset.using(queryset.db)
+        if limit is not None:
+            queryset = queryset[:limit]
+        return self._rows(queryset.iterator(chunk_size=chunk_size))
+
+    def _rows(self, values):
+        labels = [(f'group_{dimension}', *_DIMENSIONS[dimension][::2]) for dimension in self.group_by]
+        for group in values:
+            row = {key: label(group[column]) for column, key, label in labels}
+            row.update(self._metrics(group))
+            yield row
+
+    def _metrics(self, values):
+        metrics = {metric: values[metric] for metric in self.metrics}
+        if 'funds_utilized' in metrics:
+            # A string with cents, like the other endpoints' decimals (SQLite
+            # sums them as floats)
+            metrics['funds_utilized'] = str(Decimal(metrics['funds_utilized']).quantize(CENTS))
+        return metrics
@@ -0,0 +1,39 @@
+import hashlib
+
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+# Bump when the response format changes so clients don't keep stale bodies
+ETAG_FORMAT_VERSION = '1'
+
+
+def make_etag(*parts):
+    """Build a strong ETag from the given parts"""
+    digest = hashlib.sha1(ETAG_FORMAT_VERSION.encode())
+    for part in parts:
+        digest.update(b'\x00')
+        digest.update(str(part).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    """Check If-None-Match against etag (weak comparison, as RFC 9110 requires)"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in (tag.removeprefix('W/') for tag in etags)
+
+
+def not_modified(etag):
+    """Empty 304 response carrying the current ETag"""
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    return with_etag(response, etag)
+
+
+def with_etag(response, etag):
+    """Attach etag and ask clients to revalidate before reusing the body"""
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
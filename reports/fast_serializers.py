@@ -0,0 +1,122 @@
+import datetime
+import decimal
+
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+
+def _identity(value):
+    return value
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    exponent = decimal.Decimal('.1') ** field.decimal_places if field.decimal_places is not None else None
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        if exponent is not None:
+            value = value.quantize(exponent, rounding=field.rounding, context=context)
+        if field.normalize_output:
+            value = value.normalize()
+        return '{:f}'.format(value) if coerce_to_string else value
+
+    return convert
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != 'iso-8601':
+        return field.to_representation
+
+    # Resolved per serialize() call, like DRF resolves it per value
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+    def convert(value):
+        if field_timezone is not None:
+            if timezone.is_aware(value):
+                value = value.astimezone(field_timezone)
+            else:
+                value = timezone.make_aware(value, field_timezone)
+        elif timezone.is_aware(value):
+            value = timezone.make_naive(value, datetime.timezone.utc)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return convert
+
+
+def _converter_for(field):
+    if isinstance(field, serializers.DecimalField):
+        return _decimal_converter(field)
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_converter(field)
+    if isinstance(field, serializers.DateField):
+        return field.to_representation
+    if isinstance(field, serializers.UUIDField):
+        return field.to_representation
+    if isinstance(field, serializers.FloatField):
+        return float
+    if isinstance(field, (serializers.CharField, serializers.IntegerField, serializers.BooleanField)):
+        return _identity
+    if isinstance(field, serializers.JSONField) and not field.binary:
+        return _identity
+    return None
+
+
+class ValuesSerializer:
+    """
+    Read-only fast path for a DRF serializer.
+
+    Builds response dicts straight from ``values_list()`` rows instead of
+    model instances, using one precomputed converter per field. The output
+    matches ``serializer_class(queryset, many=True).data`` value for value and
+    in the same key order, so it renders to the same JSON.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._fields = None
+
+    @property
+    def fields(self):
+        if self._fields is None:
+            fields = []
+            for name, field in self.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                if _converter_for(field) is None or '.' in field.source or field.source == '*':
+                    raise TypeError(
+                        f"{self.serializer_class.__name__}.{name} ({type(field).__name__}) "
+                        f"has no values() fast path"
+                    )
+                fields.append((name, field))
+            self._fields = fields
+        return self._fields
+
+    def serialize(self, queryset):
+        """Return a list of dicts for every row in queryset"""
+        fields = self.fields
+        names = [name for name, _ in fields]
+        converters = [
+            (index, converter)
+            for index, converter in enumerate(_converter_for(field) for _, field in fields)
+            if converter is not _identity
+        ]
+
+        data = []
+        for row in queryset.values_list(*(field.source for _, field in fields)):
+            values = list(row)
+            for index, converter in converters:
+                value = values[index]
+                if value is not None:
+                    values[index] = converter(value)
+            data.append(dict(zip(names, values)))
+        return data
@@ -0,0 +1,157 @@
+"""
+Admission control for bulk uploads.
+
+admission() weighs the import backlog before an upload is accepted: jobs
+waiting or running, or the Celery queue's length if that is longer. Below
+INTAKE['DEFER_AT'] the upload is queued straight away. From there on it is
+spooled to disk and its job left 'deferred'; dispatch_deferred() (run by
+Celery beat and whenever an import finishes) queues deferred jobs oldest
+first as the backlog drains. Once the backlog reaches INTAKE['REJECT_AT']
+uploads are refused with a Retry-After hint.
+
+queue_estimate() gives a waiting job its place in line and an estimated
+start, from the recent import durations and INTAKE['WORKERS'].
+"""
+import logging
+import math
+from datetime import timedelta
+from typing import NamedTuple
+
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+QUEUE = 'queue'
+DEFER = 'defer'
+REJECT = 'reject'
+
+WAITING_STATUSES = ('deferred', 'pending')
+ACTIVE_STATUSES = ('pending', 'processing')
+
+# Completed imports averaged for the start estimates
+DURATION_SAMPLE = 20
+
+
+class Admission(NamedTuple):
+    decision: str
+    backlog: int
+    retry_after: int = 0
+
+
+class QueueEstimate(NamedTuple):
+    position: int
+    estimated_start: object
+
+
+def broker_queue_depth():
+    """Messages waiting in the default Celery queue; 0 when eager or the broker can't be reached"""
+    app = current_app
+    if app.conf.task_always_eager:
+        return 0
+    try:
+        with app.connection_for_read() as connection:
+            connection.ensure_connection(max_retries=0)
+            declared = connection.default_channel.queue_declare(queue=app.conf.task_default_queue, passive=True)
+            return declared.message_count
+    except Exception as e:
+        logger.warning("Could not read the broker queue depth: %s", e)
+        return 0
+
+
+def _job_counts():
+    return Job.objects.aggregate(
+        deferred=Count('id', filter=Q(status='deferred')),
+        active=Count('id', filter=Q(status__in=ACTIVE_STATUSES)),
+    )
+
+
+def average_job_seconds():
+    """Mean duration of the last DURATION_SAMPLE completed imports, or INTAKE['DEFAULT_JOB_SECONDS']"""
+    recent = Job.objects.filter(status='completed', started_at__isnull=False).order_by('-created_at')
+    ids = recent.values('id')[:DURATION_SAMPLE]
+    duration = Job.objects.filter(id__in=ids).aggregate(duration=Avg(F('completed_at') - F('started_at')))['duration']
+    if duration is None:
+        return settings.INTAKE['DEFAULT_JOB_SECONDS']
+    return max(duration.total_seconds(), 1)
+
+
+def _wait_seconds(jobs_ahead):
+    # Jobs run INTAKE['WORKERS'] at a time
+    return (jobs_ahead // settings.INTAKE['WORKERS']) * average_job_seconds()
+
+
+def admission():
+    """Decide whether a new upload is queued, deferred or rejected"""
+    config = settings.INTAKE
+    if current_app.conf.task_always_eager:
+        # Imports run inside the request; there is no queue to protect
+        return Admission(QUEUE, 0)
+
+    counts = _job_counts()
+    backlog = max(counts['active'], broker_queue_depth())
+    load = backlog + counts['deferred']
+    if load >= config['REJECT_AT']:
+        retry_after = _wait_seconds(load - config['REJECT_AT'] + 1)
+        return Admission(REJECT, load, max(config['MIN_RETRY_AFTER'], math.ceil(retry_after)))
+    # Once anything is deferred, newer uploads wait behind it
+    if counts['deferred'] or backlog >= config['DEFER_AT']:
+        return Admission(DEFER, load)
+    return Admission(QUEUE, load)
+
+
+def dispatch_deferred():
+    """Queue deferred jobs, oldest first, while the backlog is under DEFER_AT; returns how many"""
+    # Imported here: tasks.py calls back into this module
+    from .tasks import process_csv_upload
+
+    if not Job.objects.filter(status='deferred').exists():
+        return 0
+    active = Job.objects.filter(status__in=ACTIVE_STATUSES).count()
+    room = settings.INTAKE['DEFER_AT'] - max(active, broker_queue_depth())
+    if room <= 0:
+        return 0
+
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='deferred')
+            .order_by('created_at')
+            .values_list('id', 'task_kwargs')[:room]
+        )
+        Job.objects.filter(id__in=[job_id for job_id, _ in jobs]).update(status='pending', updated_at=timezone.now())
+
+    # Queued once committed, so the worker finds the jobs pending. The task
+    # arguments stay on the job until the worker starts it, so a job whose
+    # message is lost still knows where its spooled upload is.
+    for dispatched, (job_id, task_kwargs) in enumerate(jobs):
+        try:
+            process_csv_upload.delay(str(job_id), **(task_kwargs or {}))
+        except Exception as e:
+            # Back in line for the next run
+            for job_id, task_kwargs in jobs[dispatched:]:
+                Job.objects.filter(id=job_id).update(status='deferred')
+            logger.warning("Could not queue deferred upload jobs: %s", e)
+            jobs = jobs[:dispatched]
+            break
+    if jobs:
+        logger.info("Dispatched %d deferred upload jobs", len(jobs))
+    return len(jobs)
+
+
+def queue_estimate(status, created_at):
+    """QueueEstimate for a waiting job (given its status and created_at), None for any other"""
+    if status not in WAITING_STATUSES:
+        return None
+    ahead = Job.objects.filter(status__in=WAITING_STATUSES, created_at__lt=created_at).count()
+    running = Job.objects.filter(status='processing').count()
+    # Rounded up to the minute, so the estimate (and the status ETag) only
+    # moves when the queue does
+    start = timezone.now() + timedelta(seconds=_wait_seconds(ahead + running))
+    start = start.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    return QueueEstimate(ahead + 1, start)
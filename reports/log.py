@@ -0,0 +1,170 @@
+"""
+Logging that stays off the request path.
+
+configure() is Django's LOGGING_CONFIG hook. It applies settings.LOGGING
+and then puts every configured logger's handlers behind a QueueHandler, so
+a log call only formats its message and enqueues the record; a
+QueueListener thread per set of handlers does the JSON encoding and the
+file and console I/O. Listeners are restarted in forked children (Celery
+and gunicorn prefork workers) and drained at exit.
+
+Records carry correlation IDs from context variables: request_id, set per
+request by CorrelationIdMiddleware and forwarded to Celery tasks in a
+message header, and job_id, set while an import runs. SamplingFilter
+keeps a fraction of high-volume INFO logs, deciding per request so a kept
+request logs in full.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.config
+import os
+import random
+import zlib
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+
+request_id = contextvars.ContextVar('request_id', default=None)
+job_id = contextvars.ContextVar('job_id', default=None)
+
+# Celery message header carrying the request ID to tasks
+TASK_HEADER = 'request_id'
+
+_listeners = []
+_task_tokens = {}
+
+
+class ContextFilter(logging.Filter):
+    """Copy the correlation IDs onto the record (in the thread that logged it)"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id.get()
+            record.job_id = job_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a share (rate) of records at INFO and below; warnings and errors
+    always pass. Within a request the choice follows its request ID, so a
+    request's records are kept or dropped together.
+    """
+
+    def __init__(self, rate=1.0, name=''):
+        super().__init__(name)
+        self.threshold = int(float(rate) * 0x10000)
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or self.threshold >= 0x10000:
+            return True
+        current = request_id.get()
+        if current is None:
+            return random.random() * 0x10000 < self.threshold
+        return zlib.crc32(current.encode()) & 0xFFFF < self.threshold
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the correlation IDs when set"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+        }
+        for name in ('request_id', 'job_id'):
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Merge the arguments now (they may change after the call) but leave
+        # the formatting to the listener's handlers; the traceback travels
+        # as text since exc_info doesn't pickle or outlive the frame
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _restart_listeners():
+    # A forked child inherits the queues but not the listener threads
+    for handler, listener in _listeners:
+        handler.queue = listener.queue = SimpleQueue()
+        listener._thread = None
+        listener.start()
+
+
+def _stop_listeners():
+    for _, listener in _listeners:
+        if listener._thread is not None:
+            listener.stop()
+
+
+def configure(config):
+    """Apply the dictConfig config, then move every logger's handlers behind a queue"""
+    logging.config.dictConfig(config)
+    _stop_listeners()
+    _listeners.clear()
+
+    queued = {}
+    names = list(config.get('loggers', {}))
+    loggers = [logging.getLogger(name) for name in names]
+    if 'root' in config:
+        loggers.append(logging.getLogger())
+    for logger in loggers:
+        handlers = tuple(logger.handlers)
+        if not handlers:
+            continue
+        if handlers not in queued:
+            queue = SimpleQueue()
+            handler = _QueueHandler(queue)
+            handler.addFilter(ContextFilter())
+            listener = QueueListener(queue, *handlers, respect_handler_level=True)
+            listener.start()
+            _listeners.append((handler, listener))
+            queued[handlers] = handler
+        logger.handlers = [queued[handlers]]
+
+
+def attach_request_id(headers=None, **kwargs):
+    """Celery before_task_publish: forward the current request ID to the task"""
+    current = request_id.get()
+    if current is not None and headers is not None:
+        headers.setdefault(TASK_HEADER, current)
+
+
+def bind_task_request_id(task_id=None, task=None, **kwargs):
+    """Celery task_prerun: log the task under the request ID it was sent from"""
+    if task is None:
+        return
+    # Delivered messages expose custom headers as request attributes,
+    # task.apply() under request.headers
+    value = getattr(task.request, TASK_HEADER, None) or (task.request.headers or {}).get(TASK_HEADER)
+    # Eager tasks run inside the request and already see its ID
+    if value is not None:
+        _task_tokens[task_id] = request_id.set(value)
+
+
+def clear_task_request_id(task_id=None, **kwargs):
+    """Celery task_postrun"""
+    token = _task_tokens.pop(task_id, None)
+    if token is not None:
+        request_id.reset(token)
+
+
+os.register_at_fork(after_in_child=_restart_listeners)
+atexit.register(_stop_listeners)
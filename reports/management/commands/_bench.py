@@ -0,0 +1,107 @@
+import csv
+import gzip
+import os
+import random
+from decimal import Decimal
+
+from django.db import transaction
+from django.test import RequestFactory
+
+from reports.models import Report, Job
+from reports.months import month_from_key, month_key
+from reports.tasks import REQUIRED_COLUMNS
+from reports.views import JobStatusView, ReportsListView
+
+
+def synthetic_reports(count, prefix='BENCH', start_month='2020-01', months=60):
+    """Unsaved Report objects spread over `months` months"""
+    start_key = month_key(start_month)
+    reports = []
+    for i in range(count):
+        key = start_key + i % months
+        reports.append(Report(
+            ngo_id=f'{prefix}{i:07d}',
+            month=month_from_key(key),
+            month_key=key,
+            people_helped=i % 1000,
+            events_conducted=i % 30,
+            funds_utilized=Decimal(i % 100000) / 4,
+        ))
+    return reports
+
+
+def large_payloads(rows, errors):
+    """
+    Response data of the large-payload endpoints: /api/reports with `rows`
+    reports and /api/job-status for a job with `errors` error entries. The
+    data is created in a transaction that is rolled back.
+    """
+    factory = RequestFactory()
+    with transaction.atomic():
+        Report.objects.bulk_create(synthetic_reports(rows), batch_size=1000)
+        job = Job.objects.create(
+            status='completed',
+            file_name='bench.csv',
+            total_rows=errors,
+            processed_rows=errors,
+            failed_rows=errors,
+            error_details=[
+                {'row': i, 'raw': f'NGO{i},2024-13,10,1,100.00', 'error': 'Invalid month'}
+                for i in range(1, errors + 1)
+            ],
+        )
+        payloads = {
+            '/api/reports': ReportsListView.as_view()(factory.get('/api/reports')).data,
+            '/api/job-status': JobStatusView.as_view()(
+                # error_details is only sent when asked for
+                factory.get(f'/api/job-status/{job.id}', {'include_errors': '1'}), job_id=str(job.id)
+            ).data,
+        }
+        transaction.set_rollback(True)
+    return payloads
+
+
+# One of these replaces a valid value in an error row
+_ERROR_KINDS = [
+    ('month', '2024-13'),
+    ('ngo_id', ''),
+    ('people_helped', '-5'),
+    ('funds_utilized', 'lots'),
+]
+
+
+def write_synthetic_csv(path, rows, error_ratio=0.0, duplicate_ratio=0.0,
+                        prefix='GEN', start_month='2020-01', months=60, seed=0):
+    """
+    Write a bulk-upload CSV (gzip-compressed if path ends in .gz) with
+    `rows` data rows. About error_ratio of them fail validation, and about
+    duplicate_ratio repeat the (ngo_id, month) key of an earlier row with
+    different metrics. Keys are spread over `months` months from
+    start_month. Returns the file size in bytes.
+    """
+    rng = random.Random(seed)
+    start_key = month_key(start_month)
+    opener = gzip.open if path.endswith('.gz') else open
+    unique_keys = 0
+
+    with opener(path, 'wt', encoding='utf-8', newline='') as output:
+        writer = csv.writer(output)
+        writer.writerow(REQUIRED_COLUMNS)
+        for _ in range(rows):
+            if unique_keys and rng.random() < duplicate_ratio:
+                index = rng.randrange(unique_keys)
+            else:
+                index = unique_keys
+                unique_keys += 1
+            row = {
+                'ngo_id': f'{prefix}{index // months:07d}',
+                'month': month_from_key(start_key + index % months),
+                'people_helped': rng.randrange(1000),
+                'events_conducted': rng.randrange(30),
+                'funds_utilized': f'{rng.randrange(10000000) / 100:.2f}',
+            }
+            if rng.random() < error_ratio:
+                field, value = rng.choice(_ERROR_KINDS)
+                row[field] = value
+            writer.writerow(row[column] for column in REQUIRED_COLUMNS)
+    return os.path.getsize(path)
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reports.middleware import _brotli_compressor, _gzip_compressor, brotli
+from reports.renderers import FastJSONRenderer
+
+from ._bench import large_payloads
+
+
+class Command(BaseCommand):
+    """
+    Bytes-on-wire versus CPU for the compression settings the response
+    middleware supports, measured on typical API payloads.
+    """
+    help = 'Measure gzip/Brotli compression ratio and time on API payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Reports in the list payload')
+        parser.add_argument('--errors', type=int, default=10000, help='Error entries in the job payload')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per setting (best is reported)')
+
+    def handle(self, *args, **options):
+        renderer = FastJSONRenderer()
+        bodies = {
+            endpoint: renderer.render(data)
+            for endpoint, data in large_payloads(options['rows'], options['errors']).items()
+        }
+
+        settings_to_try = [('gzip', level, _gzip_compressor) for level in (1, 6, 9)]
+        if brotli is not None:
+            settings_to_try += [('br', quality, _brotli_compressor) for quality in (1, 5, 11)]
+        else:
+            self.stdout.write(self.style.WARNING('brotli is not installed; only gzip is measured'))
+
+        for endpoint, body in bodies.items():
+            self.stdout.write(f"{endpoint}: {len(body) / 1024:.0f}KB uncompressed")
+            for encoding, level, factory in settings_to_try:
+                timings = []
+                for _ in range(options['repeat']):
+                    compress, _flush, finish = factory(level)
+                    started = time.perf_counter()
+                    compressed = compress(body) + finish()
+                    timings.append(time.perf_counter() - started)
+                best = min(timings)
+                self.stdout.write(
+                    f"  {encoding:>4} {level:>2}: {len(compressed) / 1024:8.1f}KB "
+                    f"({len(body) / len(compressed):5.1f}x smaller), {best * 1000:7.1f}ms, "
+                    f"{len(body) / best / 1024 / 1024:6.0f}MB/s"
+                )
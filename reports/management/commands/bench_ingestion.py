@@ -0,0 +1,179 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from celery import current_app
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory, override_settings
+
+from reports.models import Job, Report
+from reports.months import month_key
+from reports.profiling import peak_rss_mb
+from reports.services import delete_reports
+from reports.views import BulkUploadView
+
+from ._bench import write_synthetic_csv
+
+BENCH_PREFIX = 'INGEST'
+BENCH_START_MONTH = '1900-01'
+BENCH_MONTHS = 120
+
+
+class Command(BaseCommand):
+    """
+    End-to-end ingestion benchmark: synthetic CSVs go through BulkUploadView
+    and process_csv_upload (run eagerly) and the command reports rows/s,
+    peak RSS, query count and total time per size. Each size runs in a
+    fresh process so peak RSS isn't inherited from a previous run.
+    """
+    help = 'Benchmark CSV ingestion through the upload endpoint at several sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,100000,1000000', help='Comma-separated row counts')
+        parser.add_argument('--error-ratio', type=float, default=0.01, help='Share of invalid rows')
+        parser.add_argument('--duplicate-ratio', type=float, default=0.05, help='Share of rows repeating an earlier key')
+        parser.add_argument('--in-process', action='store_true', help='Run every size in this process')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON lines')
+        parser.add_argument('--keep', action='store_true', help='Keep the imported reports and jobs')
+        parser.add_argument('--max-rss-mb', type=float, help='Fail if any size peaks above this RSS')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be comma-separated integers')
+
+        results = []
+        for rows in sizes:
+            if options['in_process']:
+                result = self._run(rows, options)
+            else:
+                result = self._run_isolated(rows, options)
+            results.append(result)
+            if options['json']:
+                self.stdout.write(json.dumps(result))
+            else:
+                self._report(result)
+
+        over = [result for result in results if options['max_rss_mb'] and (result['peak_rss_mb'] or 0) > options['max_rss_mb']]
+        if over:
+            raise CommandError(', '.join(f"{result['rows']} rows peaked at {result['peak_rss_mb']}MB" for result in over)
+                               + f" (limit {options['max_rss_mb']}MB)")
+
+    def _run_isolated(self, rows, options):
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'bench_ingestion',
+            '--sizes', str(rows),
+            '--error-ratio', str(options['error_ratio']),
+            '--duplicate-ratio', str(options['duplicate_ratio']),
+            '--in-process', '--json',
+        ]
+        if options['keep']:
+            command.append('--keep')
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise CommandError(f'Benchmark of {rows} rows failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def _run(self, rows, options):
+        with tempfile.TemporaryDirectory() as directory:
+            # Compress when the plain file is over the upload limit, as a
+            # client would; raise the limits only if that isn't enough
+            path = os.path.join(directory, 'bench.csv')
+            size = self._write(path, rows, options)
+            limits = {}
+            if size > settings.UPLOAD_MAX_FILE_SIZE:
+                plain_size = size
+                path += '.gz'
+                size = self._write(path, rows, options)
+                if size > settings.UPLOAD_MAX_FILE_SIZE:
+                    limits['UPLOAD_MAX_FILE_SIZE'] = size
+                if plain_size > settings.UPLOAD_MAX_DECOMPRESSED_SIZE:
+                    limits['UPLOAD_MAX_DECOMPRESSED_SIZE'] = plain_size
+
+            # No DEBUG query log inflating peak RSS, and the anonymous
+            # client may profile
+            overrides = dict(limits, DEBUG=False, CSV_TASK_PROFILE_ON_REQUEST=True)
+            with open(path, 'rb') as upload, override_settings(**overrides):
+                result = self._upload(upload, rows)
+            result.update(file=os.path.basename(path), file_bytes=size, limits_raised=sorted(limits))
+
+        if not options['keep']:
+            self._clean_up(result['job_id'])
+        return result
+
+    def _write(self, path, rows, options):
+        return write_synthetic_csv(
+            path,
+            rows,
+            error_ratio=options['error_ratio'],
+            duplicate_ratio=options['duplicate_ratio'],
+            prefix=BENCH_PREFIX,
+            start_month=BENCH_START_MONTH,
+            months=BENCH_MONTHS,
+        )
+
+    def _upload(self, upload, rows):
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        request = RequestFactory().post('/api/reports/upload', {'file': upload, 'profile': 'timers'})
+        rss_before = peak_rss_mb()
+        eager = current_app.conf.task_always_eager
+        current_app.conf.task_always_eager = True
+        try:
+            with connection.execute_wrapper(count_query):
+                started = time.perf_counter()
+                # Unthrottled. throttle_classes is bound when the view class
+                # is defined, so overriding REST_FRAMEWORK wouldn't reach it
+                response = BulkUploadView.as_view(throttle_classes=[])(request)
+                elapsed = time.perf_counter() - started
+        finally:
+            current_app.conf.task_always_eager = eager
+
+        if response.status_code != 202:
+            raise CommandError(f'Upload of {rows} rows was rejected: {response.data}')
+        job = Job.objects.get(id=response.data['job_id'])
+        profile = job.profile or {}
+        return {
+            'rows': rows,
+            'job_id': str(job.id),
+            'status': job.status,
+            'successful_rows': job.successful_rows,
+            'failed_rows': job.failed_rows,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(rows / elapsed, 1),
+            'queries': queries,
+            'peak_rss_mb': peak_rss_mb(),
+            'rss_before_mb': rss_before,
+            'phases': {name: phase['seconds'] for name, phase in profile.get('phases', {}).items()},
+        }
+
+    def _clean_up(self, job_id):
+        # Month by month, so the report service's deltas stay small
+        first = month_key(BENCH_START_MONTH)
+        for key in range(first, first + BENCH_MONTHS):
+            delete_reports(Report.objects.filter(month_key=key, ngo_id__startswith=BENCH_PREFIX))
+        Job.objects.filter(id=job_id).delete()
+
+    def _report(self, result):
+        phases = ', '.join(f'{name} {seconds:.2f}s' for name, seconds in result['phases'].items())
+        self.stdout.write(
+            f"{result['rows']:>9} rows ({result['file']}, {result['file_bytes'] / 1024 / 1024:.1f}MB): "
+            f"{result['seconds']:.2f}s, {result['rows_per_second']:.0f} rows/s, "
+            f"{result['queries']} queries, peak RSS {result['peak_rss_mb']}MB, "
+            f"{result['successful_rows']} ok / {result['failed_rows']} failed, job {result['status']}"
+        )
+        if phases:
+            self.stdout.write(f'          phases: {phases}')
+        if result['limits_raised']:
+            self.stdout.write(self.style.WARNING(f"          raised for this run: {', '.join(result['limits_raised'])}"))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from reports.renderers import FastJSONRenderer, orjson
+
+from ._bench import large_payloads
+
+
+class Command(BaseCommand):
+    """
+    Benchmark JSON rendering of the large-payload endpoints (/api/reports
+    and /api/job-status with many errors) with the stdlib JSONRenderer and
+    FastJSONRenderer.
+    """
+    help = 'Compare JSONRenderer and FastJSONRenderer on large API payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Reports in the list payload')
+        parser.add_argument('--errors', type=int, default=10000, help='Error entries in the job payload')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per renderer (best is reported)')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed; FastJSONRenderer falls back to the stdlib'))
+
+        payloads = large_payloads(options['rows'], options['errors'])
+
+        for endpoint, data in payloads.items():
+            stdlib_output = JSONRenderer().render(data)
+            fast_output = FastJSONRenderer().render(data)
+            if stdlib_output != fast_output:
+                raise CommandError(f'{endpoint}: FastJSONRenderer output differs from JSONRenderer')
+
+            results = {}
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    renderer.render(data)
+                    timings.append(time.perf_counter() - started)
+                results[type(renderer).__name__] = min(timings)
+
+            speedup = results['JSONRenderer'] / results['FastJSONRenderer']
+            self.stdout.write(
+                f"{endpoint}: {len(stdlib_output) / 1024:.0f}KB, "
+                f"JSONRenderer {results['JSONRenderer'] * 1000:.1f}ms, "
+                f"FastJSONRenderer {results['FastJSONRenderer'] * 1000:.1f}ms ({speedup:.1f}x)"
+            )
+
+        self.stdout.write(self.style.SUCCESS('Identical output on all payloads'))
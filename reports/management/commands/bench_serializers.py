@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from reports.fast_serializers import ValuesSerializer
+from reports.models import Report
+from reports.serializers import ReportSerializer
+
+from ._bench import synthetic_reports
+
+
+class Command(BaseCommand):
+    """
+    Microbenchmark for the reports list: DRF ReportSerializer versus the
+    values() fast path. Rows are created inside a transaction that is rolled
+    back afterwards.
+    """
+    help = 'Compare ReportSerializer with the values() fast path on a synthetic table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Reports to serialize')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per serializer (best is reported)')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+        renderer = JSONRenderer()
+        fast_serializer = ValuesSerializer(ReportSerializer)
+
+        with transaction.atomic():
+            Report.objects.bulk_create(synthetic_reports(rows), batch_size=1000)
+            queryset = Report.objects.filter(ngo_id__startswith='BENCH')
+
+            def drf():
+                return renderer.render(ReportSerializer(queryset.all(), many=True).data)
+
+            def fast():
+                return renderer.render(fast_serializer.serialize(queryset.all()))
+
+            if drf() != fast():
+                raise CommandError('Fast path output differs from ReportSerializer output')
+
+            results = {}
+            for name, func in (('ReportSerializer', drf), ('ValuesSerializer', fast)):
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    func()
+                    timings.append(time.perf_counter() - started)
+                results[name] = min(timings)
+                self.stdout.write(f"{name:>18}: {results[name] * 1000:8.1f}ms for {rows} rows")
+
+            transaction.set_rollback(True)
+
+        speedup = results['ReportSerializer'] / results['ValuesSerializer']
+        self.stdout.write(self.style.SUCCESS(f"Identical JSON output, {speedup:.1f}x faster"))
@@ -0,0 +1,93 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+ROLES = ('full', 'api', 'worker')
+
+# What each kind of process does before it can serve its first request/task
+BOOT_SCRIPTS = {
+    'web': (
+        'from django.core.wsgi import get_wsgi_application\n'
+        'get_wsgi_application()\n'
+        'from django.urls import get_resolver\n'
+        'get_resolver().url_patterns\n'
+    ),
+    'worker': (
+        'import django\n'
+        'django.setup()\n'
+        'from ngo_impact_tracker.celery import app\n'
+        'app.loader.import_default_modules()\n'
+    ),
+}
+
+_IMPORTTIME_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+class Command(BaseCommand):
+    """
+    Cold-start benchmark for each process role (DJANGO_PROCESS_ROLE): boots
+    a fresh interpreter the way a gunicorn or Celery worker would, reports
+    the median wall time, and breaks the import time down by top-level
+    package using ``python -X importtime``.
+    """
+    help = 'Measure cold-start time and import cost per process role'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--roles', default=','.join(ROLES), help='Comma-separated roles to measure')
+        parser.add_argument('--runs', type=int, default=5, help='Timed boots per role (median is reported)')
+        parser.add_argument('--top', type=int, default=12, help='Packages to list per role')
+
+    def handle(self, *args, **options):
+        roles = [role.strip() for role in options['roles'].split(',') if role.strip()]
+        unknown = [role for role in roles if role not in ROLES]
+        if unknown:
+            raise CommandError(f"Unknown roles: {', '.join(unknown)}. Use {', '.join(ROLES)}")
+
+        for role in roles:
+            script = BOOT_SCRIPTS['worker' if role == 'worker' else 'web']
+            timings = [self._boot(role, script)[0] for _ in range(options['runs'])]
+            _, stderr = self._boot(role, script, importtime=True)
+            packages, total = self._import_breakdown(stderr)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{role}: median {statistics.median(timings) * 1000:.0f}ms over {len(timings)} boots, '
+                f'{total / 1000:.0f}ms in imports'
+            ))
+            for package, (microseconds, modules) in packages[:options['top']]:
+                self.stdout.write(f'  {package:<28} {microseconds / 1000:>8.1f}ms  {modules:>4} modules')
+
+    def _boot(self, role, script, importtime=False):
+        env = dict(os.environ, DJANGO_PROCESS_ROLE=role, DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'ngo_impact_tracker.settings'
+        ))
+        env.pop('API_DOCS', None)
+        command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', script]
+        started = time.perf_counter()
+        completed = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        if completed.returncode != 0:
+            raise CommandError(f'{role} boot failed:\n{completed.stderr[-2000:]}')
+        return elapsed, completed.stderr
+
+    def _import_breakdown(self, stderr):
+        """[(top-level package, (self microseconds, module count))] slowest first, and the total"""
+        packages = defaultdict(lambda: [0, 0])
+        total = 0
+        for line in stderr.splitlines():
+            match = _IMPORTTIME_RE.match(line)
+            if match is None:
+                continue
+            own = int(match.group(1))
+            package = packages[match.group(4).split('.')[0]]
+            package[0] += own
+            package[1] += 1
+            total += own
+        ranked = sorted(((name, tuple(stats)) for name, stats in packages.items()), key=lambda item: -item[1][0])
+        return ranked, total
@@ -0,0 +1,30 @@
+import os
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from reports import openapi
+
+
+class Command(BaseCommand):
+    """
+    Prebuild the OpenAPI schema artifacts served at /api/schema/ for the
+    current code version. Run it at deploy time so no request pays for
+    schema generation.
+    """
+    help = 'Generate the OpenAPI schema artifacts (JSON, YAML, precompressed) for this code version'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true', help='Remove artifacts of other code versions')
+
+    def handle(self, *args, **options):
+        if not apps.is_installed('drf_spectacular'):
+            raise CommandError('drf_spectacular is not installed (set API_DOCS=1)')
+
+        version = openapi.code_version()
+        for path in openapi.build_artifacts(version):
+            self.stdout.write(f'{path} ({os.path.getsize(path) / 1024:.1f}KB)')
+        if options['prune']:
+            for name in openapi.prune_artifacts(version):
+                self.stdout.write(f'removed {name}')
+        self.stdout.write(self.style.SUCCESS(f'Built the schema for code version {version}'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reports.months import is_valid_month
+
+from ._bench import write_synthetic_csv
+
+
+class Command(BaseCommand):
+    """
+    Write synthetic bulk-upload CSVs of any size, with a share of invalid
+    rows and of rows repeating an earlier (ngo_id, month) key.
+    """
+    help = 'Generate a synthetic reports CSV (.csv or .csv.gz) for upload testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output file; a .gz suffix compresses it')
+        parser.add_argument('--rows', type=int, default=1000, help='Data rows to write')
+        parser.add_argument('--error-ratio', type=float, default=0.0, help='Share of rows that fail validation')
+        parser.add_argument('--duplicate-ratio', type=float, default=0.0, help='Share of rows repeating an earlier key')
+        parser.add_argument('--start-month', default='2020-01', help='First month (YYYY-MM)')
+        parser.add_argument('--months', type=int, default=60, help='Months the keys are spread over')
+        parser.add_argument('--prefix', default='GEN', help='NGO ID prefix')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+
+    def handle(self, *args, **options):
+        if not is_valid_month(options['start_month']):
+            raise CommandError('--start-month must be in YYYY-MM format')
+        for ratio in ('error_ratio', 'duplicate_ratio'):
+            if not 0 <= options[ratio] <= 1:
+                raise CommandError(f"--{ratio.replace('_', '-')} must be between 0 and 1")
+
+        size = write_synthetic_csv(
+            options['path'],
+            options['rows'],
+            error_ratio=options['error_ratio'],
+            duplicate_ratio=options['duplicate_ratio'],
+            prefix=options['prefix'],
+            start_month=options['start_month'],
+            months=options['months'],
+            seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['rows']} rows to {options['path']} ({size / 1024:.0f}KB)"))
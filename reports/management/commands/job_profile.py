@@ -0,0 +1,40 @@
+import io
+import json
+import os
+import pstats
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reports.models import Job
+from reports.profiling import pstats_path
+
+
+class Command(BaseCommand):
+    """
+    Print the profiling summary stored on a job and, for 'cprofile' runs,
+    the most expensive functions from its pstats file.
+    """
+    help = 'Show the profile of a profiled CSV import job'
+
+    def add_arguments(self, parser):
+        parser.add_argument('job_id', help='Job UUID')
+        parser.add_argument('--sort', default='cumulative', help='pstats sort key (cumulative, tottime, ncalls, ...)')
+        parser.add_argument('--limit', type=int, default=30, help='Functions to list from the pstats file')
+
+    def handle(self, *args, **options):
+        job = Job.objects.filter(id=options['job_id']).first()
+        if job is None:
+            raise CommandError('Job not found')
+        if not job.profile:
+            raise CommandError("Job was not profiled; upload with profile=timers or profile=cprofile")
+
+        self.stdout.write(json.dumps(job.profile, indent=2))
+
+        if job.profile.get('pstats_file'):
+            path = pstats_path(str(job.id))
+            if not os.path.exists(path):
+                raise CommandError(f'pstats file {path} no longer exists')
+            output = io.StringIO()
+            stats = pstats.Stats(path, stream=output)
+            stats.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
+            self.stdout.write(f'\n{path}:{output.getvalue()}')
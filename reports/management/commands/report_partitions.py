@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from reports import partitions
+from reports.models import ReportArchive
+from reports.months import is_valid_month, month_from_key
+
+
+class Command(BaseCommand):
+    """
+    Manage time-partitioned report storage: convert the table to yearly
+    partitions (PostgreSQL), create upcoming partitions, and archive or
+    restore old months as gzip CSV files.
+    """
+    help = 'Partition, archive and restore report storage by month'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        convert = subparsers.add_parser('convert', help='Convert reports_report to a partitioned table (PostgreSQL)')
+        convert.add_argument('--years-ahead', type=int, default=1, help='Future years to create partitions for')
+
+        ensure = subparsers.add_parser('ensure', help='Create partitions for the current and upcoming years (PostgreSQL)')
+        ensure.add_argument('--years-ahead', type=int, default=1, help='Future years to create partitions for')
+
+        archive = subparsers.add_parser('archive', help='Archive and remove reports for months before a month')
+        archive.add_argument('--before', required=True, help='First month to keep (YYYY-MM)')
+
+        restore = subparsers.add_parser('restore', help='Load an archive back into the Report table')
+        restore.add_argument('archive_id', type=int, help='ReportArchive id (see the status action)')
+
+        subparsers.add_parser('status', help='Show partitions and archives')
+
+    def handle(self, *args, **options):
+        getattr(self, f"handle_{options['action']}")(**options)
+
+    def _require_postgresql(self):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                f'Native partitioning needs PostgreSQL (this database is {connection.vendor}); '
+                'month_key range queries use the month_key index instead'
+            )
+
+    def handle_convert(self, years_ahead, **options):
+        self._require_postgresql()
+        if partitions.convert_to_partitioned(years_ahead):
+            self.stdout.write(self.style.SUCCESS('Converted reports to a partitioned table'))
+        else:
+            self.stdout.write('Reports are already partitioned')
+
+    def handle_ensure(self, years_ahead, **options):
+        self._require_postgresql()
+        if not partitions.is_partitioned():
+            raise CommandError('Reports are not partitioned yet; run the convert action first')
+        this_year = timezone.now().year
+        partitions.ensure_partitions(range(this_year, this_year + years_ahead + 1))
+        self.stdout.write(self.style.SUCCESS(f'Partitions exist through {this_year + years_ahead}'))
+
+    def handle_archive(self, before, **options):
+        if not is_valid_month(before):
+            raise CommandError('--before must be a month in YYYY-MM format')
+        archives, dropped = partitions.archive(before)
+        for archive in archives:
+            self.stdout.write(f'Archived {archive.row_count} reports to {archive.file_name} ({archive.size_bytes} bytes)')
+        for name in dropped:
+            self.stdout.write(f'Dropped empty partition {name}')
+        if not archives:
+            self.stdout.write(f'No reports before {before}')
+
+    def handle_restore(self, archive_id, **options):
+        archive = ReportArchive.objects.filter(pk=archive_id).first()
+        if archive is None:
+            raise CommandError('Archive not found')
+        restored = partitions.restore(archive)
+        self.stdout.write(self.style.SUCCESS(f'Restored {restored} reports from {archive.file_name}'))
+
+    def handle_status(self, **options):
+        if partitions.is_partitioned():
+            for name, estimate in partitions.list_partitions():
+                self.stdout.write(f'{name}: ~{max(estimate, 0)} rows')
+        else:
+            self.stdout.write(f'Reports are not partitioned ({connection.vendor})')
+
+        for archive in ReportArchive.objects.all():
+            state = f'restored {archive.restored_at:%Y-%m-%d}' if archive.restored_at else 'archived'
+            self.stdout.write(
+                f'#{archive.pk} {month_from_key(archive.from_month_key)}..{month_from_key(archive.to_month_key)}: '
+                f'{archive.row_count} reports in {archive.file_name}, {state}'
+            )
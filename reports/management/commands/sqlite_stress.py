@@ -0,0 +1,124 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+from django.test import RequestFactory
+
+from reports.models import Report, Job
+from reports.services import delete_reports
+from reports.tasks import process_csv_upload
+from reports.views import DashboardView
+
+STRESS_PREFIX = 'STRESS'
+
+
+class Command(BaseCommand):
+    """
+    Concurrent read/write stress test for the SQLite deployment profile.
+    Runs a CSV import in one thread while several reader threads hit the
+    dashboard, then reports reader latency and lock errors.
+    """
+    help = 'Measure dashboard latency while a CSV import is running'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Rows in the synthetic import')
+        parser.add_argument('--readers', type=int, default=4, help='Concurrent dashboard reader threads')
+        parser.add_argument('--month', default='2024-01', help='Month the import and the dashboard use')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated reports afterwards')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        month = options['month']
+
+        journal_mode = 'n/a'
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+        self.stdout.write(f"Database vendor: {connection.vendor}, journal_mode: {journal_mode}")
+
+        lines = ['ngo_id,month,people_helped,events_conducted,funds_utilized']
+        lines.extend(
+            f'{STRESS_PREFIX}{i:07d},{month},{i % 500},{i % 20},{i % 1000}.50'
+            for i in range(rows)
+        )
+        file_content = '\n'.join(lines)
+        job = Job.objects.create(status='pending', file_name='sqlite_stress.csv')
+
+        done = threading.Event()
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        factory = RequestFactory()
+        # Unthrottled: the readers poll far faster than any client may.
+        # throttle_classes is bound when the view class is defined, so
+        # overriding REST_FRAMEWORK settings wouldn't reach it.
+        view = DashboardView.as_view(throttle_classes=[])
+
+        def reader():
+            try:
+                while not done.is_set():
+                    request = factory.get('/api/dashboard', {'month': month})
+                    started = time.perf_counter()
+                    try:
+                        response = view(request)
+                        response.render()
+                    except OperationalError as e:
+                        with lock:
+                            errors.append(str(e))
+                        continue
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        if response.status_code == 200:
+                            latencies.append(elapsed)
+                        else:
+                            errors.append(f'HTTP {response.status_code}')
+            finally:
+                close_old_connections()
+                connection.close()
+
+        threads = [threading.Thread(target=reader, daemon=True) for _ in range(options['readers'])]
+        for thread in threads:
+            thread.start()
+
+        started = time.perf_counter()
+        try:
+            process_csv_upload(str(job.id), file_content)
+        finally:
+            write_seconds = time.perf_counter() - started
+            done.set()
+            for thread in threads:
+                thread.join()
+
+        job.refresh_from_db()
+        self.stdout.write(
+            f"Import: {job.successful_rows}/{rows} rows in {write_seconds:.2f}s "
+            f"({rows / write_seconds:.0f} rows/s), job status {job.status}"
+        )
+
+        if latencies:
+            ordered = sorted(latencies)
+
+            def percentile(p):
+                return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+            self.stdout.write(
+                f"Dashboard: {len(ordered)} requests, "
+                f"p50 {statistics.median(ordered):.1f}ms, "
+                f"p95 {percentile(0.95):.1f}ms, "
+                f"p99 {percentile(0.99):.1f}ms, "
+                f"max {ordered[-1]:.1f}ms"
+            )
+        else:
+            self.stdout.write("Dashboard: no successful requests")
+
+        if errors:
+            self.stdout.write(self.style.ERROR(f"{len(errors)} reader errors, first: {errors[0]}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("No reader errors"))
+
+        if not options['keep']:
+            delete_reports(Report.objects.filter(ngo_id__startswith=STRESS_PREFIX))
+            job.delete()
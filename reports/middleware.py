@@ -0,0 +1,246 @@
+import re
+import uuid
+import zlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .log import request_id
+from .routers import _replica_reads, replica_alias
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+READ_PRIMARY_COOKIE = 'read_primary'
+READ_PRIMARY_HEADER = 'HTTP_X_READ_PRIMARY'
+
+RESPONSE_COMPRESSION_DEFAULTS = {
+    'MIN_SIZE': 1024,
+    # HTML is left out on purpose: admin pages carry CSRF tokens (BREACH)
+    'CONTENT_TYPES': [
+        'application/json',
+        'application/vnd.oai.openapi',
+        'application/vnd.oai.openapi+json',
+        'application/x-ndjson',
+        'text/csv',
+    ],
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
+REQUEST_ID_HEADER = 'HTTP_X_REQUEST_ID'
+_re_request_id = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+
+
+def parse_accept_encoding(accept_encoding):
+    """{coding: q-value} from an Accept-Encoding header; a malformed q-value counts as 0"""
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = item.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+@lru_cache(maxsize=256)
+def choose_encoding(accept_encoding, available):
+    """
+    The coding from available (a tuple, most preferred first) that the
+    client rates highest, or None. q=0 refuses a coding, and '*' stands for
+    any coding the header doesn't name.
+    """
+    qualities = parse_accept_encoding(accept_encoding)
+    best, best_quality = None, 0
+    for coding in available:
+        quality = qualities.get(coding, qualities.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CorrelationIdMiddleware:
+    """
+    Gives every request an ID for its log records (see reports/log.py):
+    the client's X-Request-ID when it is a plausible one, a new UUID
+    otherwise. The ID is echoed in the X-Request-ID response header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        incoming = request.META.get(REQUEST_ID_HEADER, '')
+        current = incoming if _re_request_id.fullmatch(incoming) else uuid.uuid4().hex
+        token = request_id.set(current)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id.reset(token)
+        response['X-Request-ID'] = current
+        return response
+
+
+class ReadReplicaMiddleware:
+    """
+    Enables replica reads for safe requests to views that set
+    ``read_from_replica = True``.
+
+    After a successful write to a view that sets ``pin_reads_to_primary =
+    True`` the client is pinned to the primary for READ_REPLICA_PIN_SECONDS
+    through a short-lived cookie, so it reads its own writes while the
+    replica catches up. Clients that don't keep cookies can send
+    ``X-Read-Primary: 1`` instead.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._replica_token = None
+        request._pin_reads_to_primary = False
+        try:
+            response = self.get_response(request)
+        finally:
+            if request._replica_token is not None:
+                _replica_reads.reset(request._replica_token)
+
+        if (
+            request._pin_reads_to_primary
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and replica_alias()
+        ):
+            response.set_cookie(
+                READ_PRIMARY_COOKIE,
+                '1',
+                max_age=getattr(settings, 'READ_REPLICA_PIN_SECONDS', 5),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        request._pin_reads_to_primary = getattr(view_class, 'pin_reads_to_primary', False)
+        if (
+            request.method in SAFE_METHODS
+            and getattr(view_class, 'read_from_replica', False)
+            and not self._pinned_to_primary(request)
+        ):
+            request._replica_token = _replica_reads.set(True)
+        return None
+
+    def _pinned_to_primary(self, request):
+        if request.META.get(READ_PRIMARY_HEADER, '').lower() in ('1', 'true', 'yes'):
+            return True
+        return READ_PRIMARY_COOKIE in request.COOKIES
+
+
+def _gzip_compressor(level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _brotli_compressor(quality):
+    compressor = brotli.Compressor(quality=quality)
+    return compressor.process, compressor.flush, compressor.finish
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with Brotli (when the brotli package is installed)
+    or gzip, based on the client's Accept-Encoding.
+
+    Only content types in RESPONSE_COMPRESSION['CONTENT_TYPES'] are touched,
+    and buffered responses smaller than MIN_SIZE go out as-is. Streaming
+    responses are compressed chunk by chunk and flushed after every chunk, so
+    clients still receive rows as they are produced.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = {**RESPONSE_COMPRESSION_DEFAULTS, **getattr(settings, 'RESPONSE_COMPRESSION', {})}
+        self.min_size = config['MIN_SIZE']
+        self.content_types = frozenset(config['CONTENT_TYPES'])
+        self.gzip_level = config['GZIP_LEVEL']
+        self.brotli_quality = config['BROTLI_QUALITY']
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.has_header('Content-Encoding') or response.status_code in (204, 304):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in self.content_types:
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = self.select_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        if encoding == 'br':
+            compress, flush, finish = _brotli_compressor(self.brotli_quality)
+        else:
+            compress, flush, finish = _gzip_compressor(self.gzip_level)
+
+        if response.streaming:
+            response.streaming_content = self._compress_stream(response, compress, flush, finish)
+            # The compressed size isn't known until the stream is done
+            del response.headers['Content-Length']
+        else:
+            compressed = compress(response.content) + finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The compressed body is a different representation, so a strong
+        # ETag becomes weak (RFC 9110 8.8.1); If-None-Match still matches it.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def select_encoding(self, accept_encoding):
+        return choose_encoding(accept_encoding, ('br', 'gzip') if brotli is not None else ('gzip',))
+
+    def _compress_stream(self, response, compress, flush, finish):
+        # Pull to local scope: streaming_content is replaced right after this
+        original = response.streaming_content
+
+        if response.is_async:
+            async def compressed():
+                async for chunk in original:
+                    data = compress(chunk) + flush()
+                    if data:
+                        yield data
+                yield finish()
+        else:
+            def compressed():
+                for chunk in original:
+                    data = compress(chunk) + flush()
+                    if data:
+                        yield data
+                yield finish()
+
+        return compressed()
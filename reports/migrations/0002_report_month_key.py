@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='month_key',
+            field=models.PositiveIntegerField(db_index=True, editable=False, help_text='Integer month key (year * 12 + month) used for range queries', null=True),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations, transaction
+
+from reports.months import LAST_MONTH_KEY, month_key
+
+BATCH_SIZE = 2000
+
+
+def unknown_month_key(pk):
+    """
+    Key for a row whose month is malformed (stored before month validation
+    covered CSV uploads), so the column can become NOT NULL. Each row gets
+    its own key past LAST_MONTH_KEY: an NGO may have several such rows, and
+    (ngo_id, month_key) becomes unique in 0012.
+    """
+    return LAST_MONTH_KEY + pk
+
+
+def backfill_month_keys(apps, schema_editor):
+    """Populate Report.month_key in primary-key order, one batch per transaction"""
+    Report = apps.get_model('reports', 'Report')
+    db_alias = schema_editor.connection.alias
+    last_pk = 0
+
+    while True:
+        batch = list(
+            Report.objects.using(db_alias)
+            .filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', 'month')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        for report in batch:
+            try:
+                report.month_key = month_key(report.month)
+            except ValueError:
+                report.month_key = unknown_month_key(report.pk)
+
+        with transaction.atomic(using=db_alias):
+            Report.objects.using(db_alias).bulk_update(batch, ['month_key'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own so a large table isn't rewritten in one
+    # long-running transaction.
+    atomic = False
+
+    dependencies = [
+        ('reports', '0002_report_month_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_month_keys, migrations.RunPython.noop),
+    ]
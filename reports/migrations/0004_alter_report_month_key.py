@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_backfill_report_month_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='report',
+            name='month_key',
+            field=models.PositiveIntegerField(db_index=True, editable=False, help_text='Integer month key (year * 12 + month) used for range queries'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_alter_report_month_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_key', models.PositiveIntegerField(help_text='Integer month key (year * 12 + month)', unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0, help_text='Incremented on every change to the month')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['month_key'],
+            },
+        ),
+    ]
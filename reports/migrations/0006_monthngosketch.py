@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0005_monthversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthNgoSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_key', models.PositiveIntegerField(help_text='Integer month key (year * 12 + month)', unique=True)),
+                ('registers', models.BinaryField(help_text='HyperLogLog registers')),
+                ('stale', models.BooleanField(default=False, help_text='Reports were deleted; rebuild before use')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['month_key'],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+from reports.hll import HyperLogLog
+
+
+def build_sketches(apps, schema_editor):
+    """Build one sketch per month from the existing reports, streaming them in month order"""
+    Report = apps.get_model('reports', 'Report')
+    MonthNgoSketch = apps.get_model('reports', 'MonthNgoSketch')
+    db_alias = schema_editor.connection.alias
+
+    rows = (
+        Report.objects.using(db_alias)
+        .order_by('month_key')
+        .values_list('month_key', 'ngo_id')
+        .iterator(chunk_size=2000)
+    )
+    current_key, hll = None, None
+    for month_key, ngo_id in rows:
+        if month_key != current_key:
+            if hll is not None:
+                MonthNgoSketch.objects.using(db_alias).create(month_key=current_key, registers=hll.to_bytes())
+            current_key, hll = month_key, HyperLogLog()
+        hll.add(ngo_id)
+    if hll is not None:
+        MonthNgoSketch.objects.using(db_alias).create(month_key=current_key, registers=hll.to_bytes())
+
+
+def remove_sketches(apps, schema_editor):
+    MonthNgoSketch = apps.get_model('reports', 'MonthNgoSketch')
+    MonthNgoSketch.objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0006_monthngosketch'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_sketches, remove_sketches),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0007_backfill_month_ngo_sketches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_key', models.PositiveIntegerField(help_text='Integer month key (year * 12 + month)', unique=True)),
+                ('report_count', models.PositiveIntegerField(default=0, help_text='Reports in the month')),
+                ('people_helped', models.PositiveBigIntegerField(default=0, help_text='Total people helped in the month')),
+                ('events_conducted', models.PositiveBigIntegerField(default=0, help_text='Total events conducted in the month')),
+                ('funds_utilized', models.DecimalField(decimal_places=2, default=0, help_text='Total funds utilized in the month', max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['month_key'],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def build_rollups(apps, schema_editor):
+    """One GROUP BY over existing reports seeds every month's totals"""
+    Report = apps.get_model('reports', 'Report')
+    MonthlyRollup = apps.get_model('reports', 'MonthlyRollup')
+    db_alias = schema_editor.connection.alias
+
+    totals = (
+        Report.objects.using(db_alias)
+        .order_by()
+        .values('month_key')
+        .annotate(
+            report_count=Count('id'),
+            total_people=Sum('people_helped'),
+            total_events=Sum('events_conducted'),
+            total_funds=Sum('funds_utilized'),
+        )
+    )
+    MonthlyRollup.objects.using(db_alias).bulk_create(
+        [
+            MonthlyRollup(
+                month_key=row['month_key'],
+                report_count=row['report_count'],
+                people_helped=row['total_people'],
+                events_conducted=row['total_events'],
+                funds_utilized=row['total_funds'],
+            )
+            for row in totals
+        ],
+        batch_size=500,
+    )
+
+
+def remove_rollups(apps, schema_editor):
+    MonthlyRollup = apps.get_model('reports', 'MonthlyRollup')
+    MonthlyRollup.objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0008_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_rollups, remove_rollups),
+    ]
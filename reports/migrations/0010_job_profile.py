@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0009_backfill_monthly_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='profile',
+            field=models.JSONField(blank=True, help_text='Profiling summary, when the import was profiled', null=True),
+        ),
+    ]
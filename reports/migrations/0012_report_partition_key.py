@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:43
+
+from django.db import migrations, models
+from django.db.models import F
+
+from reports.months import LAST_MONTH_KEY
+
+
+def rekey_unknown_months(apps, schema_editor):
+    """
+    Give each row an earlier 0003 left at month_key 0 (a malformed month)
+    its own key past LAST_MONTH_KEY, as 0003 now does, so the unique
+    constraint below holds for NGOs with several such rows.
+    """
+    Report = apps.get_model('reports', 'Report')
+    Report.objects.using(schema_editor.connection.alias).filter(month_key=0).update(month_key=LAST_MONTH_KEY + F('pk'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0011_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_month_key', models.PositiveIntegerField(help_text='First archived month key (inclusive)')),
+                ('to_month_key', models.PositiveIntegerField(help_text='Last archived month key (inclusive)')),
+                ('file_name', models.CharField(help_text='File in REPORT_ARCHIVE_DIR', max_length=255)),
+                ('row_count', models.PositiveBigIntegerField(default=0)),
+                ('size_bytes', models.PositiveBigIntegerField(default=0)),
+                ('sha256', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('restored_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['from_month_key'],
+            },
+        ),
+        migrations.RunPython(rekey_unknown_months, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='report',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='report',
+            constraint=models.UniqueConstraint(fields=('ngo_id', 'month_key'), name='report_ngo_month_key_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='reportarchive',
+            constraint=models.UniqueConstraint(fields=('from_month_key', 'to_month_key'), name='report_archive_range_uniq'),
+        ),
+    ]
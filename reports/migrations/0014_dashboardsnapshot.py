@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0013_job_intake'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_month_key', models.PositiveIntegerField(help_text='First month key of the range (inclusive)')),
+                ('to_month_key', models.PositiveIntegerField(help_text='Last month key of the range (inclusive)')),
+                ('fingerprint', models.CharField(help_text="Digest of the range's month versions when computed", max_length=40)),
+                ('total_ngos_reporting', models.PositiveIntegerField(default=0)),
+                ('total_people_helped', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('total_events_conducted', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('total_funds_utilized', models.DecimalField(blank=True, decimal_places=2, max_digits=18, null=True)),
+                ('compute_ms', models.FloatField(default=0, help_text='Time the aggregation took, in milliseconds')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['from_month_key', 'to_month_key'],
+                'constraints': [models.UniqueConstraint(fields=('from_month_key', 'to_month_key'), name='dashboard_snapshot_range_uniq')],
+            },
+        ),
+    ]
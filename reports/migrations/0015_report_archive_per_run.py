@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0014_dashboardsnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='reportarchive',
+            options={'ordering': ['from_month_key', 'created_at']},
+        ),
+        migrations.RemoveConstraint(
+            model_name='reportarchive',
+            name='report_archive_range_uniq',
+        ),
+        migrations.AlterField(
+            model_name='reportarchive',
+            name='file_name',
+            field=models.CharField(help_text='File in REPORT_ARCHIVE_DIR', max_length=255, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='reportarchive',
+            index=models.Index(fields=['from_month_key', 'to_month_key'], name='report_archive_range_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0015_report_archive_per_run'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='task_kwargs',
+            field=models.JSONField(blank=True, help_text='Import task arguments of a deferred job, kept until the import starts', null=True),
+        ),
+    ]
@@ -1,15 +1,28 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Sum, Value, When
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+import hashlib
+import time
 import uuid
+from .hll import HyperLogLog
+from .months import MONTH_FORMAT_ERROR, is_valid_month, month_key as compute_month_key
 
 class Report(models.Model):
     """
     Model to store monthly NGO reports.
     Ensures idempotency with unique constraint on ngo_id + month.
+    On PostgreSQL the table can be range-partitioned by month_key and old
+    years archived (see reports/partitions.py).
     """
     ngo_id = models.CharField(max_length=100, help_text="NGO identifier")
     month = models.CharField(max_length=7, help_text="Report month in YYYY-MM format")
+    month_key = models.PositiveIntegerField(
+        db_index=True,
+        editable=False,
+        help_text="Integer month key (year * 12 + month) used for range queries"
+    )
     people_helped = models.PositiveIntegerField(
         validators=[MinValueValidator(0)],
         help_text="Number of people helped this month"
@@ -24,28 +37,32 @@ class Report(models.Model):
         validators=[MinValueValidator(0)],
         help_text="Amount of funds utilized this month"
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        # Ensure one report per NGO per month (idempotency)
-        unique_together = ['ngo_id', 'month']
+        # Ensure one report per NGO per month (idempotency). The constraint
+        # is on month_key rather than month because a table partitioned by
+        # month_key can only enforce uniqueness over the partition key.
+        constraints = [
+            models.UniqueConstraint(fields=['ngo_id', 'month_key'], name='report_ngo_month_key_uniq'),
+        ]
         ordering = ['-created_at']
 
     def clean(self):
         """Validate month format"""
         super().clean()
+        if self.month and not is_valid_month(self.month):
+            raise ValidationError({'month': MONTH_FORMAT_ERROR})
+
+    def save(self, *args, **kwargs):
+        """Keep month_key in sync with month"""
         if self.month:
-            try:
-                year, month = self.month.split('-')
-                if len(year) != 4 or len(month) != 2:
-                    raise ValueError
-                if not (1 <= int(month) <= 12):
-                    raise ValueError
-            except (ValueError, IndexError):
-                raise ValidationError({
-                    'month': 'Month must be in YYYY-MM format (e.g., 2024-01)'
-                })
+            self.month_key = compute_month_key(self.month)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'month' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'month_key'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.ngo_id} - {self.month}"
@@ -57,6 +74,7 @@ class Job(models.Model):
     """
     
     STATUS_CHOICES = [
+        ('deferred', 'Deferred'),
         ('pending', 'Pending'),
         ('processing', 'Processing'),
         ('completed', 'Completed'),
@@ -70,16 +88,23 @@ class Job(models.Model):
     successful_rows = models.PositiveIntegerField(default=0, help_text="Successfully processed rows")
     failed_rows = models.PositiveIntegerField(default=0, help_text="Failed rows")
     error_details = models.JSONField(default=list, blank=True, help_text="List of errors encountered")
+    profile = models.JSONField(null=True, blank=True, help_text="Profiling summary, when the import was profiled")
     file_name = models.CharField(max_length=255, blank=True, help_text="Original filename")
-    created_at = models.DateTimeField(auto_now_add=True)
+    task_kwargs = models.JSONField(null=True, blank=True, help_text="Import task arguments of a deferred job, kept until the import starts")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Admin status filter, newest first
+            models.Index(fields=['status', '-created_at'], name='job_status_created_idx'),
+        ]
 
     @property
-    def progress_percentage(self):
+    def progress_percentage(self) -> float:
         """Calculate processing progress as percentage"""
         if self.total_rows == 0:
             return 0
@@ -87,3 +112,286 @@ class Job(models.Model):
 
     def __str__(self):
         return f"Job {self.id} - {self.status}"
+
+
+class MonthVersion(models.Model):
+    """
+    Per-month data version, bumped whenever a report for that month is
+    written or deleted. Used to build cheap ETags for dashboard responses.
+    """
+    month_key = models.PositiveIntegerField(unique=True, help_text="Integer month key (year * 12 + month)")
+    version = models.PositiveBigIntegerField(default=0, help_text="Incremented on every change to the month")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['month_key']
+
+    @classmethod
+    def bump(cls, month_keys):
+        """Increment the version of every month in month_keys (two queries however many months)"""
+        keys = set(month_keys)
+        if not keys:
+            return
+        # Missing months start at 0, so the update below takes every month to >= 1
+        cls.objects.bulk_create([cls(month_key=key) for key in keys], ignore_conflicts=True)
+        cls.objects.filter(month_key__in=keys).update(version=F('version') + 1, updated_at=timezone.now())
+
+    def __str__(self):
+        return f"Month {self.month_key} - v{self.version}"
+
+
+class MonthNgoSketch(models.Model):
+    """
+    HyperLogLog sketch of the NGOs reporting in a month. Sketches merge
+    across months, giving approximate distinct-NGO counts for any range
+    without scanning reports.
+    """
+    month_key = models.PositiveIntegerField(unique=True, help_text="Integer month key (year * 12 + month)")
+    registers = models.BinaryField(help_text="HyperLogLog registers")
+    stale = models.BooleanField(default=False, help_text="Reports were deleted; rebuild before use")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['month_key']
+
+    @classmethod
+    def add(cls, ngo_ids_by_month):
+        """Add NGOs to the sketches of several months ({month_key: ngo_ids})"""
+        if not ngo_ids_by_month:
+            return
+        with transaction.atomic():
+            sketches = {
+                sketch.month_key: sketch
+                for sketch in cls.objects.select_for_update().filter(month_key__in=ngo_ids_by_month)
+            }
+            now = timezone.now()
+            to_create = []
+            for month_key, ngo_ids in ngo_ids_by_month.items():
+                sketch = sketches.get(month_key)
+                hll = HyperLogLog(sketch.registers if sketch else None)
+                hll.update(ngo_ids)
+                if sketch is None:
+                    to_create.append(cls(month_key=month_key, registers=hll.to_bytes()))
+                elif hll.registers != sketch.registers:
+                    # One UPDATE per changed sketch; bulk_update's CASE
+                    # expression over 4KB values is far slower
+                    cls.objects.filter(pk=sketch.pk).update(registers=hll.to_bytes(), updated_at=now)
+            cls.objects.bulk_create(to_create)
+
+    @classmethod
+    def mark_stale(cls, month_keys):
+        """Sketches can't forget NGOs, so a deletion flags its month for a rebuild"""
+        cls.objects.filter(month_key__in=month_keys, stale=False).update(stale=True)
+
+    @staticmethod
+    def _sketch_reports(month_key):
+        hll = HyperLogLog()
+        hll.update(Report.objects.filter(month_key=month_key).values_list('ngo_id', flat=True).iterator())
+        return hll
+
+    @classmethod
+    def rebuild(cls, month_key):
+        """Recompute a month's sketch from its reports"""
+        cls.objects.filter(month_key=month_key).update(stale=False)
+        hll = cls._sketch_reports(month_key)
+        cls.objects.update_or_create(month_key=month_key, defaults={'registers': hll.to_bytes()})
+
+    @classmethod
+    def rebuild_stale(cls):
+        """Rebuild every stale sketch (the rebuild_ngo_sketches task); returns how many"""
+        month_keys = list(cls.objects.filter(stale=True).values_list('month_key', flat=True))
+        for month_key in month_keys:
+            cls.rebuild(month_key)
+        return len(month_keys)
+
+    @classmethod
+    def estimate(cls, from_key, to_key):
+        """
+        Approximate number of distinct NGOs reporting between two month keys.
+        Read-only (it may run on the replica): a stale month is sketched from
+        its reports in memory until rebuild_stale() catches up.
+        """
+        sketches = cls.objects.filter(month_key__gte=from_key, month_key__lte=to_key)
+        hll = HyperLogLog()
+        hll.merge(*(
+            cls._sketch_reports(month_key) if stale else registers
+            for month_key, registers, stale in sketches.values_list('month_key', 'registers', 'stale')
+        ))
+        return hll.estimate()
+
+    def __str__(self):
+        return f"NGO sketch for month {self.month_key}"
+
+
+class MonthlyRollup(models.Model):
+    """
+    Running per-month totals over all reports, kept up to date from the
+    report write service's deltas instead of being recomputed.
+    """
+    month_key = models.PositiveIntegerField(unique=True, help_text="Integer month key (year * 12 + month)")
+    report_count = models.PositiveIntegerField(default=0, help_text="Reports in the month")
+    people_helped = models.PositiveBigIntegerField(default=0, help_text="Total people helped in the month")
+    events_conducted = models.PositiveBigIntegerField(default=0, help_text="Total events conducted in the month")
+    funds_utilized = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=0,
+        help_text="Total funds utilized in the month"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['month_key']
+
+    @classmethod
+    def apply(cls, changes):
+        """
+        Add MonthChanges (which may be negative) to the totals of several
+        months ({month_key: MonthChange}) with a single UPDATE.
+        """
+        if not changes:
+            return
+        cls.objects.bulk_create([cls(month_key=key) for key in changes], ignore_conflicts=True)
+
+        cls.objects.filter(month_key__in=changes).update(
+            **{
+                name: F(name) + Case(
+                    *(When(month_key=key, then=Value(getattr(change, name))) for key, change in changes.items()),
+                    default=Value(0),
+                    output_field=cls._meta.get_field(name),
+                )
+                for name in ('report_count', 'people_helped', 'events_conducted', 'funds_utilized')
+            },
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def recompute(cls, month_keys):
+        """
+        Recount the totals of month_keys from the reports, for writes whose
+        previous values aren't known (see services._native_upsert).
+        """
+        totals = {
+            row['month_key']: row
+            for row in Report.objects.filter(month_key__in=month_keys)
+            .order_by()
+            .values('month_key')
+            .annotate(
+                report_count=Count('id'),
+                total_people=Sum('people_helped'),
+                total_events=Sum('events_conducted'),
+                total_funds=Sum('funds_utilized'),
+            )
+        }
+        for key in month_keys:
+            row = totals.get(key, {})
+            cls.objects.update_or_create(month_key=key, defaults={
+                'report_count': row.get('report_count', 0),
+                'people_helped': row.get('total_people') or 0,
+                'events_conducted': row.get('total_events') or 0,
+                'funds_utilized': row.get('total_funds') or 0,
+            })
+
+    def __str__(self):
+        return f"Rollup for month {self.month_key}"
+
+
+class DashboardSnapshot(models.Model):
+    """
+    Precomputed exact dashboard totals for a month range (no NGO filter),
+    written ahead of demand by the warm_dashboard_snapshots task. A snapshot
+    is valid while its fingerprint matches the range's MonthVersions.
+    Sums are null for a range without reports, as the live aggregate is.
+    """
+    from_month_key = models.PositiveIntegerField(help_text="First month key of the range (inclusive)")
+    to_month_key = models.PositiveIntegerField(help_text="Last month key of the range (inclusive)")
+    fingerprint = models.CharField(max_length=40, help_text="Digest of the range's month versions when computed")
+    total_ngos_reporting = models.PositiveIntegerField(default=0)
+    total_people_helped = models.PositiveBigIntegerField(null=True, blank=True)
+    total_events_conducted = models.PositiveBigIntegerField(null=True, blank=True)
+    total_funds_utilized = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
+    compute_ms = models.FloatField(default=0, help_text="Time the aggregation took, in milliseconds")
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['from_month_key', 'to_month_key']
+        constraints = [
+            models.UniqueConstraint(fields=['from_month_key', 'to_month_key'], name='dashboard_snapshot_range_uniq'),
+        ]
+
+    @staticmethod
+    def fingerprint_of(versions):
+        """Digest of (month_key, version) pairs, ordered by month_key"""
+        digest = hashlib.sha1()
+        for key, version in versions:
+            digest.update(f'{key}:{version};'.encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def month_versions(from_key, to_key):
+        return list(
+            MonthVersion.objects.filter(month_key__gte=from_key, month_key__lte=to_key)
+            .order_by('month_key')
+            .values_list('month_key', 'version')
+        )
+
+    @classmethod
+    def lookup(cls, from_key, to_key, versions):
+        """The snapshot for the range if it is current for versions, else None"""
+        return cls.objects.filter(
+            from_month_key=from_key, to_month_key=to_key, fingerprint=cls.fingerprint_of(versions)
+        ).first()
+
+    @classmethod
+    def refresh(cls, from_key, to_key):
+        """
+        Recompute the range's snapshot unless it is already current; returns
+        it, or None when it was current. Versions are read before the
+        aggregate, so a write landing in between only leaves the snapshot
+        stale, never wrong.
+        """
+        fingerprint = cls.fingerprint_of(cls.month_versions(from_key, to_key))
+        if cls.objects.filter(from_month_key=from_key, to_month_key=to_key, fingerprint=fingerprint).exists():
+            return None
+        started = time.perf_counter()
+        totals = Report.objects.filter(month_key__gte=from_key, month_key__lte=to_key).aggregate(
+            total_ngos_reporting=Count('ngo_id', distinct=True),
+            total_people_helped=Sum('people_helped'),
+            total_events_conducted=Sum('events_conducted'),
+            total_funds_utilized=Sum('funds_utilized'),
+        )
+        compute_ms = (time.perf_counter() - started) * 1000
+        snapshot, _ = cls.objects.update_or_create(
+            from_month_key=from_key,
+            to_month_key=to_key,
+            defaults=dict(totals, fingerprint=fingerprint, compute_ms=round(compute_ms, 2), computed_at=timezone.now()),
+        )
+        return snapshot
+
+    def __str__(self):
+        return f"Dashboard snapshot {self.from_month_key}-{self.to_month_key}"
+
+
+class ReportArchive(models.Model):
+    """
+    A range of months whose reports were exported to a gzip CSV file and
+    removed from the Report table. Archiving a range again (late reports)
+    adds another archive with its own file.
+    """
+    from_month_key = models.PositiveIntegerField(help_text="First archived month key (inclusive)")
+    to_month_key = models.PositiveIntegerField(help_text="Last archived month key (inclusive)")
+    file_name = models.CharField(max_length=255, unique=True, help_text="File in REPORT_ARCHIVE_DIR")
+    row_count = models.PositiveBigIntegerField(default=0)
+    size_bytes = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    restored_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['from_month_key', 'created_at']
+        indexes = [
+            models.Index(fields=['from_month_key', 'to_month_key'], name='report_archive_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archive {self.file_name} ({self.row_count} reports)"
@@ -0,0 +1,43 @@
+"""
+Shared parsing for report months.
+
+Months travel through the API as ``YYYY-MM`` strings. Internally they are
+compared and grouped as integer keys (``year * 12 + month``), which are
+contiguous, so ``key + 1`` is always the following month and a range of
+months is a plain integer range.
+"""
+import re
+from functools import lru_cache
+
+MONTH_FORMAT_ERROR = 'Month must be in YYYY-MM format (e.g., 2024-01)'
+
+_MONTH_RE = re.compile(r'([0-9]{4})-(0[1-9]|1[0-2])')
+
+# Key of 9999-12, the last month; no valid month has a key above it. Legacy
+# rows whose month could not be parsed are keyed past it, one key per row
+# (see migration 0003), so they stay out of every month range.
+LAST_MONTH_KEY = 9999 * 12 + 12
+
+
+@lru_cache(maxsize=4096)
+def month_key(value):
+    """Convert a YYYY-MM string to its integer key, raising ValueError if invalid"""
+    match = _MONTH_RE.fullmatch(value) if isinstance(value, str) else None
+    if match is None:
+        raise ValueError(MONTH_FORMAT_ERROR)
+    return int(match.group(1)) * 12 + int(match.group(2))
+
+
+def is_valid_month(value):
+    """Check whether value is a valid YYYY-MM month"""
+    try:
+        month_key(value)
+    except ValueError:
+        return False
+    return True
+
+
+def month_from_key(key):
+    """Convert an integer month key back to its YYYY-MM string"""
+    year, month_index = divmod(key - 1, 12)
+    return f'{year:04d}-{month_index + 1:02d}'
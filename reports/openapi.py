@@ -0,0 +1,193 @@
+"""
+Prebuilt OpenAPI schema.
+
+Generating the schema introspects every view and serializer, so it is done
+once per code version instead of on every request. build_artifacts()
+renders the JSON and YAML documents with their gzip (and, when the brotli
+package is installed, Brotli) variants into OPENAPI_SCHEMA_DIR, named after
+the code version. schema_view serves them from memory with a strong ETag,
+picking the precompressed body the client accepts; an artifact missing for
+the current version is built on first use.
+
+The code version is settings.CODE_VERSION (e.g. the deployed commit) or,
+when that's unset, a digest of the project's Python sources and the
+versions of the packages that shape the schema.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from .conditional import etag_matches
+from .middleware import brotli, choose_encoding
+
+FORMATS = {
+    'json': 'application/vnd.oai.openapi+json',
+    'yaml': 'application/vnd.oai.openapi',
+}
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+_cache = {}
+_lock = threading.Lock()
+
+
+class SchemaArtifact(NamedTuple):
+    """One rendered schema document and its precompressed variants ({encoding: body})"""
+    body: bytes
+    etag: str
+    encoded: dict
+
+
+def _source_digest():
+    digest = hashlib.sha256()
+    roots = {Path(config.path) for config in apps.get_app_configs() if Path(config.path).is_relative_to(settings.BASE_DIR)}
+    roots.add(Path(settings.BASE_DIR) / settings.ROOT_URLCONF.split('.')[0])
+    for root in sorted(roots):
+        for path in sorted(root.rglob('*.py')):
+            digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+            digest.update(path.read_bytes())
+    return digest
+
+
+@lru_cache(maxsize=None)
+def _source_version():
+    import django
+    import drf_spectacular
+    import rest_framework
+
+    digest = _source_digest()
+    for module in (django, rest_framework, drf_spectacular):
+        digest.update(f'{module.__name__}=={module.__version__}'.encode())
+    digest.update(repr(sorted(settings.SPECTACULAR_SETTINGS.items())).encode())
+    return digest.hexdigest()[:16]
+
+
+def code_version():
+    """settings.CODE_VERSION, or a digest of the code the schema is generated from"""
+    return getattr(settings, 'CODE_VERSION', None) or _source_version()
+
+
+def artifact_path(version, fmt, encoding=None):
+    name = f'schema-{version}.{fmt}' + (ENCODINGS[encoding] if encoding else '')
+    return os.path.join(settings.OPENAPI_SCHEMA_DIR, name)
+
+
+def generate():
+    """Render the schema as {format: bytes}, as SpectacularAPIView would"""
+    from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+    from drf_spectacular.settings import spectacular_settings
+
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(urlconf=spectacular_settings.SERVE_URLCONF)
+    schema = generator.get_schema(request=None, public=spectacular_settings.SERVE_PUBLIC)
+    return {
+        'json': OpenApiJsonRenderer().render(schema, renderer_context={}),
+        'yaml': OpenApiYamlRenderer().render(schema, renderer_context={}),
+    }
+
+
+def _write(path, data):
+    # Atomic, so a process loading artifacts never sees a partial file
+    with open(f'{path}.part', 'wb') as artifact_file:
+        artifact_file.write(data)
+    os.replace(f'{path}.part', path)
+
+
+def build_artifacts(version=None):
+    """Generate and write every artifact for version; returns the paths written"""
+    version = version or code_version()
+    os.makedirs(settings.OPENAPI_SCHEMA_DIR, exist_ok=True)
+    written = []
+    for fmt, body in generate().items():
+        variants = {None: body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(body, quality=11)
+        for encoding, data in variants.items():
+            path = artifact_path(version, fmt, encoding)
+            _write(path, data)
+            written.append(path)
+    return written
+
+
+def prune_artifacts(version=None):
+    """Remove artifacts of every other code version; returns the paths removed"""
+    keep = f'schema-{version or code_version()}.'
+    removed = []
+    if os.path.isdir(settings.OPENAPI_SCHEMA_DIR):
+        for name in os.listdir(settings.OPENAPI_SCHEMA_DIR):
+            if name.startswith('schema-') and not name.startswith(keep):
+                os.remove(os.path.join(settings.OPENAPI_SCHEMA_DIR, name))
+                removed.append(name)
+    return removed
+
+
+def _read(version, fmt):
+    try:
+        with open(artifact_path(version, fmt), 'rb') as artifact_file:
+            body = artifact_file.read()
+    except FileNotFoundError:
+        return None
+    encoded = {}
+    for encoding in ENCODINGS:
+        try:
+            with open(artifact_path(version, fmt, encoding), 'rb') as artifact_file:
+                encoded[encoding] = artifact_file.read()
+        except FileNotFoundError:
+            pass
+    return SchemaArtifact(body, f'"{hashlib.sha256(body).hexdigest()[:32]}"', encoded)
+
+
+def get_artifact(fmt):
+    """The current version's artifact for fmt, loading (or building) it on first use"""
+    version = code_version()
+    artifact = _cache.get((version, fmt))
+    if artifact is None:
+        with _lock:
+            artifact = _cache.get((version, fmt)) or _read(version, fmt)
+            if artifact is None:
+                build_artifacts(version)
+                artifact = _read(version, fmt)
+            _cache[(version, fmt)] = artifact
+    return artifact
+
+
+def _requested_format(request):
+    fmt = request.GET.get('format')
+    if fmt in FORMATS:
+        return fmt
+    return 'json' if 'json' in request.META.get('HTTP_ACCEPT', '') else 'yaml'
+
+
+@require_safe
+def schema_view(request):
+    """
+    GET /api/schema/ - the OpenAPI document, YAML by default; JSON with
+    ?format=json or an Accept header asking for JSON.
+    """
+    fmt = _requested_format(request)
+    artifact = get_artifact(fmt)
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    encoding = choose_encoding(accept_encoding, tuple(coding for coding in ENCODINGS if coding in artifact.encoded))
+    # Compressed bodies are different representations: weak ETags, as
+    # CompressionMiddleware does
+    etag = f'W/{artifact.etag}' if encoding else artifact.etag
+
+    if etag_matches(request, artifact.etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(artifact.encoded[encoding] if encoding else artifact.body, content_type=FORMATS[fmt])
+        response['Content-Disposition'] = f'inline; filename="schema.{fmt}"'
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+    return response
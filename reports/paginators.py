@@ -0,0 +1,42 @@
+"""
+Paginators for admin changelists over tables too large to COUNT(*).
+"""
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+
+def estimated_row_count(model, using='default'):
+    """
+    Cheap estimate of a table's size: the planner's statistics on
+    PostgreSQL, the highest integer primary key elsewhere. None when no
+    estimate is available (e.g. UUID keys or a never-analyzed table).
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+            row = cursor.fetchone()
+        return row[0] if row and row[0] >= 0 else None
+    if isinstance(model._meta.pk, models.AutoField | models.BigAutoField | models.SmallAutoField):
+        return model._base_manager.using(using).aggregate(highest=Max('pk'))['highest'] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Unfiltered lists report the table's estimated size once it exceeds
+    count_limit; filtered lists count at most count_limit rows, so the
+    last pages of a huge result are reached by narrowing the filter.
+    """
+    count_limit = 100_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.count_limit:
+                return estimate
+        return queryset.order_by()[:self.count_limit].count()
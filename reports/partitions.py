@@ -0,0 +1,351 @@
+"""
+Time-partitioned Report storage and archival of old months.
+
+On PostgreSQL, convert_to_partitioned() turns reports_report into a table
+range-partitioned by month_key with one partition per year (plus a default
+partition), so queries filtered on month_key (the dashboard, the report
+list) only touch the years they ask for and each year's unique index stays
+small. ensure_partitions() creates the partitions for upcoming years.
+
+On other backends the table stays a single table; month_key range queries
+are served by its index, which gives the same pruning for reads.
+
+archive() works on every backend: it streams the reports of old months to
+one gzip CSV per year in REPORT_ARCHIVE_DIR, records a ReportArchive and
+deletes the rows through the report service (so versions, sketches and
+rollups follow), holding the rows locked from export to delete. Every run
+writes new files, so archiving a range again (say after late reports for
+it arrived) never touches an earlier archive. On PostgreSQL, yearly
+partitions left empty are dropped. restore() loads an archive back, with
+its original timestamps, skipping reports written again since.
+"""
+import csv
+import gzip
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Report, ReportArchive
+from .months import LAST_MONTH_KEY, month_from_key, month_key
+from .services import METRIC_FIELDS, delete_reports, save_reports
+
+ARCHIVE_COLUMNS = ['ngo_id', 'month', *METRIC_FIELDS, 'created_at', 'updated_at']
+
+TABLE = Report._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+# Archived rows deleted per delete_reports call
+DELETE_CHUNK = 2000
+
+
+def year_bounds(year):
+    """(first, last) month keys of a year"""
+    return year * 12 + 1, year * 12 + 12
+
+
+def year_of_key(key):
+    return (key - 1) // 12
+
+
+def partition_name(year):
+    return f'{TABLE}_y{year}'
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass', [TABLE])
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """[(partition table, row estimate)] of the partitioned table, oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, child.reltuples::bigint
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            ORDER BY child.relname
+            """,
+            [TABLE],
+        )
+        return cursor.fetchall()
+
+
+def _create_partition(cursor, year):
+    """Create a year's partition unless it exists, moving in the rows for it the default partition holds"""
+    name = partition_name(year)
+    first, last = year_bounds(year)
+    cursor.execute('SELECT to_regclass(%s), to_regclass(%s)', [name, DEFAULT_PARTITION])
+    exists, default = cursor.fetchone()
+    if exists:
+        return
+    bounds = f'FOR VALUES FROM ({first}) TO ({last + 1})'
+    held = False
+    if default:
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE month_key BETWEEN %s AND %s)', [first, last])
+        held = cursor.fetchone()[0]
+    if not held:
+        cursor.execute(f'CREATE TABLE {name} PARTITION OF {TABLE} {bounds}')
+        return
+
+    # PostgreSQL refuses a partition for rows the default partition holds:
+    # detach the default, move the year's rows over and attach it again
+    cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}')
+    cursor.execute(f'CREATE TABLE {name} PARTITION OF {TABLE} {bounds}')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE month_key BETWEEN %s AND %s RETURNING *) '
+        f'INSERT INTO {TABLE} SELECT * FROM moved',
+        [first, last],
+    )
+    cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT')
+
+
+def _index_names(cursor, table):
+    """{indexed columns: index name} of a table's indexes"""
+    cursor.execute(
+        """
+        SELECT index_class.relname, (
+            SELECT string_agg(pg_get_indexdef(x.indexrelid, column_number, true), ', ' ORDER BY column_number)
+            FROM generate_series(1, x.indnkeyatts) column_number
+        )
+        FROM pg_index x
+        JOIN pg_class index_class ON index_class.oid = x.indexrelid
+        WHERE x.indrelid = %s::regclass
+        """,
+        [table],
+    )
+    return {columns: name for name, columns in cursor.fetchall()}
+
+
+def ensure_partitions(years):
+    """Create the yearly partitions for years that don't have one yet"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        for year in years:
+            _create_partition(cursor, year)
+
+
+def convert_to_partitioned(years_ahead=1):
+    """
+    Rebuild reports_report as a month_key range-partitioned table, in one
+    transaction (writers are blocked while rows are copied). The primary
+    key becomes (id, month_key), since PostgreSQL requires the partition
+    key in every unique index; id stays unique through its sequence.
+    """
+    if connection.vendor != 'postgresql':
+        raise ValueError(f'Native partitioning needs PostgreSQL, not {connection.vendor}')
+    if is_partitioned():
+        return False
+
+    old = f'{TABLE}_unpartitioned'
+    sequence = f'{TABLE}_partitioned_id_seq'
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+        # Keys past LAST_MONTH_KEY (legacy rows with malformed months) go to
+        # the default partition
+        cursor.execute(
+            f'SELECT MIN(month_key), MAX(month_key) FILTER (WHERE month_key <= %s), MAX(id) FROM {TABLE}',
+            [LAST_MONTH_KEY],
+        )
+        min_key, max_key, max_id = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {old}')
+        # The primary key becomes (id, month_key) and the unique constraint
+        # is added back below; the other indexes, CHECK constraints and
+        # defaults are copied over
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [old]
+        )
+        primary_key = cursor.fetchone()[0]
+        cursor.execute(f'ALTER TABLE {old} DROP CONSTRAINT {primary_key}')
+        cursor.execute(f'ALTER TABLE {old} DROP CONSTRAINT report_ngo_month_key_uniq')
+        index_names = _index_names(cursor, old)
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES) '
+            'PARTITION BY RANGE (month_key)'
+        )
+        # Identity columns on partitioned tables need PostgreSQL 17, so ids
+        # come from a plain sequence instead
+        cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {sequence} OWNED BY {TABLE}.id')
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+        cursor.execute(f"SELECT setval('{sequence}', %s)", [max(max_id or 0, 1)])
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {primary_key} PRIMARY KEY (id, month_key)')
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT report_ngo_month_key_uniq UNIQUE (ngo_id, month_key)')
+
+        this_year = timezone.now().year
+        first_year = year_of_key(min_key) if min_key else this_year
+        last_year = max(year_of_key(max_key) if max_key else this_year, this_year) + years_ahead
+        for year in range(first_year, last_year + 1):
+            _create_partition(cursor, year)
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {old}')
+        cursor.execute(f'DROP TABLE {old}')
+        # The copied indexes got generated names; give them back the ones
+        # the migrations know them by
+        for columns, name in _index_names(cursor, TABLE).items():
+            if columns in index_names and name != index_names[columns]:
+                cursor.execute(f'ALTER INDEX {name} RENAME TO {index_names[columns]}')
+    return True
+
+
+def _archive_year(year, before_key, started):
+    first, last = year_bounds(year)
+    last = min(last, before_key - 1)
+    os.makedirs(settings.REPORT_ARCHIVE_DIR, exist_ok=True)
+    # Named per run: the rows of an earlier archive of this range are gone,
+    # so its file must never be replaced
+    file_name = f'reports-{month_from_key(first)}_{month_from_key(last)}-{started:%Y%m%dT%H%M%S%f}.csv.gz'
+    path = os.path.join(settings.REPORT_ARCHIVE_DIR, file_name)
+
+    # Export and delete in one transaction, with the exported rows locked
+    # (SQLite holds the write lock for the whole transaction), so no row
+    # changes between the two. Only the exported rows are deleted; reports
+    # added meanwhile stay for the next run.
+    try:
+        with transaction.atomic():
+            reports = (
+                Report.objects.select_for_update()
+                .filter(month_key__gte=first, month_key__lte=last)
+                .order_by('month_key', 'ngo_id')
+                .values_list('pk', *ARCHIVE_COLUMNS)
+            )
+            exported = []
+            with gzip.open(f'{path}.part', 'wt', encoding='utf-8', newline='') as archive_file:
+                writer = csv.writer(archive_file)
+                writer.writerow(ARCHIVE_COLUMNS)
+                for pk, *row in reports.iterator(chunk_size=5000):
+                    writer.writerow(value.isoformat() if hasattr(value, 'isoformat') else value for value in row)
+                    exported.append(pk)
+            if not exported:
+                os.remove(f'{path}.part')
+                return None
+
+            digest = hashlib.sha256()
+            with open(f'{path}.part', 'rb') as archive_file:
+                for chunk in iter(lambda: archive_file.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            # Unlike a rename, link() fails instead of overwriting an existing file
+            os.link(f'{path}.part', path)
+            os.remove(f'{path}.part')
+
+            archive = ReportArchive.objects.create(
+                from_month_key=first,
+                to_month_key=last,
+                file_name=file_name,
+                row_count=len(exported),
+                size_bytes=os.path.getsize(path),
+                sha256=digest.hexdigest(),
+            )
+            # In chunks, so each delete's deltas stay small
+            for start in range(0, len(exported), DELETE_CHUNK):
+                delete_reports(Report.objects.filter(pk__in=exported[start:start + DELETE_CHUNK]))
+    except BaseException:
+        for leftover in (f'{path}.part', path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+    return archive
+
+
+def _drop_empty_partitions(before_key):
+    dropped = []
+    with connection.cursor() as cursor:
+        for name, _ in list_partitions():
+            if not name.startswith(f'{TABLE}_y'):
+                continue
+            year = int(name.rsplit('_y', 1)[1])
+            if year_bounds(year)[1] >= before_key:
+                continue
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {name})')
+            if not cursor.fetchone()[0]:
+                cursor.execute(f'DROP TABLE {name}')
+                dropped.append(name)
+    return dropped
+
+
+def archive(before_month):
+    """
+    Archive every report for months before before_month, one file per year.
+    Returns (archives written, partitions dropped).
+    """
+    before_key = month_key(before_month)
+    started = timezone.now()
+    oldest = Report.objects.order_by('month_key').values_list('month_key', flat=True).first()
+    archives = []
+    if oldest is not None:
+        for year in range(year_of_key(oldest), year_of_key(before_key - 1) + 1):
+            archived = _archive_year(year, before_key, started)
+            if archived is not None:
+                archives.append(archived)
+    dropped = _drop_empty_partitions(before_key) if is_partitioned() else []
+    return archives, dropped
+
+
+def _restore_batch(rows):
+    """Load archived rows, except those whose live report changed after the archive; returns how many were loaded"""
+    stamps = {
+        (row['ngo_id'], month_key(row['month'])): (parse_datetime(row['created_at']), parse_datetime(row['updated_at']))
+        for row in rows
+    }
+    with transaction.atomic():
+        live = Report.objects.select_for_update().filter(
+            ngo_id__in={ngo_id for ngo_id, _ in stamps}, month_key__in={key for _, key in stamps}
+        ).values_list('ngo_id', 'month_key', 'updated_at')
+        newer = {
+            (ngo_id, key) for ngo_id, key, updated_at in live
+            if (ngo_id, key) in stamps and updated_at >= stamps[(ngo_id, key)][1]
+        }
+        rows = [row for row in rows if (row['ngo_id'], month_key(row['month'])) not in newer]
+        save_reports((row['ngo_id'], row['month'], *(row[field] for field in METRIC_FIELDS)) for row in rows)
+
+        # save_reports stamps the rows as written now; put the archived
+        # timestamps back. Metrics don't change, so versions and rollups have
+        # nothing to follow and the service can be bypassed.
+        reports = Report.objects.filter(
+            ngo_id__in={row['ngo_id'] for row in rows}, month_key__in={month_key(row['month']) for row in rows}
+        ).only('id', 'ngo_id', 'month_key')
+        restamped = []
+        for report in reports:
+            key = (report.ngo_id, report.month_key)
+            if key in stamps and key not in newer:
+                report.created_at, report.updated_at = stamps[key]
+                restamped.append(report)
+        # bulk_update leaves auto_now fields alone
+        Report.objects.bulk_update(restamped, ['created_at', 'updated_at'], batch_size=500)
+    return len(rows)
+
+
+def restore(archive, batch_size=2000):
+    """
+    Load an archive's reports back through the report service; returns how
+    many were loaded. Reports changed since the archive was written keep
+    their live values.
+    """
+    path = os.path.join(settings.REPORT_ARCHIVE_DIR, archive.file_name)
+    if is_partitioned():
+        ensure_partitions(range(year_of_key(archive.from_month_key), year_of_key(archive.to_month_key) + 1))
+
+    restored = 0
+    with gzip.open(path, 'rb') as raw:
+        reader = csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+        batch = []
+        for row in reader:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                restored += _restore_batch(batch)
+                batch = []
+        if batch:
+            restored += _restore_batch(batch)
+
+    archive.restored_at = timezone.now()
+    archive.save(update_fields=['restored_at'])
+    return restored
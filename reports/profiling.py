@@ -0,0 +1,188 @@
+"""
+Opt-in profiling for background jobs.
+
+A TaskProfiler records wall time per named phase, the number and duration
+of database queries (overall and per phase), rows per second and the
+task's peak RSS, sampled as phases end. In 'cprofile' mode it also runs cProfile and writes a
+pstats file to PROFILE_DIR. A disabled profiler costs next to nothing, so
+the task code can use it unconditionally.
+"""
+import cProfile
+import os
+import sys
+import time
+from contextlib import ExitStack, contextmanager, nullcontext
+
+from django.conf import settings
+from django.db import connection
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_TIMERS = 'timers'
+PROFILE_CPROFILE = 'cprofile'
+PROFILE_MODES = (PROFILE_TIMERS, PROFILE_CPROFILE)
+
+_NO_PHASE = nullcontext()
+
+# Minimum seconds between RSS samples; some phases end once per row
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process over its lifetime in MB, or None if unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def rss_mb():
+    """
+    Private resident memory of this process in MB (file-backed pages such
+    as SQLite's mmap excluded), or None if unknown (non-Linux)
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            resident, shared = (int(pages) for pages in statm.read().split()[1:3])
+    except (OSError, ValueError):
+        return None
+    return round((resident - shared) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+
+
+def pstats_path(name):
+    return os.path.join(settings.PROFILE_DIR, f'{name}.pstats')
+
+
+class TaskProfiler:
+    """Collects timings for one task run; mode is None, 'timers' or 'cprofile'"""
+
+    def __init__(self, name, mode=None):
+        if mode not in (None, *PROFILE_MODES):
+            raise ValueError(f'Unknown profile mode: {mode}')
+        self.name = name
+        self.mode = mode
+        self.rows = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self._phases = {}
+        self._phase = None
+        self._stack = None
+        self._profile = None
+        self._started = self._elapsed = None
+        self._peak_rss = None
+        self._next_sample = 0.0
+
+    @property
+    def enabled(self):
+        return self.mode is not None
+
+    def start(self):
+        if not self.enabled:
+            return
+        self._stack = ExitStack()
+        self._stack.enter_context(connection.execute_wrapper(self._track_query))
+        if self.mode == PROFILE_CPROFILE:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._started = time.perf_counter()
+        self._sample_rss(self._started)
+
+    def stop(self):
+        if self._stack is None:
+            return
+        stopped = time.perf_counter()
+        self._elapsed = stopped - self._started
+        self._next_sample = 0.0
+        self._sample_rss(stopped)
+        if self._profile is not None:
+            self._profile.disable()
+        self._stack.close()
+        self._stack = None
+
+    def phase(self, name):
+        """Context manager charging the time (and queries) inside it to phase name"""
+        if not self.enabled:
+            return _NO_PHASE
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        stats = self._phases.setdefault(name, [0.0, 0, 0.0])
+        outer, self._phase = self._phase, stats
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            stats[0] += ended - started
+            self._phase = outer
+            self._sample_rss(ended)
+
+    def _sample_rss(self, now):
+        # The worker's ru_maxrss is a lifetime high-water mark, so an earlier
+        # large import would show in every later job; sample this run instead
+        if now < self._next_sample:
+            return
+        self._next_sample = now + RSS_SAMPLE_INTERVAL
+        rss = rss_mb()
+        if rss is not None and (self._peak_rss is None or rss > self._peak_rss):
+            self._peak_rss = rss
+
+    def iterate(self, name, iterable):
+        """Charge the time spent producing each item of iterable to phase name"""
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(name, iterable)
+
+    def _timed_iter(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def _track_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.query_seconds += elapsed
+            if self._phase is not None:
+                self._phase[1] += 1
+                self._phase[2] += elapsed
+
+    def result(self):
+        """Summary dict for storing on the job; dumps the pstats file in cprofile mode"""
+        if not self.enabled or self._elapsed is None:
+            return None
+        wall = self._elapsed
+        phase_seconds = sum(stats[0] for stats in self._phases.values())
+        summary = {
+            'mode': self.mode,
+            'wall_seconds': round(wall, 4),
+            'rows': self.rows,
+            'rows_per_second': round(self.rows / wall, 1) if wall else None,
+            'queries': self.queries,
+            'query_seconds': round(self.query_seconds, 4),
+            'phases': {
+                name: {'seconds': round(seconds, 4), 'queries': queries, 'query_seconds': round(query_seconds, 4)}
+                for name, (seconds, queries, query_seconds) in self._phases.items()
+            },
+            'unaccounted_seconds': round(max(wall - phase_seconds, 0), 4),
+            'peak_rss_mb': self._peak_rss,
+            'process_peak_rss_mb': peak_rss_mb(),
+        }
+        if self._profile is not None:
+            os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+            self._profile.dump_stats(pstats_path(self.name))
+            summary['pstats_file'] = f'{self.name}.pstats'
+        return summary
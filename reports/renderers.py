@@ -0,0 +1,47 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# DRF's encoder rules for everything orjson doesn't encode natively:
+# Decimal (as float), timedelta, lazy strings, QuerySet, bytes, iterables...
+_default = JSONRenderer.encoder_class().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed.
+
+    Produces the same bytes as the stdlib renderer for compact, UTF-8 output:
+    UUIDs and datetimes are encoded natively (UTC as ``Z``), everything else
+    goes through DRF's encoder rules. Indented output, ASCII-only or
+    non-compact settings, and values orjson rejects (e.g. integers wider than
+    64 bits) fall back to the stdlib renderer. Floats keep their value but
+    may spell exponents differently (``1e16`` rather than ``1e+16``), and
+    NaN/Infinity become ``null``; the API itself only emits floats for
+    progress percentages.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_default,
+                option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same \u2028 / \u2029 escaping as JSONRenderer, on the UTF-8 bytes
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
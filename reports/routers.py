@@ -0,0 +1,32 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Set for the duration of a request whose view opted into replica reads
+# (see ReadReplicaMiddleware). Anything else - the Celery worker, admin,
+# write endpoints - keeps reading from the primary.
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_alias():
+    """Return the configured replica alias, or None when no replica is set up"""
+    alias = getattr(settings, 'READ_REPLICA_ALIAS', None)
+    if alias and alias in settings.DATABASES:
+        return alias
+    return None
+
+
+class ReadReplicaRouter:
+    """
+    Sends read-only queries for the reports app to the read replica while
+    replica reads are enabled for the current context. Writes always go to
+    the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'reports' and _replica_reads.get():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
@@ -0,0 +1,42 @@
+"""
+OpenAPI annotations that cost nothing when the API docs are off.
+
+Views import extend_schema, OpenApiExample, OpenApiParameter,
+OpenApiResponse and OpenApiTypes from here. With drf_spectacular installed (API_DOCS) they
+are the real ones; in the lean api/worker profiles they are inert
+stand-ins, so serving the API never imports the schema machinery.
+"""
+from django.apps import apps
+
+if apps.is_installed('drf_spectacular'):
+    from drf_spectacular.openapi import OpenApiParameter
+    from drf_spectacular.types import OpenApiTypes
+    from drf_spectacular.utils import OpenApiExample, OpenApiResponse, extend_schema
+else:
+    def extend_schema(*args, **kwargs):
+        return lambda view: view
+
+    class OpenApiExample:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    class OpenApiResponse:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    class OpenApiParameter:
+        QUERY = 'query'
+        PATH = 'path'
+        HEADER = 'header'
+        COOKIE = 'cookie'
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+    class _AnyType:
+        def __getattr__(self, name):
+            return name
+
+    OpenApiTypes = _AnyType()
+
+__all__ = ['OpenApiExample', 'OpenApiParameter', 'OpenApiResponse', 'OpenApiTypes', 'extend_schema']
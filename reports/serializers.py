@@ -1,5 +1,11 @@
+from datetime import datetime
+
+from django.conf import settings
 from rest_framework import serializers
 from .models import Report, Job
+from .months import MONTH_FORMAT_ERROR, is_valid_month
+from .profiling import PROFILE_MODES
+from .uploads import ALLOWED_SUFFIXES, UploadLimitError, inspect_upload, is_compressed
 
 
 class ReportSerializer(serializers.ModelSerializer):
@@ -12,14 +18,8 @@ class ReportSerializer(serializers.ModelSerializer):
 
     def validate_month(self, value):
         """Validate month format"""
-        try:
-            year, month = value.split('-')
-            if len(year) != 4 or len(month) != 2:
-                raise ValueError
-            if not (1 <= int(month) <= 12):
-                raise ValueError
-        except (ValueError, IndexError):
-            raise serializers.ValidationError("Month must be in YYYY-MM format (e.g., 2024-01)")
+        if not is_valid_month(value):
+            raise serializers.ValidationError(MONTH_FORMAT_ERROR)
         return value
 
     def validate_ngo_id(self, value):
@@ -32,33 +32,72 @@ class ReportSerializer(serializers.ModelSerializer):
 class BulkUploadSerializer(serializers.Serializer):
     """Serializer for CSV file uploads"""
     file = serializers.FileField()
+    profile = serializers.ChoiceField(
+        choices=PROFILE_MODES,
+        required=False,
+        help_text="Profile the import: 'timers' for phase timings, 'cprofile' to also write a pstats file. "
+                  "Staff only, unless CSV_TASK_PROFILE_ON_REQUEST is on"
+    )
+
+    def validate_profile(self, value):
+        """Profiling costs worker time (and disk, for cprofile); only staff may ask for it by default"""
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if not (settings.CSV_TASK_PROFILE_ON_REQUEST or getattr(user, 'is_staff', False)):
+            raise serializers.ValidationError("Only staff users can profile an import")
+        return value
 
     def validate_file(self, value):
         """Validate the uploaded file"""
-        if not value.name.endswith('.csv'):
-            raise serializers.ValidationError("Only CSV files are allowed")
+        if not value.name.lower().endswith(ALLOWED_SUFFIXES):
+            raise serializers.ValidationError("Only CSV files (.csv, .csv.gz or .zip) are allowed")
         
-        # Check file size (limit to 10MB)
-        max_size = 10 * 1024 * 1024  # 10MB
+        # Check file size (as uploaded; compressed files are limited again when decompressed)
+        max_size = settings.UPLOAD_MAX_FILE_SIZE
         if value.size > max_size:
-            raise serializers.ValidationError("File size cannot exceed 10MB")
+            raise serializers.ValidationError(f"File size cannot exceed {max_size // (1024 * 1024)}MB")
+        
+        if is_compressed(value.name):
+            try:
+                inspect_upload(value)
+            except UploadLimitError as e:
+                raise serializers.ValidationError(str(e))
         
         return value
 
 
 class JobStatusSerializer(serializers.ModelSerializer):
-    """Serializer for job status tracking"""
+    """
+    Serializer for job status tracking. queue (an intake.QueueEstimate, for
+    jobs still waiting) fills in queue_position and estimated_start.
+    """
     progress_percentage = serializers.ReadOnlyField()
+    queue_position = serializers.SerializerMethodField()
+    estimated_start = serializers.SerializerMethodField()
     
     class Meta:
         model = Job
         fields = [
             'id', 'status', 'total_rows', 'processed_rows', 'successful_rows', 
-            'failed_rows', 'progress_percentage', 'error_details', 'file_name',
-            'created_at', 'updated_at', 'completed_at'
+            'failed_rows', 'progress_percentage', 'error_details', 'file_name', 'profile',
+            'queue_position', 'estimated_start',
+            'created_at', 'updated_at', 'started_at', 'completed_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+    def __init__(self, *args, include_errors=True, queue=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queue = queue
+        if not include_errors:
+            # error_details is deferred by the caller; don't load it
+            self.fields.pop('error_details')
+
+    def get_queue_position(self, obj) -> int | None:
+        return self.queue.position if self.queue else None
+
+    def get_estimated_start(self, obj) -> datetime | None:
+        return serializers.DateTimeField().to_representation(self.queue.estimated_start) if self.queue else None
+
 
 class DashboardSerializer(serializers.Serializer):
     """Serializer for dashboard aggregated data"""
@@ -66,4 +105,9 @@ class DashboardSerializer(serializers.Serializer):
     total_ngos_reporting = serializers.IntegerField()
     total_people_helped = serializers.IntegerField()
     total_events_conducted = serializers.IntegerField()
-    total_funds_utilized = serializers.DecimalField(max_digits=15, decimal_places=2) 
\ No newline at end of file
+    total_funds_utilized = serializers.DecimalField(max_digits=15, decimal_places=2)
+    # Only present for ?precision=approx
+    precision = serializers.CharField(required=False)
+    total_ngos_reporting_error = serializers.FloatField(
+        required=False, help_text="Relative standard error of the approximate NGO count"
+    ) 
\ No newline at end of file
@@ -0,0 +1,353 @@
+"""
+Report write service.
+
+Every write to Report (API submissions, CSV imports, admin edits) goes
+through save_report, save_reports, update_report or delete_reports. Each call sends
+``reports_changed`` with one ReportDelta per affected report, carrying the
+metrics before and after the write, so per-month versions, sketches and
+rollups can be maintained incrementally. Bulk writes send a single signal
+for the whole batch, which plain model signals can't do.
+
+On PostgreSQL and SQLite writes are native upserts (INSERT ... ON CONFLICT
+DO UPDATE ... RETURNING), so concurrent submissions of the same
+(ngo_id, month) never race into an IntegrityError.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from django.db import IntegrityError, connections, router, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import MonthlyRollup, Report
+from .months import month_key
+
+METRIC_FIELDS = ('people_helped', 'events_conducted', 'funds_utilized')
+
+# Sent inside the writing transaction with deltas=[ReportDelta, ...]
+reports_changed = Signal()
+
+_FUNDS_FIELD = Report._meta.get_field('funds_utilized')
+_FUNDS_EXPONENT = Decimal(1).scaleb(-_FUNDS_FIELD.decimal_places)
+_FUNDS_LIMIT = Decimal(10) ** (_FUNDS_FIELD.max_digits - _FUNDS_FIELD.decimal_places)
+
+# Backends where writes are a native INSERT ... ON CONFLICT DO UPDATE ...
+# RETURNING; others use the ORM's select-then-write path
+NATIVE_UPSERT_VENDORS = ('postgresql', 'sqlite')
+_UPSERT_FIELDS = ('ngo_id', 'month', 'month_key', *METRIC_FIELDS, 'created_at', 'updated_at')
+
+
+class ReportMetrics(NamedTuple):
+    people_helped: int
+    events_conducted: int
+    funds_utilized: Decimal
+
+
+class ReportDelta(NamedTuple):
+    """One report's change: old is None for a new report, new is None for a deletion"""
+    month_key: int
+    ngo_id: str
+    old: Optional[ReportMetrics]
+    new: Optional[ReportMetrics]
+
+    @property
+    def created(self):
+        return self.old is None and self.new is not None
+
+    @property
+    def deleted(self):
+        return self.new is None
+
+
+class MonthChange(NamedTuple):
+    """Net change of a month's totals"""
+    report_count: int
+    people_helped: int
+    events_conducted: int
+    funds_utilized: Decimal
+
+
+def metric_changes_by_month(deltas):
+    """Collapse deltas into one MonthChange per month"""
+    totals = defaultdict(lambda: [0, 0, 0, Decimal(0)])
+    for delta in deltas:
+        total = totals[delta.month_key]
+        if delta.old is not None:
+            total[0] -= 1
+            total[1] -= delta.old.people_helped
+            total[2] -= delta.old.events_conducted
+            total[3] -= delta.old.funds_utilized
+        if delta.new is not None:
+            total[0] += 1
+            total[1] += delta.new.people_helped
+            total[2] += delta.new.events_conducted
+            total[3] += delta.new.funds_utilized
+    return {key: MonthChange(*total) for key, total in totals.items()}
+
+
+def report_metrics(people_helped, events_conducted, funds_utilized):
+    """
+    Normalize metrics to what the columns store (funds are rounded to cents),
+    so deltas add up exactly. Raises ValueError for funds that don't fit.
+    """
+    funds_utilized = Decimal(funds_utilized)
+    if not abs(funds_utilized) < _FUNDS_LIMIT:
+        raise ValueError(f'Funds utilized must be less than {_FUNDS_LIMIT:,}')
+    return ReportMetrics(
+        int(people_helped),
+        int(events_conducted),
+        funds_utilized.quantize(_FUNDS_EXPONENT),
+    )
+
+
+def _stored_metrics(report):
+    return ReportMetrics(*(getattr(report, field) for field in METRIC_FIELDS))
+
+
+def _emit(deltas):
+    if deltas:
+        reports_changed.send(sender=Report, deltas=deltas)
+
+
+def save_report(ngo_id, month, people_helped, events_conducted, funds_utilized):
+    """Create or update the report for (ngo_id, month); returns (report, created)"""
+    new = report_metrics(people_helped, events_conducted, funds_utilized)
+    key = month_key(month)
+    connection = connections[router.db_for_write(Report)]
+    if connection.vendor not in NATIVE_UPSERT_VENDORS:
+        return _save_report_orm(ngo_id, month, key, new)
+
+    with transaction.atomic(using=connection.alias):
+        if connection.vendor == 'postgresql':
+            # One statement: a CTE locks the existing row and hands back its
+            # metrics, the upsert writes and reports whether it inserted
+            report = _native_upsert(connection, [(ngo_id, month, key, new)], returning_old=True, raw=True)[0]
+            old = None
+            if not report.inserted and report.old_people_helped is not None:
+                old = ReportMetrics(*(getattr(report, f'old_{field}') for field in METRIC_FIELDS))
+        else:
+            # SQLite transactions here take the write lock up front
+            # (transaction_mode IMMEDIATE), so nothing can write between the
+            # read and the upsert
+            old = Report.objects.using(connection.alias).filter(ngo_id=ngo_id, month_key=key).values_list(*METRIC_FIELDS).first()
+            old = ReportMetrics(*old) if old is not None else None
+            report = _native_upsert(connection, [(ngo_id, month, key, new)], raw=True)[0]
+        report.inserted = bool(report.inserted)
+        _emit_upserted([(ngo_id, key, new, old, report.inserted)])
+    return report, report.inserted
+
+
+def _save_report_orm(ngo_id, month, key, new):
+    with transaction.atomic():
+        report, created = Report.objects.select_for_update().get_or_create(
+            ngo_id=ngo_id, month=month, defaults=new._asdict()
+        )
+        old = None
+        if not created:
+            old = _stored_metrics(report)
+            for field, value in new._asdict().items():
+                setattr(report, field, value)
+            report.save()
+        _emit([ReportDelta(key, ngo_id, old, new)])
+    return report, created
+
+
+def update_report(pk, ngo_id, month, people_helped, events_conducted, funds_utilized):
+    """
+    Rewrite the report with primary key pk in place, moving it to
+    (ngo_id, month) if those changed; returns the report. Raises
+    IntegrityError if another report already has that (ngo_id, month).
+    """
+    new = report_metrics(people_helped, events_conducted, funds_utilized)
+    with transaction.atomic():
+        report = Report.objects.select_for_update().get(pk=pk)
+        old_key, old_ngo_id, old = report.month_key, report.ngo_id, _stored_metrics(report)
+        report.ngo_id, report.month = ngo_id, month
+        for field, value in new._asdict().items():
+            setattr(report, field, value)
+        report.save()
+        if (report.ngo_id, report.month_key) == (old_ngo_id, old_key):
+            _emit([ReportDelta(old_key, old_ngo_id, old, new)])
+        else:
+            # A move leaves one month and joins another
+            _emit([ReportDelta(old_key, old_ngo_id, old, None), ReportDelta(report.month_key, ngo_id, None, new)])
+    return report
+
+
+def _native_upsert(connection, rows, returning_old=False, raw=False):
+    """
+    Write rows [(ngo_id, month, month_key, ReportMetrics)] with one
+    INSERT ... ON CONFLICT (ngo_id, month_key) DO UPDATE ... RETURNING.
+
+    Whether a row was inserted comes from created_at = updated_at, which
+    only holds for a row inserted with this statement's timestamp (xmax
+    would do on PostgreSQL, but a partitioned table can't return system
+    columns).
+    returning_old (PostgreSQL, one row) also returns the previous metrics
+    as old_<field>, read by a CTE that locks the row first.
+
+    Returns Report instances with an ``inserted`` attribute when raw is
+    set, otherwise (ngo_id, month_key, inserted) tuples.
+    """
+    quote = connection.ops.quote_name
+    table = quote(Report._meta.db_table)
+    fields = [Report._meta.get_field(name) for name in _UPSERT_FIELDS]
+    now = timezone.now()
+
+    params = []
+    for ngo_id, month, key, new in rows:
+        values = (ngo_id, month, key, *new, now, now)
+        params += [field.get_db_prep_save(value, connection) for field, value in zip(fields, values)]
+    placeholders = ', '.join(['(' + ', '.join(['%s'] * len(fields)) + ')'] * len(rows))
+
+    columns = ', '.join(quote(field.column) for field in fields)
+    updates = ', '.join(
+        f'{quote(name)} = EXCLUDED.{quote(name)}' for name in (*METRIC_FIELDS, 'updated_at')
+    )
+    inserted = f"({quote('created_at')} = {quote('updated_at')})"
+    returned = Report._meta.concrete_fields if raw else [Report._meta.get_field(name) for name in ('ngo_id', 'month_key')]
+    returning = ', '.join(quote(field.column) for field in returned) + f', {inserted} AS inserted'
+
+    prefix = ''
+    if returning_old:
+        ngo_id, _, key, _ = rows[0]
+        prefix = (
+            f'WITH old AS (SELECT {", ".join(quote(name) for name in METRIC_FIELDS)} FROM {table} '
+            f"WHERE {quote('ngo_id')} = %s AND {quote('month_key')} = %s FOR UPDATE) "
+        )
+        params = [ngo_id, key, *params]
+        returning += ''.join(f', (SELECT {quote(name)} FROM old) AS old_{name}' for name in METRIC_FIELDS)
+
+    sql = (
+        f'{prefix}INSERT INTO {table} ({columns}) VALUES {placeholders} '
+        f"ON CONFLICT ({quote('ngo_id')}, {quote('month_key')}) DO UPDATE SET {updates} "
+        f'RETURNING {returning}'
+    )
+    if raw:
+        return list(Report.objects.raw(sql, params).using(connection.alias))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(ngo_id, key, bool(inserted)) for ngo_id, key, inserted in cursor.fetchall()]
+
+
+def _emit_upserted(results):
+    """
+    Send the deltas of upserted rows [(ngo_id, month_key, new, old, inserted)].
+    A row that was updated although it wasn't there when its old values were
+    read (a concurrent insert won the race) has unknown old values: it is
+    sent as unchanged and its month's rollup is recounted afterwards.
+    """
+    deltas, unknown = [], set()
+    for ngo_id, key, new, old, inserted in results:
+        if inserted:
+            deltas.append(ReportDelta(key, ngo_id, None, new))
+        elif old is not None:
+            deltas.append(ReportDelta(key, ngo_id, old, new))
+        else:
+            deltas.append(ReportDelta(key, ngo_id, new, new))
+            unknown.add(key)
+    _emit(deltas)
+    if unknown:
+        MonthlyRollup.recompute(sorted(unknown))
+    return deltas
+
+
+def save_reports(records):
+    """
+    Create or update many reports at once. records yields
+    (ngo_id, month, people_helped, events_conducted, funds_utilized); when a
+    key repeats, the last record wins. Returns (created, updated) counts.
+    """
+    latest = {}
+    for ngo_id, month, *metrics in records:
+        latest[(ngo_id, month)] = report_metrics(*metrics)
+    if not latest:
+        return 0, 0
+
+    try:
+        with transaction.atomic():
+            deltas = _bulk_upsert(latest)
+    except IntegrityError:
+        # A concurrent writer inserted one of these keys first; fall back to
+        # the row-by-row path, which handles that race
+        created = sum(save_report(ngo_id, month, *new)[1] for (ngo_id, month), new in latest.items())
+        return created, len(latest) - created
+
+    created = sum(1 for delta in deltas if delta.created)
+    return created, len(deltas) - created
+
+
+def _bulk_upsert(latest, batch_size=500):
+    """Write the deduplicated records and emit their deltas; returns the deltas"""
+    connection = connections[router.db_for_write(Report)]
+    if connection.vendor not in NATIVE_UPSERT_VENDORS:
+        return _bulk_upsert_orm(latest)
+
+    # Lock the rows that exist and keep their metrics for the deltas. Rows
+    # are locked and written in (month_key, ngo_id) order, so concurrent
+    # batches over the same keys queue up instead of deadlocking.
+    existing = {
+        (ngo_id, key): ReportMetrics(*metrics)
+        for ngo_id, key, *metrics in Report.objects.select_for_update().filter(
+            month_key__in={month_key(month) for _, month in latest},
+            ngo_id__in={ngo_id for ngo_id, _ in latest},
+        ).order_by('month_key', 'ngo_id').values_list('ngo_id', 'month_key', *METRIC_FIELDS)
+    }
+    rows = sorted(
+        ((ngo_id, month, month_key(month), new) for (ngo_id, month), new in latest.items()),
+        key=lambda row: (row[2], row[0]),
+    )
+    new_by_key = {(ngo_id, key): new for ngo_id, _, key, new in rows}
+    results = []
+    for start in range(0, len(rows), batch_size):
+        for ngo_id, key, inserted in _native_upsert(connection, rows[start:start + batch_size]):
+            results.append((ngo_id, key, new_by_key[(ngo_id, key)], existing.get((ngo_id, key)), inserted))
+    return _emit_upserted(results)
+
+
+def _bulk_upsert_orm(latest):
+    existing = {
+        (report.ngo_id, report.month): report
+        for report in Report.objects.select_for_update().filter(
+            month_key__in={month_key(month) for _, month in latest},
+            ngo_id__in={ngo_id for ngo_id, _ in latest},
+        )
+    }
+
+    now = timezone.now()
+    deltas, to_create, to_update = [], [], []
+    for (ngo_id, month), new in latest.items():
+        report = existing.get((ngo_id, month))
+        if report is None:
+            report = Report(ngo_id=ngo_id, month=month, month_key=month_key(month), **new._asdict())
+            to_create.append(report)
+            deltas.append(ReportDelta(report.month_key, ngo_id, None, new))
+        else:
+            old = _stored_metrics(report)
+            for field, value in new._asdict().items():
+                setattr(report, field, value)
+            report.updated_at = now
+            to_update.append(report)
+            deltas.append(ReportDelta(report.month_key, ngo_id, old, new))
+
+    if to_update:
+        Report.objects.bulk_update(to_update, [*METRIC_FIELDS, 'updated_at'], batch_size=500)
+    if to_create:
+        Report.objects.bulk_create(to_create, batch_size=500)
+    _emit(deltas)
+    return deltas
+
+
+def delete_reports(queryset, batch_size=500):
+    """Delete the reports in queryset; returns the number deleted"""
+    with transaction.atomic():
+        rows = list(queryset.values_list('pk', 'month_key', 'ngo_id', *METRIC_FIELDS))
+        for start in range(0, len(rows), batch_size):
+            pks = [row[0] for row in rows[start:start + batch_size]]
+            Report.objects.filter(pk__in=pks).delete()
+        _emit([
+            ReportDelta(key, ngo_id, ReportMetrics(*metrics), None)
+            for _, key, ngo_id, *metrics in rows
+        ])
+    return len(rows)
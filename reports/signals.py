@@ -0,0 +1,31 @@
+from collections import defaultdict
+
+from django.dispatch import receiver
+
+from .models import MonthlyRollup, MonthNgoSketch, MonthVersion
+from .services import metric_changes_by_month, reports_changed
+
+
+@receiver(reports_changed)
+def bump_month_versions(sender, deltas, **kwargs):
+    """Invalidate dashboard ETags for every month that changed"""
+    MonthVersion.bump(delta.month_key for delta in deltas)
+
+
+@receiver(reports_changed)
+def update_ngo_sketches(sender, deltas, **kwargs):
+    """New reports can only add NGOs to a month; deletions mark it for a rebuild (rebuild_ngo_sketches task)"""
+    added, deleted = defaultdict(list), set()
+    for delta in deltas:
+        if delta.created:
+            added[delta.month_key].append(delta.ngo_id)
+        elif delta.deleted:
+            deleted.add(delta.month_key)
+    MonthNgoSketch.add(added)
+    if deleted:
+        MonthNgoSketch.mark_stale(deleted)
+
+
+@receiver(reports_changed)
+def update_monthly_rollups(sender, deltas, **kwargs):
+    MonthlyRollup.apply(metric_changes_by_month(deltas))
@@ -0,0 +1,59 @@
+"""
+Dashboard warm-up.
+
+Dashboards for the latest months are read most right after month end,
+while bulk uploads are still landing. warm() precomputes DashboardSnapshot
+rows for the ranges those dashboards ask for: the previous and current
+month, each on its own, year to date and trailing twelve months. It runs
+from Celery beat (see ngo_impact_tracker/celery.py) and after imports, but
+only once ingestion has gone quiet, so warming never competes with it.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import DashboardSnapshot, Job, MonthVersion
+
+logger = logging.getLogger(__name__)
+
+
+def periods(today=None):
+    """{name: (from_key, to_key)} of the ranges to keep warm"""
+    today = today or timezone.now().date()
+    current = today.year * 12 + today.month
+    ranges = {}
+    for label, anchor in (('previous', current - 1), ('current', current)):
+        year_start = (anchor - 1) // 12 * 12 + 1
+        ranges[f'{label}_month'] = (anchor, anchor)
+        ranges[f'{label}_ytd'] = (year_start, anchor)
+        ranges[f'{label}_trailing_12'] = (anchor - 11, anchor)
+    return ranges
+
+
+def ingestion_quiet():
+    """True when no import is waiting or running and no report changed for DASHBOARD_WARMUP['QUIET_SECONDS']"""
+    if Job.objects.filter(status__in=('deferred', 'pending', 'processing')).exists():
+        return False
+    since = timezone.now() - timedelta(seconds=settings.DASHBOARD_WARMUP['QUIET_SECONDS'])
+    return not MonthVersion.objects.filter(updated_at__gte=since).exists()
+
+
+def warm(today=None, force=False):
+    """
+    Refresh the snapshots of periods() that are out of date. Returns
+    {name: compute milliseconds, or None if it was current}, or None when
+    skipped because ingestion is still busy (unless force).
+    """
+    if not (force or ingestion_quiet()):
+        logger.info("Skipped dashboard warm-up: ingestion is active")
+        return None
+    timings = {}
+    for name, (from_key, to_key) in periods(today).items():
+        snapshot = DashboardSnapshot.refresh(from_key, to_key)
+        timings[name] = snapshot.compute_ms if snapshot else None
+    refreshed = {name: ms for name, ms in timings.items() if ms is not None}
+    if refreshed:
+        logger.info("Warmed dashboard snapshots in ms: %s", refreshed)
+    return timings
@@ -1,136 +1,284 @@
 import csv
 import io
+import logging
+import sys
+import zipfile
 from celery import shared_task
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import transaction, IntegrityError
+from django.db.models import F
 from django.utils import timezone
-from .models import Report, Job
+from . import log
+from .intake import dispatch_deferred
+from .models import Job, MonthNgoSketch
+from .months import MONTH_FORMAT_ERROR, is_valid_month
+from .profiling import TaskProfiler, rss_mb
+from .snapshots import warm
+from .services import report_metrics, save_reports
+from .uploads import UploadLimitError, open_csv_streams, remove_upload
 from decimal import Decimal, InvalidOperation
+from operator import itemgetter
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ['ngo_id', 'month', 'people_helped', 'events_conducted', 'funds_utilized']
+
+# Rows written per save_reports call (and per progress update)
+BATCH_SIZE = 500
+
+# A failed row is recorded as its row number and at most this much of its text
+RAW_ROW_CHARS = 200
+
+
+class CSVFormatError(ValueError):
+    """Raised when a CSV file has no header or lacks required columns"""
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    """Raised when an import grows the worker past CSV_TASK_MAX_RSS_MB"""
+
+
+def _read_rows(file_content=None, file_path=None):
+    """
+    Yield (values, fields) for every CSV row, either from inline file
+    content or from an uploaded file on disk (plain, gzip or zip), checking
+    every file's header. values is a tuple of the REQUIRED_COLUMNS fields,
+    in that order (None where a short row has none); fields is the row as
+    csv.reader returned it. Blank lines are skipped.
+    """
+    if file_path:
+        sources = open_csv_streams(file_path)
+    else:
+        sources = [(None, io.StringIO(file_content))]
+
+    for member_name, stream in sources:
+        prefix = f'{member_name}: ' if member_name else ''
+        csv_reader = csv.reader(stream)
+
+        # Validate headers
+        headers = next(csv_reader, None)
+        if not headers:
+            raise CSVFormatError(f'{prefix}Empty CSV file or no headers found')
+
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in headers]
+        if missing_columns:
+            raise CSVFormatError(f'{prefix}Missing required columns: {", ".join(missing_columns)}')
+
+        # Columns are read by index; like DictReader, a repeated header
+        # name means its last column
+        indices = [len(headers) - 1 - headers[::-1].index(col) for col in REQUIRED_COLUMNS]
+        pick = itemgetter(*indices)
+        for fields in csv_reader:
+            if not fields:
+                continue
+            try:
+                yield pick(fields), fields
+            except IndexError:
+                yield tuple(fields[i] if i < len(fields) else None for i in indices), fields
+
+
+def _raw_text(fields):
+    """The row as (truncated) text, for error_details"""
+    text = ','.join(fields)
+    return text if len(text) <= RAW_ROW_CHARS else text[:RAW_ROW_CHARS] + '...'
+
+
+def _parse_row(values):
+    """Clean and validate one row's REQUIRED_COLUMNS values, returning a save_reports record"""
+    ngo_id, month, people_helped, events_conducted, funds_utilized = values
+    ngo_id = (ngo_id or '').strip()
+    month = (month or '').strip()
+
+    if not ngo_id:
+        raise ValueError("NGO ID cannot be empty")
+
+    if not month:
+        raise ValueError("Month cannot be empty")
+    if not is_valid_month(month):
+        raise ValueError(MONTH_FORMAT_ERROR)
+
+    # Validate and convert numeric fields
+    try:
+        people_helped = int(people_helped)
+        if people_helped < 0:
+            raise ValueError("People helped cannot be negative")
+    except (ValueError, TypeError):
+        raise ValueError("People helped must be a valid non-negative number")
+
+    try:
+        events_conducted = int(events_conducted)
+        if events_conducted < 0:
+            raise ValueError("Events conducted cannot be negative")
+    except (ValueError, TypeError):
+        raise ValueError("Events conducted must be a valid non-negative number")
+
+    try:
+        funds_utilized = Decimal(funds_utilized)
+        if funds_utilized < 0:
+            raise ValueError("Funds utilized cannot be negative")
+    except (InvalidOperation, ValueError, TypeError):
+        raise ValueError("Funds utilized must be a valid non-negative number")
+
+    return (ngo_id, month, *report_metrics(people_helped, events_conducted, funds_utilized))
+
+
+def _schedule_warmup(task):
+    # Only from a worker: an import run inline (eagerly or called directly)
+    # would otherwise wait on the broker or warm inside the request
+    if task.request.called_directly or task.request.is_eager:
+        return
+    # Once the quiet period has passed; warm() skips if more uploads came in
+    try:
+        warm_dashboard_snapshots.apply_async(countdown=settings.DASHBOARD_WARMUP['QUIET_SECONDS'] + 5)
+    except Exception as e:
+        logger.warning("Could not schedule the dashboard warm-up: %s", e)
+
+
+def _update_job(job_id, **fields):
+    """Write job fields without loading the row; returns the number of rows updated"""
+    return Job.objects.filter(id=job_id).update(updated_at=timezone.now(), **fields)
 
 
 @shared_task(bind=True)
-def process_csv_upload(self, job_id, file_content):
+def process_csv_upload(self, job_id, file_content=None, file_path=None, profile=None):
     """
     Background task to process CSV file uploads.
     Handles validation, creation of reports, and progress tracking.
+    Uploads arrive either as inline text (file_content) or, for compressed
+    files, as a path to the spooled upload (file_path).
+    profile ('timers' or 'cprofile', default CSV_TASK_PROFILE) stores a
+    TaskProfiler summary on the job.
     """
+    profiler = TaskProfiler(job_id, profile or settings.CSV_TASK_PROFILE)
+    profiler.start()
+    # Log records from here on carry the job ID
+    log_token = log.job_id.set(str(job_id))
     try:
-        job = Job.objects.get(id=job_id)
-        job.status = 'processing'
-        job.save()
-
-        # Parse CSV content
-        csv_reader = csv.DictReader(io.StringIO(file_content))
-        
-        # Expected columns
-        required_columns = ['ngo_id', 'month', 'people_helped', 'events_conducted', 'funds_utilized']
-        
-        # Validate headers
-        headers = csv_reader.fieldnames
-        if not headers:
-            job.status = 'failed'
-            job.error_details = [{'error': 'Empty CSV file or no headers found'}]
-            job.save()
+        # A deferred job's arguments are no longer needed once it starts
+        if not _update_job(job_id, status='processing', started_at=timezone.now(), task_kwargs=None):
+            # Job was deleted or doesn't exist
             return
 
-        missing_columns = [col for col in required_columns if col not in headers]
-        if missing_columns:
-            job.status = 'failed'
-            job.error_details = [{'error': f'Missing required columns: {", ".join(missing_columns)}'}]
-            job.save()
-            return
+        # Count total rows for progress tracking. This is a streaming pass,
+        # so compressed uploads are never decompressed into memory.
+        try:
+            with profiler.phase('count'):
+                total_rows = sum(1 for _ in _read_rows(file_content, file_path))
+        except UnicodeDecodeError:
+            error = 'Invalid file encoding. Please ensure the file is UTF-8 encoded.'
+        except (CSVFormatError, UploadLimitError) as e:
+            error = str(e)
+        except (OSError, EOFError, zipfile.BadZipFile):
+            error = 'Could not decompress the uploaded file'
+        else:
+            error = None
 
-        # Count total rows for progress tracking
-        rows = list(csv_reader)
-        job.total_rows = len(rows)
-        job.save()
+        if error:
+            _update_job(job_id, status='failed', error_details=[{'error': error}])
+            return
 
-        if job.total_rows == 0:
-            job.status = 'completed'
-            job.completed_at = timezone.now()
-            job.save()
+        if total_rows == 0:
+            _update_job(job_id, status='completed', completed_at=timezone.now())
             return
 
+        _update_job(job_id, total_rows=total_rows)
+
         errors = []
+        max_errors = settings.CSV_MAX_ERROR_DETAILS
+        max_rss = settings.CSV_TASK_MAX_RSS_MB
         successful_count = 0
         failed_count = 0
+        reported_rows = reported_successful = reported_failed = 0
 
-        for row_num, row in enumerate(rows, start=1):
+        batch = []
+        rows = profiler.iterate('parse', _read_rows(file_content, file_path))
+        for row_num, (values, fields) in enumerate(rows, start=1):
             try:
-                # Clean and validate data
-                ngo_id = row.get('ngo_id', '').strip()
-                month = row.get('month', '').strip()
-                
-                if not ngo_id:
-                    raise ValueError("NGO ID cannot be empty")
-                
-                if not month:
-                    raise ValueError("Month cannot be empty")
-
-                # Validate and convert numeric fields
-                try:
-                    people_helped = int(row.get('people_helped', 0))
-                    if people_helped < 0:
-                        raise ValueError("People helped cannot be negative")
-                except (ValueError, TypeError):
-                    raise ValueError("People helped must be a valid non-negative number")
-
-                try:
-                    events_conducted = int(row.get('events_conducted', 0))
-                    if events_conducted < 0:
-                        raise ValueError("Events conducted cannot be negative")
-                except (ValueError, TypeError):
-                    raise ValueError("Events conducted must be a valid non-negative number")
-
-                try:
-                    funds_utilized = Decimal(str(row.get('funds_utilized', 0)))
-                    if funds_utilized < 0:
-                        raise ValueError("Funds utilized cannot be negative")
-                except (InvalidOperation, ValueError, TypeError):
-                    raise ValueError("Funds utilized must be a valid non-negative number")
-
-                # Create or update report (handles idempotency)
-                with transaction.atomic():
-                    report, created = Report.objects.update_or_create(
-                        ngo_id=ngo_id,
-                        month=month,
-                        defaults={
-                            'people_helped': people_helped,
-                            'events_conducted': events_conducted,
-                            'funds_utilized': funds_utilized,
-                        }
+                with profiler.phase('validate'):
+                    batch.append(_parse_row(values))
+            except (ValueError, ValidationError) as e:
+                failed_count += 1
+                # Only the first max_errors are kept; failed_rows counts them all
+                if len(errors) < max_errors:
+                    errors.append({
+                        'row': row_num,
+                        'raw': _raw_text(fields),
+                        'error': sys.intern(str(e))
+                    })
+
+            # Write a batch and update progress. Counters move with F()
+            # increments; the error list is written once at the end.
+            if row_num % BATCH_SIZE == 0:
+                if max_rss and (rss := rss_mb()) is not None and rss > max_rss:
+                    raise MemoryBudgetExceeded(f'Import exceeded the worker memory budget ({rss:.0f}MB > {max_rss}MB)')
+                with profiler.phase('write'):
+                    save_reports(batch)
+                successful_count += len(batch)
+                batch = []
+
+                with profiler.phase('progress'):
+                    _update_job(
+                        job_id,
+                        processed_rows=F('processed_rows') + (row_num - reported_rows),
+                        successful_rows=F('successful_rows') + (successful_count - reported_successful),
+                        failed_rows=F('failed_rows') + (failed_count - reported_failed),
                     )
-                    successful_count += 1
+                reported_rows, reported_successful, reported_failed = row_num, successful_count, failed_count
 
-            except (ValueError, ValidationError, IntegrityError) as e:
-                failed_count += 1
-                errors.append({
-                    'row': row_num,
-                    'data': row,
-                    'error': str(e)
-                })
-
-            # Update progress
-            job.processed_rows = row_num
-            job.successful_rows = successful_count
-            job.failed_rows = failed_count
-            job.error_details = errors
-            job.save()
+        with profiler.phase('write'):
+            save_reports(batch)
+        successful_count += len(batch)
 
         # Mark job as completed
-        job.status = 'completed'
-        job.completed_at = timezone.now()
-        job.save()
+        _update_job(
+            job_id,
+            status='completed',
+            completed_at=timezone.now(),
+            processed_rows=total_rows,
+            successful_rows=successful_count,
+            failed_rows=failed_count,
+            error_details=errors,
+        )
+        profiler.rows = total_rows
+        if successful_count:
+            _schedule_warmup(self)
 
-    except Job.DoesNotExist:
-        # Job was deleted or doesn't exist
-        return
+    except MemoryBudgetExceeded as e:
+        # Batches written so far are kept, as for any failure mid-file
+        _update_job(job_id, status='failed', error_details=[{'error': str(e)}])
     except Exception as e:
         # Handle unexpected errors
+        _update_job(job_id, status='failed', error_details=[{'error': f'Unexpected error: {str(e)}'}])
+    finally:
+        profiler.stop()
+        if profiler.enabled:
+            _update_job(job_id, profile=profiler.result())
+        if file_path:
+            remove_upload(file_path)
+        # A worker just freed up
         try:
-            job = Job.objects.get(id=job_id)
-            job.status = 'failed'
-            job.error_details = [{'error': f'Unexpected error: {str(e)}'}]
-            job.save()
-        except Job.DoesNotExist:
-            pass 
\ No newline at end of file
+            dispatch_deferred()
+        except Exception as e:
+            logger.warning("Could not dispatch deferred uploads: %s", e)
+        log.job_id.reset(log_token)
+
+
+@shared_task
+def dispatch_deferred_uploads():
+    """Periodic (Celery beat): queue deferred uploads as the import backlog drains"""
+    return dispatch_deferred()
+
+
+@shared_task(ignore_result=True)
+def rebuild_ngo_sketches():
+    """Periodic (Celery beat): rebuild the NGO sketches of months that lost reports"""
+    rebuilt = MonthNgoSketch.rebuild_stale()
+    if rebuilt:
+        logger.info("Rebuilt %d stale NGO sketches", rebuilt)
+    return rebuilt
+
+
+@shared_task(ignore_result=True)
+def warm_dashboard_snapshots(force=False):
+    """Periodic (Celery beat) and after imports: precompute the most read dashboard ranges"""
+    return warm(force=force)
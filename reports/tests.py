@@ -1,3 +1,1022 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from . import intake, log, partitions, renderers, services
+from .aggregation import SOURCE_REPORTS, SOURCE_ROLLUPS, AggregationQuery
+from .fast_serializers import ValuesSerializer
+from .middleware import READ_PRIMARY_COOKIE, choose_encoding
+from .models import Job, MonthlyRollup, MonthNgoSketch, Report, ReportArchive
+from .months import LAST_MONTH_KEY, month_key
+from .profiling import TaskProfiler
+from .renderers import FastJSONRenderer
+from .serializers import ReportSerializer
+from .services import delete_reports, save_report, save_reports
+from .tasks import REQUIRED_COLUMNS, _read_rows, _schedule_warmup, process_csv_upload
+from .throttling import AggregationBusy, InMemoryBackend, _load_backend, aggregation_slot
+
+# A second database standing in for the read replica (another SQLite file,
+# or another PostgreSQL database), registered at import so the test runner
+# creates and migrates it along with the default database. Nothing copies
+# rows between the two, so a response shows which one served it.
+if 'replica' not in settings.DATABASES:
+    default = settings.DATABASES['default']
+    if default['ENGINE'] == 'django.db.backends.sqlite3':
+        replica_name = os.path.join(tempfile.gettempdir(), 'ngo_impact_tracker_replica.sqlite3')
+        test_name = os.path.join(tempfile.gettempdir(), f'test_ngo_impact_tracker_replica_{os.getpid()}.sqlite3')
+    else:
+        replica_name = f"{default['NAME']}_replica"
+        test_name = f'test_{replica_name}'
+    settings.DATABASES['replica'] = {**default, 'NAME': replica_name, 'TEST': {**default['TEST'], 'NAME': test_name}}
+
+
+class MonthKeyMigrationTests(TransactionTestCase):
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([('reports', target)])
+        return executor.loader.project_state(('reports', target)).apps
+
+    def test_malformed_months_of_one_ngo_get_their_own_keys(self):
+        latest = MigrationLoader(connection).graph.leaf_nodes('reports')[0][1]
+        self.addCleanup(self.migrate, latest)
+        apps = self.migrate('0002_report_month_key')
+        Report = apps.get_model('reports', 'Report')
+        for month in ('2024-1', 'Jan-24', '2024-02'):
+            Report.objects.create(ngo_id='NGO-A', month=month, people_helped=1, events_conducted=1, funds_utilized=1)
+
+        apps = self.migrate(latest)
+
+        keys = dict(apps.get_model('reports', 'Report').objects.values_list('month', 'month_key'))
+        self.assertEqual(keys['2024-02'], month_key('2024-02'))
+        self.assertGreater(keys['2024-1'], LAST_MONTH_KEY)
+        self.assertGreater(keys['Jan-24'], LAST_MONTH_KEY)
+        self.assertNotEqual(keys['2024-1'], keys['Jan-24'])
+
+
+@override_settings(READ_REPLICA_ALIAS='replica')
+class ReadReplicaRoutingTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        Report.objects.using('replica').create(
+            ngo_id='NGO-REPLICA', month='2024-01', people_helped=1, events_conducted=1, funds_utilized=1
+        )
+
+    def list_ngo_ids(self, **extra):
+        response = self.client.get('/api/reports', **extra)
+        self.assertEqual(response.status_code, 200)
+        return [row['ngo_id'] for row in response.json()['data']]
+
+    def submit_report(self):
+        return self.client.post('/api/report', {
+            'ngo_id': 'NGO-PRIMARY',
+            'month': '2024-01',
+            'people_helped': 10,
+            'events_conducted': 2,
+            'funds_utilized': '100.00',
+        }, content_type='application/json')
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(self.list_ngo_ids(), ['NGO-REPLICA'])
+
+    def test_read_primary_header_reads_from_primary(self):
+        self.assertEqual(self.list_ngo_ids(HTTP_X_READ_PRIMARY='1'), [])
+
+    def test_write_goes_to_primary_and_pins_the_client(self):
+        response = self.submit_report()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(READ_PRIMARY_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[READ_PRIMARY_COOKIE]['max-age'], settings.READ_REPLICA_PIN_SECONDS)
+        self.assertTrue(Report.objects.using('default').filter(ngo_id='NGO-PRIMARY').exists())
+        self.assertFalse(Report.objects.using('replica').filter(ngo_id='NGO-PRIMARY').exists())
+        # The test client sends the cookie back
+        self.assertEqual(self.list_ngo_ids(), ['NGO-PRIMARY'])
+
+    def test_failed_write_does_not_pin(self):
+        response = self.client.post('/api/report', {'ngo_id': 'NGO-PRIMARY'}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(READ_PRIMARY_COOKIE, response.cookies)
+
+    def test_views_that_do_not_opt_in_do_not_pin(self):
+        response = self.client.post('/admin/login/', {'username': 'nobody', 'password': 'wrong'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(READ_PRIMARY_COOKIE, response.cookies)
+
+
+class NgoSketchTests(TestCase):
+    def setUp(self):
+        save_reports((f'NGO-{n}', '2024-01', 1, 1, 1) for n in range(10))
+        self.month_key = Report.objects.values_list('month_key', flat=True).first()
+
+    def test_deletion_marks_the_month_stale(self):
+        delete_reports(Report.objects.filter(ngo_id__in=['NGO-0', 'NGO-1']))
+
+        self.assertTrue(MonthNgoSketch.objects.get(month_key=self.month_key).stale)
+
+    def test_estimate_is_read_only_and_counts_stale_months_from_reports(self):
+        delete_reports(Report.objects.filter(ngo_id__in=['NGO-0', 'NGO-1']))
+        sketch = MonthNgoSketch.objects.get(month_key=self.month_key)
+
+        self.assertEqual(round(MonthNgoSketch.estimate(self.month_key, self.month_key)), 8)
+        sketch_after = MonthNgoSketch.objects.get(month_key=self.month_key)
+        self.assertTrue(sketch_after.stale)
+        self.assertEqual(sketch_after.updated_at, sketch.updated_at)
+
+    def test_rebuild_stale(self):
+        delete_reports(Report.objects.filter(ngo_id__in=['NGO-0', 'NGO-1']))
+
+        self.assertEqual(MonthNgoSketch.rebuild_stale(), 1)
+        self.assertFalse(MonthNgoSketch.objects.get(month_key=self.month_key).stale)
+        self.assertEqual(round(MonthNgoSketch.estimate(self.month_key, self.month_key)), 8)
+        self.assertEqual(MonthNgoSketch.rebuild_stale(), 0)
+
+
+class UploadProfilingTests(TestCase):
+    def upload(self, **extra):
+        upload = SimpleUploadedFile('reports.csv', b'ngo_id,month,people_helped,events_conducted,funds_utilized\n')
+        return self.client.post('/api/reports/upload', {'file': upload, 'profile': 'cprofile'}, **extra)
+
+    def test_anonymous_clients_cannot_profile(self):
+        response = self.upload()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('profile', response.json()['errors'])
+
+    @override_settings(CSV_TASK_PROFILE_ON_REQUEST=True)
+    def test_setting_lets_anyone_profile(self):
+        with mock.patch('reports.views.process_csv_upload.delay') as delay:
+            response = self.upload()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(delay.call_args.kwargs['profile'], 'cprofile')
+
+    def test_staff_can_profile(self):
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        with mock.patch('reports.views.process_csv_upload.delay') as delay:
+            response = self.upload()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(delay.call_args.kwargs['profile'], 'cprofile')
+
+
+class TaskProfilerTests(SimpleTestCase):
+    @mock.patch('reports.profiling.RSS_SAMPLE_INTERVAL', 0)
+    @mock.patch('reports.profiling.peak_rss_mb', return_value=900.0)
+    @mock.patch('reports.profiling.rss_mb', side_effect=[50.0, 80.0, 60.0, 55.0])
+    def test_peak_rss_is_sampled_over_the_run(self, rss_mb, peak_rss_mb):
+        profiler = TaskProfiler('job', 'timers')
+        profiler.start()
+        for name in ('count', 'write'):
+            with profiler.phase(name):
+                pass
+        profiler.stop()
+
+        result = profiler.result()
+        # Not the worker's lifetime high-water mark, left by an earlier job
+        self.assertEqual(result['peak_rss_mb'], 80.0)
+        self.assertEqual(result['process_peak_rss_mb'], 900.0)
+
+
+CSV_HEADER = b'ngo_id,month,people_helped,events_conducted,funds_utilized\n'
+
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+@mock.patch('reports.intake.broker_queue_depth', return_value=0)
+class CompressedUploadTests(TestCase):
+    def setUp(self):
+        spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spool_dir)
+        self.enterContext(override_settings(UPLOAD_SPOOL_DIR=spool_dir))
+
+    def upload(self, name, content):
+        """Post the file and run the import it queued; returns (response, job)"""
+        with mock.patch('reports.views.process_csv_upload.delay') as delay:
+            response = self.client.post('/api/reports/upload', {'file': SimpleUploadedFile(name, content)})
+        if response.status_code != 202:
+            return response, None
+        process_csv_upload.apply(args=delay.call_args.args, kwargs=delay.call_args.kwargs)
+        self.assertFalse(os.path.exists(delay.call_args.kwargs['file_path']))
+        return response, Job.objects.get(id=response.json()['job_id'])
+
+    def test_gzip_upload_is_imported(self, broker_queue_depth):
+        _, job = self.upload('reports.csv.gz', gzip.compress(CSV_HEADER + b'NGO-A,2024-01,5,1,10\n'))
+
+        self.assertEqual((job.status, job.successful_rows), ('completed', 1))
+        self.assertTrue(Report.objects.filter(ngo_id='NGO-A').exists())
+
+    def test_every_csv_in_a_zip_is_imported(self, broker_queue_depth):
+        content = zip_bytes({
+            'january.csv': CSV_HEADER + b'NGO-A,2024-01,5,1,10\n',
+            'nested/february.csv': CSV_HEADER + b'NGO-A,2024-02,6,1,10\n',
+            'notes.txt': b'ignored',
+        })
+        _, job = self.upload('reports.zip', content)
+
+        self.assertEqual((job.status, job.successful_rows), ('completed', 2))
+
+    @override_settings(UPLOAD_MAX_FILE_SIZE=100)
+    def test_upload_over_the_size_limit_is_refused(self, broker_queue_depth):
+        response, _ = self.upload('reports.csv.gz', os.urandom(200))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertRegex(response.json()['errors']['file'][0], r'^File size cannot exceed')
+
+    def test_zip_bomb_is_refused_from_its_declared_sizes(self, broker_queue_depth):
+        response, _ = self.upload('reports.zip', zip_bytes({'bomb.csv': CSV_HEADER + b'0' * (2 * 1024 * 1024)}))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors']['file'], ['Compression ratio exceeds 100:1'])
+
+    def test_gzip_bomb_fails_the_import_while_streaming(self, broker_queue_depth):
+        _, job = self.upload('reports.csv.gz', gzip.compress(CSV_HEADER + b'0' * (2 * 1024 * 1024)))
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error_details, [{'error': 'Compression ratio exceeds 100:1'}])
+        self.assertFalse(Report.objects.exists())
+
+    def test_truncated_gzip_fails_the_import(self, broker_queue_depth):
+        content = gzip.compress(CSV_HEADER + b''.join(b'NGO-%d,2024-01,5,1,10\n' % i for i in range(500)))
+        _, job = self.upload('reports.csv.gz', content[:len(content) // 2])
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error_details, [{'error': 'Could not decompress the uploaded file'}])
+
+    def test_corrupt_archives_are_refused(self, broker_queue_depth):
+        for name, content, error in (
+            ('reports.csv.gz', b'not gzip at all', 'File is not a valid gzip archive'),
+            ('reports.zip', b'PK\x03\x04 not a zip', 'File is not a valid zip archive'),
+            ('reports.zip', zip_bytes({'notes.txt': b'no csv'}), 'Zip archive contains no CSV files'),
+        ):
+            with self.subTest(error=error):
+                response, _ = self.upload(name, content)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['errors']['file'], [error])
+
+
+@mock.patch('reports.intake.broker_queue_depth', return_value=0)
+class DeferredUploadTests(TestCase):
+    def setUp(self):
+        spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spool_dir)
+        self.enterContext(override_settings(UPLOAD_SPOOL_DIR=spool_dir))
+        self.enterContext(mock.patch('reports.views.intake.admission', return_value=intake.Admission(intake.DEFER, 1)))
+
+    def upload(self, content):
+        return self.client.post('/api/reports/upload', {'file': SimpleUploadedFile('reports.csv', content)})
+
+    def test_non_utf8_csv_is_refused_before_deferring(self, broker_queue_depth):
+        response = self.upload('ngo_id,month\nCAFÉ,2024-01\n'.encode('latin-1'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_task_arguments_are_kept_until_the_import_starts(self, broker_queue_depth):
+        response = self.upload(b'ngo_id,month,people_helped,events_conducted,funds_utilized\nNGO-A,2024-01,5,1,10\n')
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(id=response.json()['job_id'])
+
+        with mock.patch('reports.tasks.process_csv_upload.delay') as delay:
+            self.assertEqual(intake.dispatch_deferred(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+        self.assertEqual(job.task_kwargs, delay.call_args.kwargs)
+
+        process_csv_upload.apply(args=delay.call_args.args, kwargs=delay.call_args.kwargs)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertIsNone(job.task_kwargs)
+        self.assertTrue(Report.objects.filter(ngo_id='NGO-A', month='2024-01').exists())
+
+
+class JobStatusETagTests(TestCase):
+    def setUp(self):
+        self.job = Job.objects.create(status='processing', file_name='a.csv', total_rows=10)
+        self.url = f'/api/job-status/{self.job.id}'
+
+    def test_matching_etag_answers_304(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_progress_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        Job.objects.filter(id=self.job.id).update(processed_rows=F('processed_rows') + 5, updated_at=self.job.updated_at)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['data']['processed_rows'], 5)
+
+    def test_asking_for_errors_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, {'include_errors': '1'}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('error_details', response.json()['data'])
+
+
+class ReadRowsTests(TestCase):
+    def dict_reader_values(self, content):
+        return [
+            tuple(row[column] for column in REQUIRED_COLUMNS)
+            for row in csv.DictReader(io.StringIO(content))
+        ]
+
+    def test_matches_dict_reader(self):
+        for content in (
+            # Reordered and extra columns, a blank line
+            'funds_utilized,extra,month,ngo_id,events_conducted,people_helped\n1.5,x,2024-01,NGO-A,2,3\n\n4,y,2024-02,NGO-B,5,6\n',
+            # Short rows read the missing columns as None
+            'ngo_id,month,people_helped,events_conducted,funds_utilized\nNGO-A,2024-01\nNGO-B\n',
+            # A repeated header name means its last column
+            'ngo_id,month,people_helped,events_conducted,funds_utilized,month\nNGO-A,bad,1,1,1,2024-02\nNGO-B,bad,1,1,1\n',
+        ):
+            with self.subTest(content=content):
+                self.assertEqual([values for values, _ in _read_rows(content)], self.dict_reader_values(content))
+
+    def test_short_and_duplicate_column_rows_through_an_import(self):
+        content = (
+            'ngo_id,month,people_helped,events_conducted,funds_utilized,month\n'
+            'NGO-A,bad,1,1,1,2024-02\n'
+            'NGO-B,2024-01\n'
+        )
+        job = Job.objects.create(status='pending', file_name='rows.csv')
+
+        process_csv_upload.apply(args=(str(job.id), content))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.successful_rows, job.failed_rows), ('completed', 1, 1))
+        self.assertEqual(Report.objects.get().month, '2024-02')
+        self.assertEqual(job.error_details[0]['row'], 2)
+        self.assertEqual(job.error_details[0]['raw'], 'NGO-B,2024-01')
+
+    @override_settings(CSV_TASK_MAX_RSS_MB=100)
+    @mock.patch('reports.tasks.BATCH_SIZE', 2)
+    @mock.patch('reports.tasks.rss_mb', side_effect=[50.0, 150.0])
+    def test_import_stops_past_the_memory_budget(self, rss_mb):
+        content = 'ngo_id,month,people_helped,events_conducted,funds_utilized\n' + ''.join(
+            f'NGO-{i},2024-01,1,1,1\n' for i in range(5)
+        )
+        job = Job.objects.create(status='pending', file_name='big.csv')
+
+        process_csv_upload.apply(args=(str(job.id), content))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error_details, [{'error': 'Import exceeded the worker memory budget (150MB > 100MB)'}])
+        # The batch written before the check stays
+        self.assertEqual(Report.objects.count(), 2)
+
+
+class WarmupSchedulingTests(SimpleTestCase):
+    def test_only_imports_on_a_worker_schedule_the_warmup(self):
+        task = mock.Mock()
+        with mock.patch('reports.tasks.warm_dashboard_snapshots.apply_async') as apply_async:
+            for called_directly, is_eager in ((True, False), (False, True)):
+                task.request.called_directly, task.request.is_eager = called_directly, is_eager
+                _schedule_warmup(task)
+            apply_async.assert_not_called()
+
+            task.request.called_directly = task.request.is_eager = False
+            _schedule_warmup(task)
+        apply_async.assert_called_once()
+
+
+class MonthlyRollupTests(TestCase):
+    def totals(self):
+        return {
+            rollup.month_key: (rollup.report_count, rollup.people_helped, rollup.events_conducted, rollup.funds_utilized)
+            for rollup in MonthlyRollup.objects.all()
+        }
+
+    def test_writes_keep_every_month_in_step(self):
+        january, february = 2024 * 12 + 1, 2024 * 12 + 2
+        save_reports([('NGO-A', '2024-01', 10, 1, '1.50'), ('NGO-B', '2024-01', 5, 1, 1), ('NGO-A', '2024-02', 7, 2, 2)])
+        save_reports([('NGO-A', '2024-01', 4, 1, '0.25'), ('NGO-C', '2024-02', 1, 1, 1)])
+        delete_reports(Report.objects.filter(ngo_id='NGO-B'))
+
+        self.assertEqual(self.totals(), {
+            january: (1, 4, 1, Decimal('0.25')),
+            february: (2, 8, 3, Decimal('3.00')),
+        })
+        MonthlyRollup.recompute([january, february])
+        self.assertEqual(self.totals()[january], (1, 4, 1, Decimal('0.25')))
+
+
+class AggregationSourceTests(TestCase):
+    def setUp(self):
+        save_reports([
+            ('NGO-A', '2024-01', 1, 1, '1.10'), ('NGO-B', '2024-01', 2, 2, '2.20'),
+            ('NGO-A', '2024-02', 3, 3, '3.30'), ('NGO-A', '2024-05', 4, 4, '4.40'),
+        ])
+        # Leaves February's rollup row at zero
+        delete_reports(Report.objects.filter(month='2024-02'))
+
+    def rows(self, source, **kwargs):
+        query = AggregationQuery(month_key('2024-01'), month_key('2024-12'), **kwargs)
+        with mock.patch.object(AggregationQuery, 'source', new_callable=mock.PropertyMock, return_value=source):
+            return list(query.execute())
+
+    def test_rollups_and_reports_give_the_same_rows(self):
+        for group_by in ([], ['month'], ['quarter'], ['year']):
+            with self.subTest(group_by=group_by):
+                rollups = self.rows(SOURCE_ROLLUPS, group_by=group_by)
+                self.assertEqual(rollups, self.rows(SOURCE_REPORTS, group_by=group_by))
+        self.assertEqual(
+            self.rows(SOURCE_ROLLUPS, group_by=['month']),
+            [
+                {'month': '2024-01', 'report_count': 2, 'people_helped': 3, 'events_conducted': 3, 'funds_utilized': '3.30'},
+                {'month': '2024-05', 'report_count': 1, 'people_helped': 4, 'events_conducted': 4, 'funds_utilized': '4.40'},
+            ],
+        )
+
+
+class UpsertTests(TestCase):
+    """The native upsert path (INSERT ... ON CONFLICT ... RETURNING) of the write service"""
+
+    def rollup(self, month='2024-01'):
+        rollup = MonthlyRollup.objects.get(month_key=int(month[:4]) * 12 + int(month[5:]))
+        return rollup.report_count, rollup.people_helped, rollup.events_conducted, rollup.funds_utilized
+
+    def test_created_then_updated(self):
+        report, created = save_report('NGO-A', '2024-01', 10, 2, '100.50')
+        self.assertTrue(created)
+        self.assertEqual((report.people_helped, report.funds_utilized), (10, Decimal('100.50')))
+
+        report, created = save_report('NGO-A', '2024-01', 4, 1, '20')
+        self.assertFalse(created)
+        self.assertEqual((report.people_helped, report.funds_utilized), (4, Decimal('20.00')))
+        self.assertEqual(Report.objects.count(), 1)
+        # The update's delta subtracted the old metrics
+        self.assertEqual(self.rollup(), (1, 4, 1, Decimal('20.00')))
+
+    def test_bulk_counts_created_and_updated(self):
+        save_reports([('NGO-A', '2024-01', 1, 1, 1)])
+
+        self.assertEqual(save_reports([('NGO-A', '2024-01', 2, 2, 2), ('NGO-B', '2024-01', 3, 3, 3)]), (1, 1))
+        self.assertEqual(self.rollup(), (2, 5, 5, Decimal('5.00')))
+
+    def test_unknown_previous_values_recount_the_month(self):
+        native_upsert = services._native_upsert
+        raced = []
+
+        def racing_upsert(connection, rows, **kwargs):
+            # Another writer inserts the key after the batch read its old
+            # values, so the upsert updates a row it didn't know about
+            if not raced:
+                raced.append(True)
+                save_report('NGO-A', '2024-01', 1, 1, 1)
+            return native_upsert(connection, rows, **kwargs)
+
+        with mock.patch('reports.services._native_upsert', racing_upsert):
+            self.assertEqual(save_reports([('NGO-A', '2024-01', 5, 5, 5)]), (0, 1))
+
+        self.assertEqual(self.rollup(), (1, 5, 5, Decimal('5.00')))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs concurrent PostgreSQL connections')
+class ConcurrentUpsertTests(TransactionTestCase):
+    writers = 8
+
+    def run_concurrently(self, write):
+        barrier = threading.Barrier(self.writers)
+        results, errors = [], []
+
+        def writer(n):
+            try:
+                barrier.wait()
+                results.append(write(n))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(self.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def assertRollupMatchesReports(self, month_key):
+        rollup = MonthlyRollup.objects.get(month_key=month_key)
+        reports = Report.objects.filter(month_key=month_key)
+        self.assertEqual(rollup.report_count, reports.count())
+        self.assertEqual(rollup.people_helped, sum(reports.values_list('people_helped', flat=True)))
+
+    def test_duplicate_submissions_create_once(self):
+        results = self.run_concurrently(lambda n: save_report('NGO-A', '2024-01', n, 1, 1)[1])
+
+        self.assertEqual(sorted(results), [False] * (self.writers - 1) + [True])
+        self.assertEqual(Report.objects.count(), 1)
+        self.assertRollupMatchesReports(2024 * 12 + 1)
+
+    def test_overlapping_bulk_writes(self):
+        # Each writer starts at a different point, which deadlocks unless
+        # the rows are locked in one order
+        records = [(f'NGO-{n}', f'2024-0{1 + n % 2}', 1, 1, 1) for n in range(800)]
+        results = self.run_concurrently(lambda n: save_reports(records[n * 100:] + records[:n * 100]))
+
+        self.assertEqual(sum(created for created, _ in results), 800)
+        self.assertEqual(Report.objects.count(), 800)
+        self.assertRollupMatchesReports(2024 * 12 + 1)
+        self.assertRollupMatchesReports(2024 * 12 + 2)
+
+
+class ReportAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        save_reports([('NGO-A', '2024-01', 1, 1, 1), ('NGO-B', '2024-02', 2, 2, 2)])
+        self.report_a = Report.objects.get(ngo_id='NGO-A')
+
+    def post(self, url, ngo_id, month, people_helped=5):
+        return self.client.post(url, {
+            'ngo_id': ngo_id, 'month': month, 'people_helped': people_helped, 'events_conducted': 1, 'funds_utilized': '1.00',
+        })
+
+    def test_moving_onto_another_report_is_refused(self):
+        response = self.post(f'/admin/reports/report/{self.report_a.pk}/change/', 'NGO-B', '2024-02')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'A report for this NGO and month already exists.')
+        self.assertEqual(sorted(Report.objects.values_list('ngo_id', 'people_helped')), [('NGO-A', 1), ('NGO-B', 2)])
+
+    def test_adding_a_duplicate_is_refused(self):
+        response = self.post('/admin/reports/report/add/', 'NGO-B', '2024-02')
+
+        self.assertContains(response, 'A report for this NGO and month already exists.')
+        self.assertEqual(Report.objects.get(ngo_id='NGO-B').people_helped, 2)
+
+    def test_moving_a_report_updates_it_in_place(self):
+        response = self.post(f'/admin/reports/report/{self.report_a.pk}/change/', 'NGO-A', '2024-03')
+
+        self.assertEqual(response.status_code, 302)
+        report = Report.objects.get(ngo_id='NGO-A')
+        self.assertEqual((report.pk, report.month_key, report.people_helped), (self.report_a.pk, month_key('2024-03'), 5))
+        self.assertEqual(report.created_at, self.report_a.created_at)
+        self.assertEqual(MonthlyRollup.objects.get(month_key=month_key('2024-01')).report_count, 0)
+        self.assertEqual(MonthlyRollup.objects.get(month_key=month_key('2024-03')).people_helped, 5)
+
+
+class ReportArchiveTests(TestCase):
+    def setUp(self):
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir)
+        self.enterContext(override_settings(REPORT_ARCHIVE_DIR=archive_dir))
+        save_reports([('NGO-A', '2020-01', 1, 1, 1), ('NGO-B', '2020-02', 2, 2, 2), ('NGO-C', '2021-01', 3, 3, 3)])
+
+    def test_archiving_a_range_again_keeps_the_earlier_archive(self):
+        first, _ = partitions.archive('2021-01')
+        save_reports([('NGO-LATE', '2020-03', 4, 4, 4)])
+        second, _ = partitions.archive('2021-01')
+
+        self.assertEqual([archive.row_count for archive in first + second], [2, 1])
+        self.assertNotEqual(first[0].file_name, second[0].file_name)
+        self.assertEqual(ReportArchive.objects.count(), 2)
+        self.assertEqual(list(Report.objects.values_list('ngo_id', flat=True)), ['NGO-C'])
+
+        for archive in ReportArchive.objects.all():
+            partitions.restore(archive)
+        self.assertEqual(Report.objects.count(), 4)
+        self.assertEqual(MonthlyRollup.objects.get(month_key=2020 * 12 + 3).report_count, 1)
+
+    def test_restore_keeps_the_archived_timestamps(self):
+        stamp = datetime(2020, 3, 1, 12, tzinfo=timezone.utc)
+        Report.objects.filter(ngo_id='NGO-A').update(created_at=stamp, updated_at=stamp)
+        (archive,), _ = partitions.archive('2021-01')
+
+        partitions.restore(archive)
+
+        report = Report.objects.get(ngo_id='NGO-A')
+        self.assertEqual((report.created_at, report.updated_at), (stamp, stamp))
+        self.assertIsNotNone(ReportArchive.objects.get().restored_at)
+
+    def test_restore_keeps_reports_written_after_the_archive(self):
+        (archive,), _ = partitions.archive('2021-01')
+        save_report('NGO-A', '2020-01', 9, 9, 9)
+
+        self.assertEqual(partitions.restore(archive), 1)
+
+        self.assertEqual(Report.objects.get(ngo_id='NGO-A').people_helped, 9)
+        self.assertEqual(Report.objects.get(ngo_id='NGO-B').people_helped, 2)
+        self.assertEqual(MonthlyRollup.objects.get(month_key=2020 * 12 + 1).people_helped, 9)
+
+    def test_archive_deletes_only_the_exported_reports(self):
+        create = ReportArchive.objects.create
+
+        def create_with_late_report(**kwargs):
+            save_reports([('NGO-LATE', '2020-03', 4, 4, 4)])
+            return create(**kwargs)
+
+        with mock.patch.object(ReportArchive.objects, 'create', side_effect=create_with_late_report):
+            (archive,), _ = partitions.archive('2021-01')
+
+        self.assertEqual(archive.row_count, 2)
+        self.assertEqual(sorted(Report.objects.values_list('ngo_id', flat=True)), ['NGO-C', 'NGO-LATE'])
+
+    @skipIf(connection.vendor == 'postgresql', 'converts the table on PostgreSQL')
+    def test_convert_needs_postgresql(self):
+        with self.assertRaises(ValueError):
+            partitions.convert_to_partitioned()
+
+    @skipUnless(connection.vendor == 'postgresql', 'native partitioning needs PostgreSQL')
+    def test_writes_archive_and_restore_on_a_partitioned_table(self):
+        self.assertTrue(partitions.convert_to_partitioned())
+
+        self.assertEqual(save_report('NGO-A', '2020-01', 5, 5, 5)[1], False)
+        self.assertEqual(save_report('NGO-D', '2021-02', 1, 1, 1)[1], True)
+        (archive,), dropped = partitions.archive('2021-01')
+        self.assertEqual(dropped, [partitions.partition_name(2020)])
+        self.assertEqual(partitions.restore(archive), 2)
+        self.assertEqual(Report.objects.get(ngo_id='NGO-A').people_helped, 5)
+
+    @skipUnless(connection.vendor == 'postgresql', 'native partitioning needs PostgreSQL')
+    def test_convert_keeps_constraints_and_index_names(self):
+        with connection.cursor() as cursor:
+            indexes = set(partitions._index_names(cursor, partitions.TABLE).values())
+        self.assertTrue(partitions.convert_to_partitioned())
+
+        # Same names, with the primary key now on (id, month_key)
+        with connection.cursor() as cursor:
+            self.assertEqual(set(partitions._index_names(cursor, partitions.TABLE).values()), indexes)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Report.objects.bulk_create([Report(ngo_id='NGO-X', month='2020-05', month_key=2020 * 12 + 5,
+                                               people_helped=-1, events_conducted=0, funds_utilized=0)])
+
+    @skipUnless(connection.vendor == 'postgresql', 'native partitioning needs PostgreSQL')
+    def test_new_partition_takes_its_rows_from_the_default_partition(self):
+        self.assertTrue(partitions.convert_to_partitioned(years_ahead=0))
+        save_report('NGO-FAR', '2090-06', 1, 1, 1)
+
+        partitions.ensure_partitions([2090])
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT ngo_id FROM {partitions.partition_name(2090)}')
+            self.assertEqual(cursor.fetchall(), [('NGO-FAR',)])
+            cursor.execute(f'SELECT COUNT(*) FROM {partitions.DEFAULT_PARTITION}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+class JobValuesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'file_name', 'total_rows', 'error_details', 'created_at', 'started_at', 'completed_at']
+
+
+class ValuesSerializerTests(TestCase):
+    def assertSameJSON(self, serializer_class, queryset):
+        fast = ValuesSerializer(serializer_class).serialize(queryset)
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(serializer_class(queryset, many=True).data))
+
+    def test_reports_match_report_serializer(self):
+        save_reports([
+            ('NGO-A', '2024-01', 0, 0, '0.10'),
+            ('NGO-B', '2024-02', 5, 1, '12345.6'),
+            ('NGO-C', '2024-03', 7, 2, '9999999999.99'),
+        ])
+        Report.objects.filter(ngo_id='NGO-A').update(created_at=datetime(2024, 1, 31, 23, 59, 59, 123456, tzinfo=timezone.utc))
+
+        for time_zone in ('UTC', 'Asia/Kolkata'):
+            with self.subTest(time_zone=time_zone), override_settings(TIME_ZONE=time_zone):
+                self.assertSameJSON(ReportSerializer, Report.objects.order_by('ngo_id'))
+
+    def test_nulls_uuids_and_json_match_the_model_serializer(self):
+        Job.objects.create(status='pending', file_name='a.csv')
+        Job.objects.create(
+            status='failed', file_name='b.csv', total_rows=3, error_details=[{'row': 1, 'error': 'Bad month'}],
+            started_at=datetime(2024, 1, 1, tzinfo=timezone.utc), completed_at=datetime(2024, 1, 1, 0, 0, 1, tzinfo=timezone.utc),
+        )
+
+        self.assertSameJSON(JobValuesSerializer, Job.objects.order_by('file_name'))
+
+
+@skipUnless(renderers.orjson, 'orjson is not installed')
+class FastJSONRendererTests(TestCase):
+    def test_matches_json_renderer(self):
+        data = {
+            'funds': Decimal('1234.50'),
+            'cents': Decimal('0.10'),
+            'at': datetime(2024, 1, 31, 23, 59, 59, 123456, tzinfo=timezone.utc),
+            'whole_second': datetime(2024, 2, 1, tzinfo=timezone.utc),
+            'id': uuid.UUID('123e4567-e89b-12d3-a456-426614174000'),
+            'text': 'caf\u00e9 \u2028 line',
+            'nested': [{'none': None, 'flag': True, 'count': 3}],
+        }
+        fast = FastJSONRenderer().render(data)
+
+        self.assertEqual(fast, JSONRenderer().render(data))
+        decoded = json.loads(fast)
+        self.assertEqual(decoded['funds'], 1234.5)
+        self.assertEqual(decoded['at'], '2024-01-31T23:59:59.123456Z')
+        self.assertEqual(decoded['whole_second'], '2024-02-01T00:00:00Z')
+
+    def test_responses_match_json_renderer(self):
+        save_reports([('NGO-A', '2024-01', 5, 1, '10.50'), ('NGO-B', '2024-01', 7, 2, '0.05')])
+        for path in ('/api/reports', '/api/dashboard?month=2024-01'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+                self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+
+class InMemoryBackendTests(SimpleTestCase):
+    def test_bucket_refills_over_time(self):
+        backend = InMemoryBackend()
+        with mock.patch('reports.throttling.time.monotonic', return_value=100.0):
+            self.assertEqual(backend.take('key', 2, 1.0), 0)
+            self.assertEqual(backend.take('key', 2, 1.0), 0)
+            self.assertEqual(backend.take('key', 2, 1.0), 1.0)
+        with mock.patch('reports.throttling.time.monotonic', return_value=100.5):
+            self.assertEqual(backend.take('key', 2, 1.0), 0.5)
+        with mock.patch('reports.throttling.time.monotonic', return_value=101.5):
+            self.assertEqual(backend.take('key', 2, 1.0), 0)
+
+    def test_slots(self):
+        backend = InMemoryBackend()
+        token = backend.acquire('name', 1, 60)
+        self.assertIsNotNone(token)
+        self.assertIsNone(backend.acquire('name', 1, 60))
+        backend.release('name', token)
+        self.assertIsNotNone(backend.acquire('name', 1, 60))
+
+
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        # A fresh InMemoryBackend, so buckets don't carry over between tests
+        _load_backend.cache_clear()
+        self.addCleanup(_load_backend.cache_clear)
+
+    def rates(self, **rates):
+        return override_settings(REST_FRAMEWORK=dict(
+            settings.REST_FRAMEWORK,
+            DEFAULT_THROTTLE_RATES=dict(settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **rates),
+        ))
+
+    def test_empty_bucket_answers_429_with_retry_after(self):
+        with self.rates(dashboard='2/min'):
+            for _ in range(2):
+                self.assertEqual(self.client.get('/api/dashboard', {'month': '2024-01'}).status_code, 200)
+            response = self.client.get('/api/dashboard', {'month': '2024-01'})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_dashboard_ranges_cost_a_token_per_started_year(self):
+        params = {'from_month': '2020-01', 'to_month': '2022-06'}
+        with self.rates(dashboard='3/min'):
+            self.assertEqual(self.client.get('/api/dashboard', params).status_code, 200)
+            self.assertEqual(self.client.get('/api/dashboard', params).status_code, 429)
+
+    def test_revalidations_answered_304_are_free(self):
+        with self.rates(dashboard='1/min'):
+            etag = self.client.get('/api/dashboard', {'month': '2024-01'})['ETag']
+            for _ in range(3):
+                response = self.client.get('/api/dashboard', {'month': '2024-01'}, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+            # A changed (or stale) ETag is charged like any request
+            response = self.client.get('/api/dashboard', {'month': '2024-02'}, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 429)
+
+    @override_settings(AGGREGATION_CONCURRENCY={'LIMIT': 1, 'WAIT': 0, 'TIMEOUT': 60, 'RETRY_AFTER': 2})
+    def test_busy_aggregation_slots_answer_503(self):
+        with aggregation_slot('dashboard'):
+            response = self.client.get('/api/dashboard', {'month': '2024-01'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertEqual(self.client.get('/api/dashboard', {'month': '2024-01'}).status_code, 200)
+
+
+# Closing a stream sends request_finished, which closes the connection
+# (and would end TestCase's wrapping transaction on PostgreSQL)
+@override_settings(AGGREGATION_CONCURRENCY={'LIMIT': 1, 'WAIT': 0, 'TIMEOUT': 60, 'RETRY_AFTER': 2})
+class AggregationStreamTests(TransactionTestCase):
+    params = {'from_month': '2024-01', 'to_month': '2024-12', 'group_by': 'ngo,month', 'output': 'ndjson'}
+
+    def setUp(self):
+        _load_backend.cache_clear()
+        self.addCleanup(_load_backend.cache_clear)
+        save_reports([('NGO-A', '2024-01', 5, 1, '10.50'), ('NGO-A', '2024-02', 6, 1, '1'), ('NGO-B', '2024-01', 7, 2, '0.05')])
+
+    def assertSlotFree(self):
+        with aggregation_slot('dashboard'):
+            pass
+
+    def test_streams_one_group_per_line(self):
+        response = self.client.get('/api/dashboard/aggregate', self.params)
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['X-Aggregation-Source'], 'reports')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {'ngo_id': 'NGO-A', 'month': '2024-01', 'report_count': 1, 'people_helped': 5, 'events_conducted': 1, 'funds_utilized': '10.50'},
+            {'ngo_id': 'NGO-A', 'month': '2024-02', 'report_count': 1, 'people_helped': 6, 'events_conducted': 1, 'funds_utilized': '1.00'},
+            {'ngo_id': 'NGO-B', 'month': '2024-01', 'report_count': 1, 'people_helped': 7, 'events_conducted': 2, 'funds_utilized': '0.05'},
+        ])
+        response.close()
+        self.assertSlotFree()
+
+    def test_busy_slots_answer_503(self):
+        with aggregation_slot('dashboard'):
+            response = self.client.get('/api/dashboard/aggregate', self.params)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '2')
+
+    def test_slot_is_held_until_the_stream_is_closed(self):
+        response = self.client.get('/api/dashboard/aggregate', self.params)
+        next(iter(response.streaming_content))
+
+        with self.assertRaises(AggregationBusy):
+            self.assertSlotFree()
+        # A client that goes away mid-stream: Django closes the response
+        response.close()
+        self.assertSlotFree()
+
+
+class ChooseEncodingTests(SimpleTestCase):
+    available = ('br', 'gzip')
+
+    def test_prefers_the_first_available_coding_on_a_tie(self):
+        self.assertEqual(choose_encoding('gzip, deflate, br', self.available), 'br')
+
+    def test_q_zero_refuses_a_coding(self):
+        self.assertEqual(choose_encoding('br;q=0, gzip', self.available), 'gzip')
+        self.assertIsNone(choose_encoding('br;q=0, gzip;q=0', self.available))
+
+    def test_highest_q_value_wins(self):
+        self.assertEqual(choose_encoding('br;q=0.5, gzip;q=0.8', self.available), 'gzip')
+
+    def test_wildcard_covers_unlisted_codings(self):
+        self.assertEqual(choose_encoding('*;q=0.1, br;q=0', self.available), 'gzip')
+        self.assertIsNone(choose_encoding('identity, *;q=0', self.available))
+
+    def test_no_header_or_malformed_q_value(self):
+        self.assertIsNone(choose_encoding('', self.available))
+        self.assertIsNone(choose_encoding('gzip;q=high', ('gzip',)))
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+        self.threads.add(threading.get_ident())
+
+
+class LoggingTests(SimpleTestCase):
+    def make_record(self, level=logging.INFO, msg='hello %s', args=('world',), exc_info=None):
+        record = logging.getLogger('reports.tests').makeRecord('reports.tests', level, __file__, 1, msg, args, exc_info)
+        log.ContextFilter().filter(record)
+        return record
+
+    def with_request_id(self, value):
+        token = log.request_id.set(value)
+        self.addCleanup(log.request_id.reset, token)
+
+    def test_json_formatter_emits_one_object_with_the_correlation_ids(self):
+        self.with_request_id('req-1')
+        token = log.job_id.set('job-1')
+        try:
+            record = self.make_record()
+        finally:
+            log.job_id.reset(token)
+
+        entry = json.loads(log.JsonFormatter().format(record))
+
+        self.assertEqual(
+            {k: entry[k] for k in ('level', 'logger', 'message', 'request_id', 'job_id')},
+            {'level': 'INFO', 'logger': 'reports.tests', 'message': 'hello world', 'request_id': 'req-1', 'job_id': 'job-1'},
+        )
+        self.assertEqual(entry['process'], os.getpid())
+        self.assertNotIn('exc_info', entry)
+
+    def test_json_formatter_leaves_out_unset_ids_and_keeps_the_traceback(self):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = self.make_record(logging.ERROR, 'failed', (), exc_info=sys.exc_info())
+
+        entry = json.loads(log.JsonFormatter().format(record))
+
+        self.assertNotIn('request_id', entry)
+        self.assertNotIn('job_id', entry)
+        self.assertIn('ValueError: boom', entry['exc_info'])
+
+    def test_sampling_keeps_about_the_rate_of_requests(self):
+        sampler = log.SamplingFilter(rate=0.1)
+        kept = 0
+        for _ in range(5000):
+            token = log.request_id.set(uuid.uuid4().hex)
+            try:
+                kept += sampler.filter(self.make_record())
+            finally:
+                log.request_id.reset(token)
+
+        self.assertAlmostEqual(kept / 5000, 0.1, delta=0.02)
+
+    def test_sampling_keeps_or_drops_a_request_as_a_whole(self):
+        sampler = log.SamplingFilter(rate=0.5)
+        for value in (uuid.uuid4().hex for _ in range(50)):
+            token = log.request_id.set(value)
+            try:
+                decisions = {sampler.filter(self.make_record(level)) for level in (logging.DEBUG, logging.INFO, logging.INFO)}
+            finally:
+                log.request_id.reset(token)
+            self.assertEqual(len(decisions), 1)
+
+    def test_sampling_never_drops_warnings_and_keeps_everything_at_rate_one(self):
+        self.with_request_id('req-1')
+        self.assertTrue(log.SamplingFilter(rate=0).filter(self.make_record(logging.WARNING)))
+        self.assertTrue(log.SamplingFilter(rate=0).filter(self.make_record(logging.ERROR)))
+        self.assertFalse(log.SamplingFilter(rate=0).filter(self.make_record()))
+        self.assertTrue(log.SamplingFilter(rate=1).filter(self.make_record(logging.DEBUG)))
+
+    def test_sampling_outside_a_request_is_random(self):
+        sampler = log.SamplingFilter(rate=0.25)
+        with mock.patch('reports.log.random.random', side_effect=[0.2, 0.3]):
+            self.assertEqual([sampler.filter(self.make_record()) for _ in range(2)], [True, False])
+
+    def test_configure_moves_handlers_behind_a_queue(self):
+        handler = ListHandler()
+        handler.setFormatter(log.JsonFormatter())
+        log.configure({
+            'version': 1,
+            'disable_existing_loggers': False,
+            'handlers': {'list': {'()': lambda: handler}},
+            'loggers': {'reports.tests.queued': {'handlers': ['list'], 'level': 'INFO'}},
+        })
+        # Put the project's logging back afterwards
+        self.addCleanup(log.configure, settings.LOGGING)
+        logger = logging.getLogger('reports.tests.queued')
+
+        self.assertEqual([type(h) for h in logger.handlers], [log._QueueHandler])
+        self.with_request_id('req-1')
+        args = ['before']
+        logger.info('value %s', args)
+        args[0] = 'after'
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            logger.exception('failed')
+        # Drain the queue
+        log._stop_listeners()
+
+        entries = [json.loads(line) for line in handler.lines]
+        self.assertEqual([e['message'] for e in entries], ["value ['before']", 'failed'])
+        self.assertEqual({e['request_id'] for e in entries}, {'req-1'})
+        self.assertIn('ValueError: boom', entries[1]['exc_info'])
+        self.assertNotIn(threading.get_ident(), handler.threads)
+
+
+@skipUnless(apps.is_installed('drf_spectacular'), 'the API docs are off')
+class OpenApiSchemaTests(SimpleTestCase):
+    def test_schema_builds_without_warnings(self):
+        call_command('spectacular', '--fail-on-warn', '--file', os.devnull)
@@ -0,0 +1,245 @@
+"""
+Rate limiting and admission control for expensive endpoints.
+
+TokenBucketThrottle is a DRF throttle keyed by client and by the view's
+``throttle_scope``: each (scope, client) pair has a bucket of N tokens that
+refills at N per period, using the rates in DEFAULT_THROTTLE_RATES. Views
+can charge more than one token for expensive requests via
+``get_throttle_cost(request)``.
+
+Views answering conditional GETs mix in ThrottleAfterRevalidationMixin so
+a revalidation answered 304 costs no tokens.
+
+aggregation_slot() caps how many heavy aggregations run at once across
+all processes, answering 503 with Retry-After when none frees up quickly.
+
+State lives in a pluggable backend (THROTTLE['BACKEND']): InMemoryBackend
+for tests and single-process development, RedisBackend in production.
+"""
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIOD_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'100/min' -> (capacity 100, refill 100/60 tokens per second)"""
+    count, period = rate.split('/')
+    capacity = int(count)
+    return capacity, capacity / PERIOD_SECONDS[period[0]]
+
+
+class InMemoryBackend:
+    """Process-local buckets and slots; fine for tests and a single runserver"""
+
+    def __init__(self, **options):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._slots = {}
+
+    def take(self, key, capacity, refill_rate, cost=1):
+        """Take cost tokens; returns 0 if allowed, else seconds until they are available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            wait = 0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / refill_rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > 10000:
+                self._prune(now)
+            return wait
+
+    def _prune(self, now):
+        # A bucket idle for a day has refilled under any sane rate
+        idle = [key for key, (_, updated) in self._buckets.items() if now - updated > 86400]
+        for key in idle:
+            del self._buckets[key]
+
+    def acquire(self, name, limit, timeout):
+        """Claim one of limit slots for at most timeout seconds; returns a token or None"""
+        now = time.monotonic()
+        with self._lock:
+            holders = {token: expires for token, expires in self._slots.get(name, {}).items() if expires > now}
+            self._slots[name] = holders
+            if len(holders) >= limit:
+                return None
+            token = uuid.uuid4().hex
+            holders[token] = now + timeout
+            return token
+
+    def release(self, name, token):
+        with self._lock:
+            self._slots.get(name, {}).pop(token, None)
+
+
+# KEYS[1] bucket hash; ARGV capacity, refill per second, cost. Uses the
+# server clock so every web process agrees on elapsed time.
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+# KEYS[1] sorted set of token -> expiry (ms); ARGV limit, timeout ms, token
+_ACQUIRE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class RedisBackend:
+    """Buckets and slots shared by every web process, updated atomically with Lua scripts"""
+
+    def __init__(self, url=None, prefix='throttle', **options):
+        # Imported here: DRF loads the throttle classes at startup, and redis
+        # is a heavy import for processes that use InMemoryBackend
+        try:
+            import redis
+        except ImportError:
+            raise ImportError('RedisBackend requires the redis package')
+        self._client = redis.Redis.from_url(url or settings.CELERY_BROKER_URL)
+        self._prefix = prefix
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+        self._acquire = self._client.register_script(_ACQUIRE_SCRIPT)
+
+    def take(self, key, capacity, refill_rate, cost=1):
+        return float(self._take(keys=[f'{self._prefix}:bucket:{key}'], args=[capacity, refill_rate, cost]))
+
+    def acquire(self, name, limit, timeout):
+        token = uuid.uuid4().hex
+        if self._acquire(keys=[f'{self._prefix}:slots:{name}'], args=[limit, int(timeout * 1000), token]):
+            return token
+        return None
+
+    def release(self, name, token):
+        self._client.zrem(f'{self._prefix}:slots:{name}', token)
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path, **options):
+    return import_string(path)(**options)
+
+
+def get_backend():
+    options = dict(settings.THROTTLE)
+    return _load_backend(options.pop('BACKEND'), **{key.lower(): value for key, value in options.pop('OPTIONS', {}).items()})
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Per-client token bucket for views with a throttle_scope listed in
+    DEFAULT_THROTTLE_RATES; other views are not throttled.
+    """
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if rate is None:
+            return True
+
+        capacity, refill_rate = parse_rate(rate)
+        cost = view.get_throttle_cost(request) if hasattr(view, 'get_throttle_cost') else 1
+        user = getattr(request, 'user', None)
+        ident = f'user:{user.pk}' if user is not None and user.is_authenticated else self.get_ident(request)
+
+        self.wait_seconds = get_backend().take(f'{scope}:{ident}', capacity, refill_rate, min(cost, capacity))
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class ThrottleAfterRevalidationMixin:
+    """
+    For APIViews with ETags: a GET carrying If-None-Match is throttled only
+    once the view calls check_revalidated_throttles(request) after its ETag
+    check, so unchanged polls answered 304 are free. Without If-None-Match
+    throttling happens up front as usual.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        request.throttle_after_revalidation = (
+            request.method in ('GET', 'HEAD') and 'HTTP_IF_NONE_MATCH' in request.META
+        )
+        super().initial(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        if not request.throttle_after_revalidation:
+            super().check_throttles(request)
+
+    def check_revalidated_throttles(self, request):
+        """Call when the request won't be answered 304"""
+        if request.throttle_after_revalidation:
+            request.throttle_after_revalidation = False
+            super().check_throttles(request)
+
+
+class AggregationBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many aggregations are running. Please retry shortly.'
+    default_code = 'aggregation_busy'
+
+    def __init__(self, wait):
+        super().__init__()
+        # DRF's exception handler turns this into a Retry-After header
+        self.wait = wait
+
+
+@contextmanager
+def aggregation_slot(name):
+    """
+    Hold one of AGGREGATION_CONCURRENCY['LIMIT'] slots for name while the
+    block runs. Waits up to 'WAIT' seconds for a free slot, then raises
+    AggregationBusy. A slot held longer than 'TIMEOUT' (a crashed worker)
+    is released automatically.
+    """
+    config = settings.AGGREGATION_CONCURRENCY
+    backend = get_backend()
+    deadline = time.monotonic() + config['WAIT']
+    while (token := backend.acquire(name, config['LIMIT'], config['TIMEOUT'])) is None:
+        if time.monotonic() >= deadline:
+            raise AggregationBusy(config['RETRY_AFTER'])
+        time.sleep(0.05)
+    try:
+        yield
+    finally:
+        backend.release(name, token)
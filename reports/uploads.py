@@ -0,0 +1,148 @@
+"""
+Helpers for bulk uploads: storing uploaded files for the worker and reading
+compressed CSVs (``.csv.gz`` and ``.zip``) as a stream of text, without
+ever holding the decompressed file in memory.
+"""
+import gzip
+import io
+import os
+import zipfile
+
+from django.conf import settings
+
+PLAIN_SUFFIX = '.csv'
+GZIP_SUFFIX = '.csv.gz'
+ZIP_SUFFIX = '.zip'
+ALLOWED_SUFFIXES = (PLAIN_SUFFIX, GZIP_SUFFIX, ZIP_SUFFIX)
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class UploadLimitError(ValueError):
+    """Raised when an upload is malformed or decompresses beyond the configured limits"""
+
+
+def is_compressed(file_name):
+    name = file_name.lower()
+    return name.endswith(GZIP_SUFFIX) or name.endswith(ZIP_SUFFIX)
+
+
+def _csv_members(archive):
+    return [
+        info for info in archive.infolist()
+        if not info.is_dir()
+        and info.filename.lower().endswith(PLAIN_SUFFIX)
+        and not info.filename.startswith('__MACOSX/')
+    ]
+
+
+def _decompressed_limit(compressed_size):
+    """Return (limit in bytes, error message) for a file of compressed_size bytes"""
+    max_size = settings.UPLOAD_MAX_DECOMPRESSED_SIZE
+    max_ratio = settings.UPLOAD_MAX_COMPRESSION_RATIO
+    if max_ratio * compressed_size < max_size:
+        return max_ratio * compressed_size, f'Compression ratio exceeds {max_ratio}:1'
+    return max_size, f'Decompressed data exceeds {max_size // (1024 * 1024)}MB'
+
+
+def inspect_upload(uploaded_file):
+    """
+    Cheap checks on a compressed upload before it is accepted: the archive
+    is readable, contains CSV data, and (for zip files) the sizes it declares
+    are within limits. The actual sizes are enforced again while streaming.
+    """
+    name = uploaded_file.name.lower()
+    uploaded_file.seek(0)
+    try:
+        if name.endswith(GZIP_SUFFIX):
+            if uploaded_file.read(2) != GZIP_MAGIC:
+                raise UploadLimitError('File is not a valid gzip archive')
+            return
+
+        if not zipfile.is_zipfile(uploaded_file):
+            raise UploadLimitError('File is not a valid zip archive')
+        with zipfile.ZipFile(uploaded_file) as archive:
+            members = _csv_members(archive)
+            if not members:
+                raise UploadLimitError('Zip archive contains no CSV files')
+            limit, message = _decompressed_limit(uploaded_file.size)
+            if sum(info.file_size for info in members) > limit:
+                raise UploadLimitError(message)
+    finally:
+        uploaded_file.seek(0)
+
+
+def save_upload(uploaded_file, job_id):
+    """Write an uploaded file to UPLOAD_SPOOL_DIR for the worker and return its path"""
+    spool_dir = settings.UPLOAD_SPOOL_DIR
+    os.makedirs(spool_dir, exist_ok=True)
+    suffix = GZIP_SUFFIX if uploaded_file.name.lower().endswith(GZIP_SUFFIX) else os.path.splitext(uploaded_file.name)[1].lower()
+    path = os.path.join(spool_dir, f'{job_id}{suffix}')
+    with open(path, 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    return path
+
+
+def remove_upload(path):
+    """Delete a spooled upload once the worker is done with it"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _DecompressionBudget:
+    """Decompressed byte budget shared by every member of one upload"""
+
+    def __init__(self, compressed_size):
+        self.remaining, self.message = _decompressed_limit(compressed_size)
+
+    def consume(self, size):
+        self.remaining -= size
+        if self.remaining < 0:
+            raise UploadLimitError(self.message)
+
+
+class _LimitedReader(io.RawIOBase):
+    """Binary stream that charges everything it reads to a _DecompressionBudget"""
+
+    def __init__(self, raw, budget):
+        self._raw = raw
+        self._budget = budget
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._raw.read(len(buffer))
+        self._budget.consume(len(data))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _text(raw, budget):
+    return io.TextIOWrapper(io.BufferedReader(_LimitedReader(raw, budget)), encoding='utf-8', newline='')
+
+
+def open_csv_streams(path):
+    """
+    Yield (member name, text stream) for every CSV in the upload at path.
+    Plain and gzip files yield a single stream named None, zip files one
+    per CSV member. Streams are decompressed lazily as they are read.
+    """
+    name = path.lower()
+
+    if name.endswith(ZIP_SUFFIX):
+        budget = _DecompressionBudget(os.path.getsize(path))
+        with zipfile.ZipFile(path) as archive:
+            for info in _csv_members(archive):
+                with archive.open(info) as raw:
+                    yield info.filename, _text(raw, budget)
+    elif name.endswith(GZIP_SUFFIX):
+        budget = _DecompressionBudget(os.path.getsize(path))
+        with gzip.open(path, 'rb') as raw:
+            yield None, _text(raw, budget)
+    else:
+        with open(path, 'rb') as raw:
+            yield None, io.TextIOWrapper(raw, encoding='utf-8', newline='')
@@ -4,6 +4,7 @@ from .views import (
     BulkUploadView,
     JobStatusView,
     DashboardView,
+    AggregationView,
     ReportsListView
 )
 
@@ -12,5 +13,6 @@ urlpatterns = [
     path('reports/upload', BulkUploadView.as_view(), name='bulk-upload'),
     path('job-status/<str:job_id>', JobStatusView.as_view(), name='job-status'),
     path('dashboard', DashboardView.as_view(), name='dashboard'),
+    path('dashboard/aggregate', AggregationView.as_view(), name='dashboard-aggregate'),
     path('reports', ReportsListView.as_view(), name='reports-list'),
 ] 
\ No newline at end of file
@@ -1,21 +1,38 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.db.models import Sum, Count
+from django.conf import settings
 from django.db import IntegrityError
-from django.http import Http404
-from drf_spectacular.utils import extend_schema, OpenApiExample
-from drf_spectacular.openapi import OpenApiParameter
-from .models import Report, Job
+from django.http import Http404, StreamingHttpResponse
+from .conditional import etag_matches, make_etag, not_modified, with_etag
+from . import hll, intake
+from .aggregation import DIMENSIONS, METRICS, AggregationQuery
+from .models import Report, Job, DashboardSnapshot, MonthNgoSketch, MonthVersion
+from .months import is_valid_month, month_key
 from .serializers import (
     ReportSerializer, BulkUploadSerializer, JobStatusSerializer, DashboardSerializer
 )
+from .fast_serializers import ValuesSerializer
+from .renderers import FastJSONRenderer
+from .schema import OpenApiExample, OpenApiParameter, OpenApiResponse, OpenApiTypes, extend_schema
+from .services import save_report
 from .tasks import process_csv_upload
+from .throttling import ThrottleAfterRevalidationMixin, aggregation_slot
+from .uploads import is_compressed, remove_upload, save_upload
+from contextlib import ExitStack
 import uuid
 import logging
 
-logger = logging.getLogger('reports')
+logger = logging.getLogger(__name__)
+
+report_list_serializer = ValuesSerializer(ReportSerializer)
+
+# Job.save() always refreshes updated_at; the counters guard against two
+# saves landing on the same timestamp.
+JOB_ETAG_FIELDS = ('status', 'updated_at', 'total_rows', 'processed_rows', 'successful_rows', 'failed_rows')
+TRUTHY_PARAMS = ('1', 'true', 'yes')
 
 
 class ReportSubmissionView(APIView):
@@ -23,6 +40,8 @@ class ReportSubmissionView(APIView):
     API endpoint for submitting individual NGO reports
     POST /report
     """
+    pin_reads_to_primary = True
+    throttle_scope = 'submissions'
     
     @extend_schema(
         summary="Submit Individual NGO Report",
@@ -32,11 +51,11 @@ class ReportSubmissionView(APIView):
         responses={
             201: ReportSerializer,
             200: ReportSerializer,
-            400: OpenApiExample(
+            400: OpenApiResponse(OpenApiTypes.OBJECT, examples=[OpenApiExample(
                 "Validation Error",
                 value={"success": False, "message": "Validation failed", "errors": {}},
                 response_only=True,
-            ),
+            )]),
         },
         examples=[
             OpenApiExample(
@@ -61,21 +80,19 @@ class ReportSubmissionView(APIView):
                 ngo_id = serializer.validated_data['ngo_id']
                 month = serializer.validated_data['month']
                 
-                logger.info(f"Processing report submission for NGO {ngo_id}, month {month}")
+                logger.info("Processing report submission for NGO %s, month %s", ngo_id, month)
                 
-                # Use update_or_create for idempotency
-                report, created = Report.objects.update_or_create(
-                    ngo_id=ngo_id,
-                    month=month,
-                    defaults={
-                        'people_helped': serializer.validated_data['people_helped'],
-                        'events_conducted': serializer.validated_data['events_conducted'],
-                        'funds_utilized': serializer.validated_data['funds_utilized'],
-                    }
+                # Create or update (idempotent on ngo_id + month)
+                report, created = save_report(
+                    ngo_id,
+                    month,
+                    serializer.validated_data['people_helped'],
+                    serializer.validated_data['events_conducted'],
+                    serializer.validated_data['funds_utilized'],
                 )
                 
                 action = "created" if created else "updated"
-                logger.info(f"Report {action} successfully for NGO {ngo_id}, month {month}")
+                logger.info("Report %s successfully for NGO %s, month %s", action, ngo_id, month)
                 
                 response_serializer = ReportSerializer(report)
                 status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
@@ -106,14 +123,16 @@ class BulkUploadView(APIView):
     POST /reports/upload
     """
     parser_classes = [MultiPartParser, FormParser]
+    pin_reads_to_primary = True
+    throttle_scope = 'uploads'
     
     @extend_schema(
         summary="Bulk Upload CSV Reports",
-        description="Upload a CSV file containing multiple NGO reports for background processing. Returns a job ID for tracking progress.",
+        description="Upload a CSV file (plain, .csv.gz or .zip with one or more CSVs) containing multiple NGO reports for background processing. Returns a job ID for tracking progress.",
         tags=["Bulk Upload"],
         request=BulkUploadSerializer,
         responses={
-            202: OpenApiExample(
+            202: OpenApiResponse(OpenApiTypes.OBJECT, examples=[OpenApiExample(
                 "Upload Success",
                 value={
                     "success": True,
@@ -121,26 +140,60 @@ class BulkUploadView(APIView):
                     "job_id": "123e4567-e89b-12d3-a456-426614174000"
                 },
                 response_only=True,
-            ),
-            400: OpenApiExample(
+            )]),
+            400: OpenApiResponse(OpenApiTypes.OBJECT, examples=[OpenApiExample(
                 "Upload Error",
                 value={"success": False, "message": "File validation failed", "errors": {}},
                 response_only=True,
-            ),
+            )]),
+            503: OpenApiResponse(OpenApiTypes.OBJECT, examples=[OpenApiExample(
+                "Import Backlog Full",
+                value={
+                    "success": False,
+                    "message": "Too many uploads are waiting to be processed. Please retry later.",
+                    "retry_after": 120
+                },
+                response_only=True,
+            )]),
         },
     )
     
     def post(self, request):
-        serializer = BulkUploadSerializer(data=request.data)
+        # Refuse before reading the file when the import backlog is full
+        admission = intake.admission()
+        if admission.decision == intake.REJECT:
+            logger.warning("Rejected upload: %d import jobs waiting or running", admission.backlog)
+            return Response({
+                'success': False,
+                'message': 'Too many uploads are waiting to be processed. Please retry later.',
+                'retry_after': admission.retry_after
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': str(admission.retry_after)})
+        
+        serializer = BulkUploadSerializer(data=request.data, context={'request': request})
         
         if serializer.is_valid():
             uploaded_file = serializer.validated_data['file']
+            profile = serializer.validated_data.get('profile')
+            
+            # Plain CSVs travel inline; compressed ones are spooled to disk
+            # and decompressed as a stream by the worker. A plain CSV is
+            # decoded up front, so deferred uploads are checked the same way.
+            compressed = is_compressed(uploaded_file.name)
+            if not compressed:
+                try:
+                    file_content = uploaded_file.read().decode('utf-8')
+                except UnicodeDecodeError:
+                    return Response({
+                        'success': False,
+                        'message': 'Invalid file encoding. Please ensure the file is UTF-8 encoded.',
+                        'errors': ['File encoding error']
+                    }, status=status.HTTP_400_BAD_REQUEST)
+            
+            if admission.decision == intake.DEFER:
+                return self._defer(uploaded_file, profile)
             
             try:
-                logger.info(f"Starting bulk upload processing for file: {uploaded_file.name}")
-                
-                # Read file content
-                file_content = uploaded_file.read().decode('utf-8')
+                logger.info("Starting bulk upload processing for file: %s", uploaded_file.name)
                 
                 # Create job for tracking
                 job = Job.objects.create(
@@ -148,12 +201,20 @@ class BulkUploadView(APIView):
                     file_name=uploaded_file.name
                 )
                 
-                logger.info(f"Created job {job.id} for file {uploaded_file.name}")
+                logger.info("Created job %s for file %s", job.id, uploaded_file.name)
                 
                 # Start background processing
-                process_csv_upload.delay(str(job.id), file_content)
+                if compressed:
+                    file_path = save_upload(uploaded_file, job.id)
+                    try:
+                        process_csv_upload.delay(str(job.id), file_path=file_path, profile=profile)
+                    except Exception:
+                        remove_upload(file_path)
+                        raise
+                else:
+                    process_csv_upload.delay(str(job.id), file_content, profile=profile)
                 
-                logger.info(f"Queued background task for job {job.id}")
+                logger.info("Queued background task for job %s", job.id)
                 
                 return Response({
                     'success': True,
@@ -161,13 +222,6 @@ class BulkUploadView(APIView):
                     'job_id': str(job.id)
                 }, status=status.HTTP_202_ACCEPTED)
                 
-            except UnicodeDecodeError:
-                return Response({
-                    'success': False,
-                    'message': 'Invalid file encoding. Please ensure the file is UTF-8 encoded.',
-                    'errors': ['File encoding error']
-                }, status=status.HTTP_400_BAD_REQUEST)
-                
             except Exception as e:
                 return Response({
                     'success': False,
@@ -181,24 +235,98 @@ class BulkUploadView(APIView):
             'errors': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
+    def _defer(self, uploaded_file, profile):
+        """Spool the upload (plain or compressed) and leave its job for dispatch_deferred()"""
+        job = Job(status='deferred', file_name=uploaded_file.name)
+        file_path = None
+        try:
+            file_path = save_upload(uploaded_file, job.id)
+            job.task_kwargs = {'file_path': file_path, 'profile': profile}
+            job.save()
+        except Exception as e:
+            if file_path:
+                remove_upload(file_path)
+            return Response({
+                'success': False,
+                'message': 'An error occurred while processing the file',
+                'errors': [str(e)]
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        estimate = intake.queue_estimate(job.status, job.created_at)
+        logger.info("Deferred job %s for file %s at queue position %d", job.id, uploaded_file.name, estimate.position)
+        
+        return Response({
+            'success': True,
+            'message': 'File accepted. Processing is scheduled and will start when earlier uploads finish.',
+            'job_id': str(job.id),
+            'queue_position': estimate.position,
+            'estimated_start': serializers.DateTimeField().to_representation(estimate.estimated_start)
+        }, status=status.HTTP_202_ACCEPTED)
+
 
-class JobStatusView(APIView):
+class JobStatusView(ThrottleAfterRevalidationMixin, APIView):
     """
     API endpoint for checking job processing status
     GET /job-status/{job_id}
     """
+    read_from_replica = True
+    throttle_scope = 'status'
     
+    @extend_schema(
+        summary="Get Import Job Status",
+        description="Progress of a bulk upload job. Answers 304 to a matching If-None-Match while the job is unchanged.",
+        tags=["Bulk Upload"],
+        parameters=[
+            OpenApiParameter(
+                name='include_errors',
+                description='Set to true to include the per-row error_details list (always included for failed jobs)',
+                required=False,
+                type=bool,
+                location=OpenApiParameter.QUERY,
+            ),
+        ],
+        responses={
+            200: JobStatusSerializer,
+            304: OpenApiResponse(description="Not Modified: the job is unchanged since the ETag in If-None-Match"),
+            400: OpenApiResponse(OpenApiTypes.OBJECT, description="Invalid job ID format"),
+            404: OpenApiResponse(OpenApiTypes.OBJECT, description="Job not found"),
+        },
+    )
     def get(self, request, job_id):
         try:
             # Validate UUID format
             uuid.UUID(job_id)
-            job = Job.objects.get(id=job_id)
             
-            serializer = JobStatusSerializer(job)
-            return Response({
+            # The error list can be large; it is only sent when asked for,
+            # or when the whole job failed (a single job-level error)
+            include_errors = request.query_params.get('include_errors', '').lower() in TRUTHY_PARAMS
+            
+            # Answer polling clients from the counters alone when nothing changed
+            state = Job.objects.filter(id=job_id).values_list(*JOB_ETAG_FIELDS, 'created_at').first()
+            if state is None:
+                raise Job.DoesNotExist
+            *state, created_at = state
+            include_errors = include_errors or state[0] == 'failed'
+            # Waiting jobs also change as the queue ahead of them moves
+            queue = intake.queue_estimate(state[0], created_at)
+            etag = make_etag('job', job_id, include_errors, *state, *(queue or ()))
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            self.check_revalidated_throttles(request)
+            
+            jobs = Job.objects.all() if include_errors else Job.objects.defer('error_details')
+            job = jobs.get(id=job_id)
+            if job.status != state[0]:
+                queue = intake.queue_estimate(job.status, job.created_at)
+            
+            serializer = JobStatusSerializer(job, include_errors=include_errors, queue=queue)
+            response = Response({
                 'success': True,
                 'data': serializer.data
             }, status=status.HTTP_200_OK)
+            return with_etag(response, make_etag(
+                'job', job_id, include_errors, *(getattr(job, f) for f in JOB_ETAG_FIELDS), *(queue or ())
+            ))
             
         except ValueError:
             return Response({
@@ -213,11 +341,22 @@ class JobStatusView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
 
 
-class DashboardView(APIView):
+class DashboardView(ThrottleAfterRevalidationMixin, APIView):
     """
     API endpoint for dashboard aggregated data
     GET /dashboard?month=YYYY-MM
     """
+    read_from_replica = True
+    throttle_scope = 'dashboard'
+    
+    def get_throttle_cost(self, request):
+        """Wide ranges cost more: one token per started year of months"""
+        try:
+            first = month_key(request.query_params.get('from_month', ''))
+            last = month_key(request.query_params.get('to_month', ''))
+        except ValueError:
+            return 1
+        return 1 + max(last - first, 0) // 12
     
     @extend_schema(
         summary="Get Dashboard Analytics",
@@ -231,14 +370,22 @@ class DashboardView(APIView):
                 type=str,
                 location=OpenApiParameter.QUERY,
             ),
+            OpenApiParameter(
+                name='precision',
+                description='exact (default) or approx. approx counts distinct NGOs from HyperLogLog sketches and reports the relative standard error in total_ngos_reporting_error',
+                required=False,
+                type=str,
+                enum=['exact', 'approx'],
+                location=OpenApiParameter.QUERY,
+            ),
         ],
         responses={
             200: DashboardSerializer,
-            400: OpenApiExample(
+            400: OpenApiResponse(OpenApiTypes.OBJECT, examples=[OpenApiExample(
                 "Invalid Month",
                 value={"success": False, "message": "Invalid month format. Use YYYY-MM (e.g., 2024-01)"},
                 response_only=True,
-            ),
+            )]),
         },
         examples=[
             OpenApiExample(
@@ -263,6 +410,13 @@ class DashboardView(APIView):
         ngo_filter = request.query_params.get('ngo_id')
         from_month = request.query_params.get('from_month')
         to_month = request.query_params.get('to_month')
+        precision = request.query_params.get('precision', 'exact')
+        
+        if precision not in ('exact', 'approx'):
+            return Response({
+                'success': False,
+                'message': 'Invalid precision. Use exact or approx'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         # Handle single month vs date range
         if not month and not (from_month and to_month):
@@ -272,42 +426,38 @@ class DashboardView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Validate month format(s)
-        def validate_month_format(month_str):
-            try:
-                year, month_num = month_str.split('-')
-                if len(year) != 4 or len(month_num) != 2:
-                    raise ValueError
-                if not (1 <= int(month_num) <= 12):
-                    raise ValueError
-                return True
-            except (ValueError, IndexError):
-                return False
-        
-        if month and not validate_month_format(month):
+        if month and not is_valid_month(month):
             return Response({
                 'success': False,
                 'message': 'Invalid month format. Use YYYY-MM (e.g., 2024-01)'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        if from_month and not validate_month_format(from_month):
+        if from_month and not is_valid_month(from_month):
             return Response({
                 'success': False,
                 'message': 'Invalid from_month format. Use YYYY-MM (e.g., 2024-01)'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        if to_month and not validate_month_format(to_month):
+        if to_month and not is_valid_month(to_month):
             return Response({
                 'success': False,
                 'message': 'Invalid to_month format. Use YYYY-MM (e.g., 2024-01)'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Build query filters
-        reports_query = Report.objects.all()
-        
         if month:
-            reports_query = reports_query.filter(month=month)
-        elif from_month and to_month:
-            reports_query = reports_query.filter(month__gte=from_month, month__lte=to_month)
+            from_key = to_key = month_key(month)
+        else:
+            from_key, to_key = month_key(from_month), month_key(to_month)
+        
+        # The response only changes when a report in the range changes
+        versions = DashboardSnapshot.month_versions(from_key, to_key)
+        etag = make_etag('dashboard', sorted(request.query_params.items()), versions)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        self.check_revalidated_throttles(request)
+        
+        # Build query filters
+        reports_query = Report.objects.filter(month_key__gte=from_key, month_key__lte=to_key)
         
         if ngo_filter:
             reports_query = reports_query.filter(ngo_id__icontains=ngo_filter)
@@ -315,12 +465,31 @@ class DashboardView(APIView):
         # Get aggregated data
         reports_for_period = reports_query
         
-        aggregated_data = reports_for_period.aggregate(
-            total_ngos_reporting=Count('ngo_id', distinct=True),
-            total_people_helped=Sum('people_helped') or 0,
-            total_events_conducted=Sum('events_conducted') or 0,
-            total_funds_utilized=Sum('funds_utilized') or 0
-        )
+        # The distinct NGO count is the expensive part of the aggregation; in
+        # approx mode it comes from the per-month HyperLogLog sketches instead.
+        # Sketches cover whole months, so an NGO filter always counts exactly.
+        approximate = precision == 'approx' and not ngo_filter
+        metrics = {
+            'total_people_helped': Sum('people_helped') or 0,
+            'total_events_conducted': Sum('events_conducted') or 0,
+            'total_funds_utilized': Sum('funds_utilized') or 0,
+        }
+        if not approximate:
+            metrics['total_ngos_reporting'] = Count('ngo_id', distinct=True)
+        
+        # Ranges warmed ahead of demand (see snapshots.py) skip the aggregation
+        snapshot = None
+        if not ngo_filter and not approximate:
+            snapshot = DashboardSnapshot.lookup(from_key, to_key, versions)
+        
+        if snapshot is not None:
+            aggregated_data = {name: getattr(snapshot, name) for name in metrics}
+        else:
+            # Bounded admission: a 503 with Retry-After beats queueing on the DB
+            with aggregation_slot('dashboard'):
+                aggregated_data = reports_for_period.aggregate(**metrics)
+                if approximate:
+                    aggregated_data['total_ngos_reporting'] = MonthNgoSketch.estimate(from_key, to_key)
         
         # Prepare response data
         period_label = month if month else f"{from_month} to {to_month}"
@@ -337,27 +506,201 @@ class DashboardView(APIView):
             'total_events_conducted': aggregated_data['total_events_conducted'],
             'total_funds_utilized': aggregated_data['total_funds_utilized']
         }
+        if approximate:
+            dashboard_data['precision'] = 'approx'
+            dashboard_data['total_ngos_reporting_error'] = round(hll.STANDARD_ERROR, 4)
         
         serializer = DashboardSerializer(dashboard_data)
         
-        return Response({
+        response = Response({
             'success': True,
             'data': serializer.data
         }, status=status.HTTP_200_OK)
+        response['X-Dashboard-Source'] = 'snapshot' if snapshot is not None else 'reports'
+        return with_etag(response, etag)
+
+
+class _ClosingStream:
+    """Streaming content whose cleanup runs when Django closes the response"""
+
+    def __init__(self, chunks, close):
+        self._chunks = chunks
+        self.close = close
+
+    def __iter__(self):
+        return iter(self._chunks)
+
+
+class AggregationView(ThrottleAfterRevalidationMixin, APIView):
+    """
+    API endpoint for grouped totals
+    GET /dashboard/aggregate?from_month=YYYY-MM&to_month=YYYY-MM&group_by=ngo,quarter
+    """
+    read_from_replica = True
+    throttle_scope = 'dashboard'
+    get_throttle_cost = DashboardView.get_throttle_cost
+    
+    @extend_schema(
+        summary="Get Grouped Totals",
+        description="Totals for a month range grouped by any of ngo, month, quarter and year, computed in one GROUP BY query (or from the per-month rollups when no NGO is involved). Responses with more than AGGREGATION_MAX_GROUPS groups are rejected unless streamed as NDJSON with output=ndjson.",
+        tags=["Dashboard"],
+        parameters=[
+            OpenApiParameter(name='from_month', description='First month (YYYY-MM)', required=True, type=str, location=OpenApiParameter.QUERY),
+            OpenApiParameter(name='to_month', description='Last month (YYYY-MM)', required=True, type=str, location=OpenApiParameter.QUERY),
+            OpenApiParameter(
+                name='group_by',
+                description=f"Comma-separated dimensions: {', '.join(DIMENSIONS)}. Omit for a single total.",
+                required=False,
+                type=str,
+                location=OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(
+                name='metrics',
+                description=f"Comma-separated metrics: {', '.join(METRICS)}. Defaults to all but ngo_count.",
+                required=False,
+                type=str,
+                location=OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(name='ngo_id', description='Comma-separated NGO IDs to include', required=False, type=str, location=OpenApiParameter.QUERY),
+            OpenApiParameter(
+                name='output',
+                description='json (default) or ndjson, which streams one group per line without the group limit',
+                required=False,
+                type=str,
+                enum=['json', 'ndjson'],
+                location=OpenApiParameter.QUERY,
+            ),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+        examples=[
+            OpenApiExample(
+                "NGO x Quarter",
+                value={
+                    "success": True,
+                    "source": "reports",
+                    "count": 1,
+                    "data": [
+                        {"ngo_id": "NGO001", "quarter": "2024-Q1", "report_count": 3, "people_helped": 450, "funds_utilized": "37500.00"}
+                    ]
+                },
+                response_only=True,
+            ),
+        ],
+    )
+    def get(self, request):
+        try:
+            query = AggregationQuery.from_params(request.query_params)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        output = request.query_params.get('output', 'json')
+        if output not in ('json', 'ndjson'):
+            return Response({
+                'success': False,
+                'message': 'Invalid output. Use json or ndjson'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        versions = MonthVersion.objects.filter(
+            month_key__gte=query.from_key, month_key__lte=query.to_key
+        ).values_list('month_key', 'version')
+        etag = make_etag('aggregate', sorted(request.query_params.items()), list(versions))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        self.check_revalidated_throttles(request)
+        
+        if output == 'ndjson':
+            return with_etag(self._stream(query), etag)
+        
+        # One row past the limit tells us the grouping is too large
+        max_groups = settings.AGGREGATION_MAX_GROUPS
+        with aggregation_slot('dashboard'):
+            rows = list(query.execute(limit=max_groups + 1))
+        if len(rows) > max_groups:
+            return Response({
+                'success': False,
+                'message': f'More than {max_groups} groups. Narrow the range or filters, or stream them with output=ndjson'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        response = Response({
+            'success': True,
+            'source': query.source,
+            'count': len(rows),
+            'data': rows
+        }, status=status.HTTP_200_OK)
+        return with_etag(response, etag)
+    
+    def _stream(self, query):
+        # The aggregation slot is held until the last line is sent (or the
+        # client goes away and Django closes the response)
+        slot = ExitStack()
+        slot.enter_context(aggregation_slot('dashboard'))
+        try:
+            rows = query.execute()
+        except BaseException:
+            slot.close()
+            raise
+        renderer = FastJSONRenderer()
+        lines = (renderer.render(row) + b'\n' for row in rows)
+        response = StreamingHttpResponse(_ClosingStream(lines, slot.close), content_type='application/x-ndjson')
+        response['X-Aggregation-Source'] = query.source
+        return response
 
 
 class ReportsListView(APIView):
     """
     API endpoint to list all reports (for debugging/admin purposes)
-    GET /reports
+    GET /reports?from_month=YYYY-MM&to_month=YYYY-MM
     """
+    read_from_replica = True
+    throttle_scope = 'reports'
     
+    @extend_schema(
+        summary="List Reports",
+        tags=["Reports"],
+        parameters=[
+            OpenApiParameter(
+                name='from_month',
+                description='Only reports from this month on (YYYY-MM)',
+                required=False,
+                type=str,
+                location=OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(
+                name='to_month',
+                description='Only reports up to this month (YYYY-MM)',
+                required=False,
+                type=str,
+                location=OpenApiParameter.QUERY,
+            ),
+        ],
+        responses={
+            200: ReportSerializer(many=True),
+            400: OpenApiResponse(OpenApiTypes.OBJECT, description="Invalid from_month or to_month"),
+        },
+    )
     def get(self, request):
         reports = Report.objects.all()
-        serializer = ReportSerializer(reports, many=True)
+        
+        # Filtering on month_key lets PostgreSQL skip partitions outside the
+        # range (and uses the month_key index elsewhere)
+        for param, lookup in (('from_month', 'month_key__gte'), ('to_month', 'month_key__lte')):
+            value = request.query_params.get(param)
+            if value is None:
+                continue
+            if not is_valid_month(value):
+                return Response({
+                    'success': False,
+                    'message': f'Invalid {param} format. Use YYYY-MM (e.g., 2024-01)'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            reports = reports.filter(**{lookup: month_key(value)})
+        
+        data = report_list_serializer.serialize(reports)
         
         return Response({
             'success': True,
-            'count': len(reports),
-            'data': serializer.data
+            'count': len(data),
+            'data': data
         }, status=status.HTTP_200_OK)
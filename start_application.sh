@@ -21,9 +21,9 @@ DJANGO_PID=$!
 # Wait a moment for Django to start
 sleep 3
 
-# Start Celery worker in background
+# Start Celery worker in background, with the beat scheduler embedded
 echo "🔧 Starting Celery worker..."
-celery -A ngo_impact_tracker worker --loglevel=info > celery.log 2>&1 &
+DJANGO_PROCESS_ROLE=worker celery -A ngo_impact_tracker worker --beat --loglevel=info > celery.log 2>&1 &
 CELERY_PID=$!
 
 # Wait a moment for Celery to start